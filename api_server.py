@@ -0,0 +1,30 @@
+import argparse
+import logging
+
+from src.server.http_api import create_server
+from src.utils.logging_config import configure_logging
+from src.utils.resource_registry import get_resource_registry
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Serve the MamaBear JSON API for non-browser clients."""
+    parser = argparse.ArgumentParser(description="MamaBear headless HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    # .env may set MAMABEAR_LOG_LEVEL, so it is loaded before logging is configured
+    get_resource_registry().load_environment()
+    configure_logging()
+    server = create_server(args.host, args.port)
+    logger.info("Serving MamaBear API on http://%s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
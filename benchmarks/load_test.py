@@ -0,0 +1,333 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives many simulated sessions against ``main.py`` in one process with
+Streamlit's ``AppTest`` driver, so the sessions share caches, provider
+clients and the analysis queue just as they do on a single server node.
+Providers run in replay mode: responses come from recorded fixtures, with
+latency drawn from the recordings or from a latency model.
+
+Each session follows the main user flow, timing every step:
+
+1. ``home``: first page load
+2. ``open_analysis``: switch to Recipe Analysis
+3. ``analyze``: upload a fridge photo and wait for the analysis job
+4. ``browse_recipes``: show the analysis, recipe search and recipe cards
+5. ``load_more``: load the next page of recipes
+6. ``open_meal_planner``: plan the recipes and open Meal Planning
+
+``AppTest`` cannot drive a file uploader. The upload step therefore
+submits the image through ``submit_fridge_analysis`` and stores the job in
+the session state, which is what the page does after an upload.
+
+For every concurrency level the report shows flows per second, latency
+percentiles per step, failed steps, peak thread count and peak resident
+memory. The first level whose throughput stops growing is flagged as the
+saturation point.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1,2,4,8,16] [--iterations N] [--think-time S]
+                                   [--latency SPEC] [--provider-latency gemini=lognormal:2.5,0.3]
+                                   [--fixtures fixtures/providers] [--output results.json]
+
+Record fixtures first with ``MAMABEAR_PROVIDER_MODE=record streamlit run main.py``
+and one full pass through the flow.
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore', message='.*missing ScriptRunContext.*')
+
+REQUIRED_FIXTURES = ["gemini", "spoonacular", "groq", "calendar"]
+STEPS = ["home", "open_analysis", "analyze", "browse_recipes", "load_more", "open_meal_planner"]
+
+
+def configure_environment(args):
+    """Switch every provider to replay mode; must run before the app modules are imported."""
+    os.environ["MAMABEAR_PROVIDER_MODE"] = "replay"
+    os.environ["MAMABEAR_FIXTURES_DIR"] = args.fixtures
+    os.environ["MAMABEAR_REPLAY_SEED"] = str(args.seed)
+    os.environ["MAMABEAR_THUMBNAIL_DIR"] = tempfile.mkdtemp(prefix="mamabear-load-thumbs-")
+    os.environ["MAMABEAR_THUMBNAIL_FIXTURES"] = write_thumbnail_fixtures(args.fixtures)
+    if args.latency:
+        os.environ["MAMABEAR_REPLAY_LATENCY"] = args.latency
+    for setting in args.provider_latency:
+        provider, _, spec = setting.partition("=")
+        os.environ[f"MAMABEAR_REPLAY_LATENCY_{provider.upper()}"] = spec
+
+
+def write_thumbnail_fixtures(fixtures_dir: str) -> str:
+    """Write a placeholder image for every recipe image URL in the Spoonacular recordings."""
+    from PIL import Image
+
+    root = tempfile.mkdtemp(prefix="mamabear-load-images-")
+    path = os.path.join(fixtures_dir, "spoonacular.jsonl")
+    names = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            body = json.loads(line)["response"].get("body")
+            for recipe in body if isinstance(body, list) else [body]:
+                if isinstance(recipe, dict) and recipe.get("image"):
+                    names.add(os.path.basename(urlparse(recipe["image"]).path))
+    for index, name in enumerate(sorted(names)):
+        Image.new("RGB", (556, 370), (index * 37 % 256, 120, 90)).save(os.path.join(root, name), "JPEG")
+    return root
+
+
+def make_upload(seed: int) -> bytes:
+    """A distinct fridge-sized JPEG per seed, so sessions do not share analysis jobs."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (1280, 960), (40, 40, 48))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x0, y0 = rng.randrange(1280), rng.randrange(960)
+        draw.rectangle([x0, y0, x0 + rng.randrange(40, 300), y0 + rng.randrange(40, 300)],
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+def resident_memory_mb() -> Optional[float]:
+    """Current resident memory of the process, falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ResourceMonitor:
+    """Samples thread count and resident memory on a background thread."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_memory_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-monitor", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_memory_mb = max(self.peak_memory_mb, resident_memory_mb() or 0.0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class SimulatedSession:
+    """One browser session walking through the app with ``AppTest``."""
+
+    def __init__(self, session_index: int, args):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = session_index
+        self.args = args
+        self.app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=args.timeout)
+        self.timings: List[Dict] = []
+
+    def _step(self, name: str, action: Callable[[], None]):
+        start = time.perf_counter()
+        error = None
+        try:
+            action()
+            if self.app.exception:
+                error = self.app.exception[0].message
+            elif self.app.error:
+                error = self.app.error[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.timings.append({"step": name, "seconds": time.perf_counter() - start, "error": error})
+        time.sleep(self.args.think_time)
+        return error is None
+
+    def _navigate(self, page: str):
+        self.app.sidebar.radio[0].set_value(page).run()
+
+    def _analyze(self, iteration: int):
+        from src.services.image_analysis_service import submit_fridge_analysis
+        from src.services.job_queue import get_analysis_queue
+
+        seed = self.args.seed if self.args.same_image else self.args.seed + self.index * 1000 + iteration
+        image_data = make_upload(seed)
+        image_hash = hashlib.sha256(image_data).hexdigest()
+        job = submit_fridge_analysis(image_data, key=image_hash)
+        self.app.session_state["analysis_image_hash"] = image_hash
+        self.app.session_state["analysis_job_id"] = job.id
+
+        deadline = time.monotonic() + self.args.timeout
+        while not job.finished:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Analysis job {job.id} did not finish in {self.args.timeout}s")
+            # Keep polling through the page, as the progress fragment does
+            self.app.run()
+            time.sleep(self.args.poll_interval)
+        if get_analysis_queue().get(job.id) is None:
+            raise RuntimeError(f"Analysis job {job.id} expired")
+
+    def _load_more(self):
+        self.app.button(key="load_more").click().run()
+
+    def _open_meal_planner(self):
+        plan = next(button for button in self.app.button if "Plan These Meals" in button.label)
+        plan.click().run()
+        self._navigate("Meal Planning")
+
+    def run(self):
+        for iteration in range(self.args.iterations):
+            steps = [
+                ("home", self.app.run),
+                ("open_analysis", lambda: self._navigate("Recipe Analysis")),
+                ("analyze", lambda: self._analyze(iteration)),
+                ("browse_recipes", self.app.run),
+                ("load_more", self._load_more),
+                ("open_meal_planner", self._open_meal_planner)
+            ]
+            for name, action in steps:
+                if not self._step(name, action):
+                    break
+        return self.timings
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def run_level(sessions: int, args) -> Dict:
+    """Run ``sessions`` concurrent sessions through the flow and summarize the step timings."""
+    with ResourceMonitor() as monitor:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as executor:
+            futures = []
+            for index in range(sessions):
+                futures.append(executor.submit(lambda i=index: SimulatedSession(i, args).run()))
+                time.sleep(args.ramp / max(sessions, 1))
+            timings = [timing for future in futures for timing in future.result()]
+        wall = time.perf_counter() - start
+
+    flows = sum(1 for timing in timings if timing["step"] == STEPS[-1] and timing["error"] is None)
+    steps = {}
+    for name in STEPS:
+        ok = [timing["seconds"] for timing in timings if timing["step"] == name and timing["error"] is None]
+        errors = [timing["error"] for timing in timings if timing["step"] == name and timing["error"] is not None]
+        steps[name] = {
+            "count": len(ok),
+            "errors": len(errors),
+            "first_error": errors[0] if errors else None,
+            "p50": percentile(ok, 50),
+            "p90": percentile(ok, 90),
+            "p99": percentile(ok, 99),
+            "mean": statistics.mean(ok) if ok else None
+        }
+    return {
+        "sessions": sessions,
+        "wall_seconds": wall,
+        "flows": flows,
+        "flows_per_second": flows / wall if wall else 0.0,
+        "steps_per_second": len(timings) / wall if wall else 0.0,
+        "peak_threads": monitor.peak_threads,
+        "peak_memory_mb": monitor.peak_memory_mb,
+        "steps": steps
+    }
+
+
+def print_level(result: Dict):
+    print(f"\n== {result['sessions']} sessions: {result['flows']} flows in {result['wall_seconds']:.1f}s "
+          f"({result['flows_per_second']:.2f} flows/s, {result['steps_per_second']:.2f} steps/s), "
+          f"peak {result['peak_threads']} threads, {result['peak_memory_mb']:.0f} MB")
+    print(f"{'step':<20}{'ok':>6}{'err':>6}{'p50 s':>10}{'p90 s':>10}{'p99 s':>10}")
+    for name, step in result["steps"].items():
+        cells = [f"{step[key]:>10.2f}" if step[key] is not None else f"{'-':>10}" for key in ("p50", "p90", "p99")]
+        print(f"{name:<20}{step['count']:>6}{step['errors']:>6}{''.join(cells)}")
+        if step["first_error"]:
+            print(f"{'':<20}first error: {step['first_error']}")
+
+
+def find_saturation(results: List[Dict], min_gain: float = 0.1) -> Optional[int]:
+    """The first session count whose throughput grew by less than ``min_gain`` over the previous level."""
+    for previous, current in zip(results, results[1:]):
+        if current["flows_per_second"] < previous["flows_per_second"] * (1 + min_gain):
+            return current["sessions"]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="Comma-separated concurrent session counts")
+    parser.add_argument("--iterations", type=int, default=1, help="Flows per session at each level")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Seconds a user pauses between steps")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which a level's sessions start")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between analysis progress polls")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout for one script run or analysis job")
+    parser.add_argument("--latency", help="Replay latency model for all providers, e.g. lognormal:0.8,0.4")
+    parser.add_argument("--provider-latency", action="append", default=[], metavar="PROVIDER=SPEC",
+                        help="Replay latency model for one provider; repeatable")
+    parser.add_argument("--fixtures", default=os.path.join(ROOT, "fixtures", "providers"), help="Recorded fixtures")
+    parser.add_argument("--same-image", action="store_true", help="Upload one image from every session")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    missing = [name for name in REQUIRED_FIXTURES if not os.path.exists(os.path.join(args.fixtures, f"{name}.jsonl"))]
+    if missing:
+        print(f"Missing fixtures for {', '.join(missing)} in {args.fixtures}. Record them with "
+              "MAMABEAR_PROVIDER_MODE=record streamlit run main.py and one pass through the flow.")
+        sys.exit(2)
+
+    configure_environment(args)
+    from src.utils.logging_config import configure_logging
+    configure_logging(os.getenv("MAMABEAR_LOG_LEVEL", "WARNING"))
+
+    results = []
+    for sessions in [int(value) for value in args.sessions.split(",")]:
+        results.append(run_level(sessions, args))
+        print_level(results[-1])
+
+    saturation = find_saturation(results)
+    if saturation:
+        print(f"\nThroughput stopped scaling at {saturation} concurrent sessions.")
+    else:
+        print("\nThroughput still scaled at the highest session count.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "levels": results, "saturation_sessions": saturation}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
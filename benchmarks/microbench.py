@@ -0,0 +1,340 @@
+"""Microbenchmarks for the CPU-bound hot paths.
+
+Every case runs on synthetic fixtures generated from a fixed seed, so runs
+on the same machine measure identical work. Each result is also stored
+relative to a fixed pure-Python calibration loop, which makes results
+from different machines roughly comparable.
+
+Usage:
+    python benchmarks/microbench.py [-k FILTER] [--quick] [--output results.json]
+                                    [--compare baseline.json] [--threshold 0.2]
+
+Record a baseline with ``--output benchmarks/baseline.json`` before changing
+a hot path. Afterwards, ``--compare benchmarks/baseline.json`` exits non-zero
+when any case has slowed down by more than the threshold.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore', message='.*missing ScriptRunContext.*')
+
+SEED = 20240501
+NOW = datetime(2024, 5, 1, 0, 5, tzinfo=timezone.utc)
+CATEGORIES = ["fruit", "vegetable", "dairy", "beverage", "condiment", "meat", "other"]
+
+
+# Synthetic fixtures
+
+def make_fridge_image(width: int, height: int, seed: int = SEED):
+    """A fridge-like RGB image: bright shelf lines over randomly coloured items."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (40, 40, 48))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(20, width // 3), y0 + rng.randrange(20, height // 3)
+        draw.rectangle([x0, y0, x1, y1], fill=tuple(rng.randrange(256) for _ in range(3)))
+    for shelf in range(1, 5):
+        y = shelf * height // 5
+        draw.rectangle([0, y, width, y + 2], fill=(235, 235, 235))
+    return image
+
+
+def make_items(count: int, width: int, height: int, seed: int = SEED) -> Dict:
+    """Detected items with pixel bounding boxes, as passed to draw_annotations."""
+    rng = random.Random(seed)
+    items = {}
+    for index in range(count):
+        x0, y0 = rng.randrange(width - 60), rng.randrange(20, height - 60)
+        items[f"item_{index}"] = {
+            "quantity": str(rng.randint(1, 6)),
+            "category": rng.choice(CATEGORIES),
+            "box": [x0, y0, x0 + rng.randrange(20, 60), y0 + rng.randrange(20, 60)]
+        }
+    return items
+
+
+def make_detection_text(count: int, seed: int = SEED) -> str:
+    """A fenced detection reply with percentage boxes, as Gemini returns it."""
+    rng = random.Random(seed)
+    items = {}
+    for index in range(count):
+        x0, y0 = rng.randrange(80), rng.randrange(80)
+        items[f"item_{index}"] = {
+            "quantity": f"{rng.randint(1, 6)} pieces",
+            "category": rng.choice(CATEGORIES),
+            "box": [x0, y0, x0 + rng.randrange(5, 20), y0 + rng.randrange(5, 20)],
+            "freshness": rng.choice(["fresh", "good", "check", "expired"])
+        }
+    return "```json\n" + json.dumps({"items": items}, indent=2) + "\n```"
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    make_fridge_image(width, height).save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+def make_events(count: int, days: int, seed: int = SEED) -> List[Dict]:
+    """Calendar events spread over the window, with mixed offsets and some all-day entries."""
+    rng = random.Random(seed)
+    offsets = [timezone.utc, timezone(timedelta(hours=8))]
+    events = []
+    for index in range(count):
+        start = NOW + timedelta(minutes=rng.randrange(days * 24 * 60))
+        end = start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90, 120, 240]))
+        tz = rng.choice(offsets)
+        events.append({
+            "id": f"event{index}",
+            "summary": f"Event {index}",
+            "start": {"dateTime": start.astimezone(tz).isoformat()},
+            "end": {"dateTime": end.astimezone(tz).isoformat()}
+        })
+    return events
+
+
+def make_recipe(index: int, seed: int = SEED) -> Tuple[Dict, Dict]:
+    """A Spoonacular search result and its information payload."""
+    rng = random.Random(seed + index)
+    ingredients = [{"name": f"ingredient {i}", "original": f"1 cup ingredient {i}"} for i in range(12)]
+    recipe = {
+        "id": index,
+        "title": f"Recipe {index}",
+        "image": f"https://img.example.com/{index}.jpg",
+        "usedIngredients": ingredients[:rng.randint(2, 8)],
+        "missedIngredients": ingredients[8:]
+    }
+    details = {
+        "id": index,
+        "title": recipe["title"],
+        "readyInMinutes": rng.choice([15, 30, 45, 60]),
+        "pricePerServing": rng.uniform(100, 900),
+        "vegetarian": rng.random() < 0.5,
+        "vegan": rng.random() < 0.2,
+        "glutenFree": rng.random() < 0.3,
+        "dairyFree": rng.random() < 0.3,
+        "cuisines": rng.sample(["Italian", "Asian", "Mexican", "French"], 2),
+        "instructions": "Step. " * 80,
+        "extendedIngredients": ingredients,
+        "analyzedInstructions": [{"steps": [{"number": n, "step": "Stir."} for n in range(10)]}],
+        "nutrition": {"nutrients": [
+            {"name": "Calories", "amount": rng.uniform(200, 900), "unit": "kcal"},
+            {"name": "Fat", "amount": rng.uniform(5, 50), "unit": "g"}
+        ]}
+    }
+    return recipe, details
+
+
+# Cases: each factory prepares its fixtures and returns the function to time
+
+def case_draw_annotations(width: int, height: int, count: int) -> Callable:
+    from src.services.image_analysis_service import draw_annotations
+
+    image = make_fridge_image(width, height)
+    items = make_items(count, width, height)
+    return lambda: draw_annotations(image, items, "analysis")
+
+
+def case_is_shelf_line(width: int, height: int, mode: str) -> Callable:
+    from src.services.image_analysis_service import is_shelf_line
+
+    image = make_fridge_image(width, height).convert(mode)
+    rows = list(range(0, height, max(1, height // 50)))
+    return lambda: [is_shelf_line(image, y, width) for y in rows]
+
+
+def case_process_image(width: int, height: int) -> Callable:
+    from src.utils.image_processing import process_image
+
+    data = make_jpeg(width, height)
+    return lambda: os.remove(process_image(io.BytesIO(data)))
+
+
+def case_detection_parsing(count: int) -> Callable:
+    from src.services.image_analysis_service import extract_detection_items
+
+    text = make_detection_text(count)
+    return lambda: extract_detection_items(text, 800, 600)
+
+
+def case_slot_finding(count: int, days: int) -> Callable:
+    from src.services.meal_planner_service import compute_meal_prep_slots
+
+    events = make_events(count, days)
+    return lambda: compute_meal_prep_slots(events, 45, days, NOW)
+
+
+def case_calendar_view(count: int, days: int, day_level: bool, cached: bool) -> Callable:
+    from src.pages.meal_planner_page import build_calendar_figure, create_calendar_view, event_intervals
+
+    events = make_events(count, days)
+    slot = {"start": (NOW + timedelta(hours=30)).isoformat(), "end": (NOW + timedelta(hours=31)).isoformat()}
+    if cached:
+        create_calendar_view(events, slot, day_level=day_level)
+        return lambda: create_calendar_view(events, slot, day_level=day_level)
+    return lambda: build_calendar_figure(event_intervals(events, slot), day_level)
+
+
+def case_recipe_cards(count: int) -> Callable:
+    from src.pages.recipe_page import build_recipe_card_data
+
+    pairs = [make_recipe(index) for index in range(count)]
+    return lambda: [build_recipe_card_data(recipe, details) for recipe, details in pairs]
+
+
+def build_cases() -> List[Tuple[str, Callable[[], Callable]]]:
+    cases = []
+    for width, height in [(320, 240), (640, 480), (800, 600)]:
+        for count in [3, 10]:
+            cases.append((f"draw_annotations[{width}x{height},{count} items]",
+                          lambda w=width, h=height, c=count: case_draw_annotations(w, h, c)))
+    for width, height in [(640, 480), (800, 600)]:
+        for mode in ["RGB", "L"]:
+            cases.append((f"is_shelf_line[{width}x{height},{mode},50 rows]",
+                          lambda w=width, h=height, m=mode: case_is_shelf_line(w, h, m)))
+    for width, height in [(1024, 768), (4032, 3024)]:
+        cases.append((f"process_image[{width}x{height}]", lambda w=width, h=height: case_process_image(w, h)))
+    for count in [5, 50]:
+        cases.append((f"detection_parsing[{count} items]", lambda c=count: case_detection_parsing(c)))
+    for count, days in [(0, 7), (50, 7), (500, 30), (3000, 90)]:
+        cases.append((f"find_meal_prep_slots[{count} events,{days}d]",
+                      lambda c=count, d=days: case_slot_finding(c, d)))
+    for count, days, day_level in [(50, 7, False), (500, 21, False), (500, 21, True)]:
+        for cached in [False, True]:
+            label = f"{count} events,{days}d,{'daily' if day_level else 'timeline'},{'cached' if cached else 'cold'}"
+            cases.append((f"create_calendar_view[{label}]",
+                          lambda c=count, d=days, l=day_level, k=cached: case_calendar_view(c, d, l, k)))
+    for count in [4, 12]:
+        cases.append((f"recipe_card_data[{count} cards]", lambda c=count: case_recipe_cards(c)))
+    return cases
+
+
+# Timing
+
+def measure(func: Callable, repeat: int, min_time: float) -> Dict:
+    """Time ``func`` in ``repeat`` rounds of enough calls to last ``min_time`` seconds each."""
+    func()  # warm-up, also fills lazy imports and caches
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "loops": number,
+        "repeat": repeat
+    }
+
+
+def calibration_workload():
+    rng = random.Random(SEED)
+    values = [rng.random() for _ in range(20000)]
+    return sum(sorted(values)) + sum(int(value * 1000) % 7 for value in values)
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "seed": SEED
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List the cases whose calibrated time regressed by more than ``threshold``."""
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if previous is None:
+            continue
+        ratio = current["relative"] / previous["relative"]
+        current["vs_baseline"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {ratio:.2f}x baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="Run only cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per case")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--quick", action="store_true", help="One short round per case")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before failing")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.min_time = 1, 0.0
+
+    calibration = measure(calibration_workload, args.repeat, args.min_time)
+    results = {"environment": environment(), "calibration_ms": calibration["median_ms"], "cases": {}}
+    print(f"calibration: {calibration['median_ms']:.3f} ms")
+
+    for name, factory in build_cases():
+        if args.filter not in name:
+            continue
+        stats = measure(factory(), args.repeat, args.min_time)
+        stats["relative"] = stats["median_ms"] / calibration["median_ms"]
+        results["cases"][name] = stats
+        print(f"{name:<70} {stats['median_ms']:>10.3f} ms  ±{stats['stdev_ms']:.3f}  ({stats['loops']} loops)")
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        exit_code = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
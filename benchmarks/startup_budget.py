@@ -0,0 +1,131 @@
+"""Startup import-time benchmark for the Streamlit entry point.
+
+Imports each configured target module in a fresh interpreter with
+``-X importtime``, reports the import time per top-level package, and
+exits non-zero when a target exceeds its budget or imports a module that
+should only load lazily.
+
+Usage:
+    python benchmarks/startup_budget.py [--config benchmarks/startup_budget.json] [--runs N] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG = os.path.join(ROOT, "benchmarks", "startup_budget.json")
+
+
+def measure_imports(module: str) -> Dict:
+    """Import a module in a fresh interpreter and parse the ``-X importtime`` report."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors[-10:]))
+
+    self_us = defaultdict(int)
+    imported = set()
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_part, cumulative_part, name_part = line[len("import time:"):].split("|")
+        self_time = int(self_part)
+        name = name_part.strip()
+        imported.add(name)
+        self_us[name.split(".")[0]] += self_time
+        if name == module:
+            total_us = int(cumulative_part)
+    return {"total_us": total_us, "self_us_by_package": dict(self_us), "imported": imported}
+
+
+def check_target(target: Dict, runs: int) -> Dict:
+    module = target["module"]
+    samples = [measure_imports(module) for _ in range(runs)]
+
+    packages = set().union(*(sample["self_us_by_package"] for sample in samples))
+    by_package = {
+        package: statistics.median(sample["self_us_by_package"].get(package, 0) for sample in samples) / 1000
+        for package in packages
+    }
+    total_ms = statistics.median(sample["total_us"] for sample in samples) / 1000
+
+    imported = samples[0]["imported"]
+    forbidden = sorted(
+        name for name in target.get("forbidden", [])
+        if any(i == name or i.startswith(name + ".") for i in imported)
+    )
+
+    failures = []
+    if total_ms > target["budget_ms"]:
+        failures.append(f"total {total_ms:.1f} ms exceeds budget {target['budget_ms']} ms")
+    for package, budget in target.get("package_budgets_ms", {}).items():
+        if by_package.get(package, 0) > budget:
+            failures.append(f"{package} {by_package[package]:.1f} ms exceeds budget {budget} ms")
+    if forbidden:
+        failures.append(f"eagerly imports {', '.join(forbidden)}")
+
+    return {
+        "module": module,
+        "total_ms": total_ms,
+        "budget_ms": target["budget_ms"],
+        "by_package_ms": dict(sorted(by_package.items(), key=lambda item: -item[1])),
+        "forbidden_imported": forbidden,
+        "failures": failures
+    }
+
+
+def print_report(report: Dict, top: int):
+    status = "FAIL" if report["failures"] else "ok"
+    print(f"{report['module']}: {report['total_ms']:.1f} ms (budget {report['budget_ms']} ms) [{status}]")
+    for package, ms in list(report["by_package_ms"].items())[:top]:
+        print(f"    {package:<32} {ms:8.1f} ms")
+    for failure in report["failures"]:
+        print(f"    ! {failure}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=DEFAULT_CONFIG)
+    parser.add_argument("--runs", type=int, help="Override the number of runs per target")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list per target")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+    runs = args.runs or config.get("runs", 3)
+
+    reports = []
+    for target in config["targets"]:
+        try:
+            reports.append(check_target(target, runs))
+        except RuntimeError as e:
+            reports.append({"module": target["module"], "failures": [str(e)]})
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            if "total_ms" in report:
+                print_report(report, args.top)
+            else:
+                print(f"{report['module']}: [FAIL]\n    ! {report['failures'][0]}")
+
+    return 1 if any(report["failures"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
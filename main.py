@@ -2,30 +2,21 @@ import warnings
 warnings.filterwarnings('ignore', message='.*missing ScriptRunContext.*')
 
 import streamlit as st
-from dotenv import load_dotenv
 import os
-from src.utils.image_processing import process_image
-from src.api.groq_client import initialize_groq_client
-from src.api.spoonacular_client import initialize_spoonacular_client
-from src.api.gemini_client import initialize_gemini_client
-from src.services.image_analysis_service import analyze_fridge_image
-from src.services.recipe_service import get_recipes_from_spoonacular
-from src.ui.components import create_recipe_card
-from src.pages.meal_planner_page import render_meal_planner_page
-from src.pages.home_page import render_home_page
-from src.pages.recipe_page import render_recipe_page, display_recipes, generate_recipe_details
+from src.api.replay import is_replay
+from src.utils.logging_config import configure_logging
+from src.utils.resource_registry import get_resource_registry
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Verify API key is loaded
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables")
+# Pages, services and provider SDKs are imported on first use of the page
+# that needs them; see benchmarks/startup_budget.py for the startup budget.
 
 def initialize_apis():
-    """Initialize API clients and check environment variables."""
-    load_dotenv()
+    """Return shared API clients, building them only on first use or after a configuration change."""
+    from src.api.groq_client import initialize_groq_client
+    from src.api.spoonacular_client import initialize_spoonacular_client
+    from src.api.gemini_client import initialize_gemini_client
+
+    registry = get_resource_registry()
     
     required_vars = {
         "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY"),
@@ -34,19 +25,22 @@ def initialize_apis():
     }
     
     missing_vars = [key for key, value in required_vars.items() if not value]
-    if missing_vars:
+    if missing_vars and not is_replay():
         error_msg = f"Missing environment variables: {', '.join(missing_vars)}"
         st.error(error_msg)
         raise ValueError(error_msg)
     
     return {
-        'groq': initialize_groq_client(),
+        'groq': registry.get('groq', initialize_groq_client, ["GROQ_API_KEY"]),
         'spoonacular': initialize_spoonacular_client(),
-        'gemini': initialize_gemini_client()
+        'gemini': registry.get('gemini', initialize_gemini_client, ["GOOGLE_API_KEY"])
     }
 
 def main():
     """Main application function with Streamlit UI."""
+    # .env may set MAMABEAR_LOG_LEVEL, so it is loaded before logging is configured
+    get_resource_registry().load_environment()
+    configure_logging()
     try:
         st.set_page_config(layout="wide", page_title="MamaBear")
         
@@ -58,19 +52,22 @@ def main():
         st.sidebar.title("Navigation")
         st.sidebar.page_link = st.sidebar.radio(
             "Go to",
-            ["Home", "Recipe Analysis", "Meal Planning"]
+            ["Home", "Recipe Analysis", "Meal Planning", "Performance"]
         )
         
-        # Initialize APIs
-        apis = initialize_apis()
-        
         # Page routing
         if st.sidebar.page_link == "Home":
+            from src.pages.home_page import render_home_page
             render_home_page()
         elif st.sidebar.page_link == "Recipe Analysis":
-            render_recipe_page(apis)
+            from src.pages.recipe_page import render_recipe_page
+            render_recipe_page(initialize_apis())
         elif st.sidebar.page_link == "Meal Planning":
+            from src.pages.meal_planner_page import render_meal_planner_page
             render_meal_planner_page(st.session_state.get('selected_recipe'))
+        elif st.sidebar.page_link == "Performance":
+            from src.pages.performance_page import render_performance_page
+            render_performance_page()
     except Exception as e:
         st.error("😔 Something went wrong!")
         st.error(str(e))
@@ -29,20 +29,20 @@ def load_environment():
         if not value:
             missing_keys.append(key)
         else:
-            logger.info(f"Found {key}: {value[:6]}...")
+            logger.info("Found %s: %s...", key, value[:6])
             api_config[key.lower()] = value
     
     # Check optional keys
     for key in optional_keys:
         value = os.getenv(key)
         if value:
-            logger.info(f"Found optional {key}: {value[:6]}...")
+            logger.info("Found optional %s: %s...", key, value[:6])
             api_config[key.lower()] = value
         else:
-            logger.warning(f"Optional {key} not found")
+            logger.warning("Optional %s not found", key)
             
     if missing_keys:
-        logger.error(f"Missing required environment variables: {', '.join(missing_keys)}")
+        logger.error("Missing required environment variables: %s", ', '.join(missing_keys))
         raise ValueError(f"Missing required environment variables: {', '.join(missing_keys)}")
     
     return api_config 
\ No newline at end of file
@@ -1,19 +1,21 @@
 import os
 from typing import Optional, Tuple
-import google.generativeai as genai
 import streamlit as st
 from PIL import Image
 from src.utils.decorators import timeout
+from src.api.replay import is_replay, provider_client
 
 class GeminiClient:
     def __init__(self):
         api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        if not api_key and not is_replay():
             raise ValueError("GOOGLE_API_KEY environment variable not set")
             
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro-vision')
-        self.text_model = genai.GenerativeModel('gemini-pro')
+        import google.generativeai as genai
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.model = provider_client("gemini", lambda: genai.GenerativeModel('gemini-pro-vision'))
+        self.text_model = provider_client("gemini", lambda: genai.GenerativeModel('gemini-pro'))
 
     @timeout(30)
     def analyze_image(
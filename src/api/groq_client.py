@@ -1,30 +1,48 @@
 import os
+import json
+import logging
 import streamlit as st
-from groq import Groq
+from src.utils.generation_cache import get_generation_cache
+from src.utils.metrics import increment
+from src.api.replay import is_replay, provider_client
+from src.utils.completion_stream import CompletionStream, stream_chat_completion
+from src.utils.tracing import record_usage, span
+
+logger = logging.getLogger(__name__)
 
 def initialize_groq_client():
     """Initialize and return Groq client."""
     try:
         api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
+        if not api_key and not is_replay():
             raise ValueError("GROQ_API_KEY not found in environment variables")
             
         # Initialize the client using the current API structure
-        client = Groq(api_key=api_key)
+        from groq import Groq
+        client = provider_client("groq", lambda: Groq(api_key=api_key))
         return client
         
     except Exception as e:
         st.error(f"Failed to initialize Groq client: {str(e)}")
         raise
 
-def generate_recipe_details(groq_client, recipe):
-    """Generate detailed recipe information using Groq API."""
-    try:
-        prompt = f"""
+RECIPE_MODEL = "mixtral-8x7b-32768"
+RECIPE_SYSTEM_PROMPT = "You are a helpful culinary assistant with expertise in various cuisines and cooking techniques."
+RECIPE_PARAMS = {"temperature": 0.7, "max_tokens": 1000}
+KEY_INFORMATION_FIELDS = ["Calories", "Cooking Time", "Price", "Dietary", "Cuisine", "Difficulty"]
+BATCH_TOKENS_PER_RECIPE = 700
+MAX_BATCH_SIZE = 12
+
+def _ingredient_lines(recipe):
+    return ' '.join([f"- {ingredient['original']}" for ingredient in recipe.get('usedIngredients', []) + recipe.get('missedIngredients', [])])
+
+def build_recipe_messages(recipe):
+    """Build the chat messages used to generate details for a recipe."""
+    prompt = f"""
         Generate a detailed recipe for "{recipe['title']}" based on the following information:
 
         Ingredients:
-        {' '.join([f"- {ingredient['original']}" for ingredient in recipe.get('usedIngredients', []) + recipe.get('missedIngredients', [])])}
+        {_ingredient_lines(recipe)}
 
         Provide the following information in this exact format:
 
@@ -47,17 +65,198 @@ def generate_recipe_details(groq_client, recipe):
         Additional Information:
         [Flavor Profile, Texture, Nutritional Highlights, Serving Suggestions, Tips]
         """
+    return [
+        {"role": "system", "content": RECIPE_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_recipe_details(groq_client, recipe, refresh=False):
+    """Generate detailed recipe information using Groq API.
+
+    Completions are cached by model, prompt and sampling parameters; pass
+    ``refresh=True`` to regenerate and overwrite the cached entry.
+    """
+    try:
+        messages = build_recipe_messages(recipe)
+
+        with span("groq.recipe_details", provider="groq", model=RECIPE_MODEL, cache_hit=True) as call:
+            def generate():
+                call.set_attribute("cache_hit", False)
+                response = groq_client.chat.completions.create(
+                    model=RECIPE_MODEL,
+                    messages=messages,
+                    **RECIPE_PARAMS
+                )
+                record_usage(call, response)
+                return response.choices[0].message.content
 
-        response = groq_client.chat.completions.create(
-            model="mixtral-8x7b-32768",
-            messages=[
-                {"role": "system", "content": "You are a helpful culinary assistant with expertise in various cuisines and cooking techniques."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
+            return get_generation_cache().get_or_generate(
+                RECIPE_MODEL, messages, generate, refresh=refresh, **RECIPE_PARAMS
+            )
     except Exception as e:
         st.error(f"Error generating recipe details: {str(e)}")
-        return "Recipe details unavailable"
\ No newline at end of file
+        return "Recipe details unavailable"
+
+def stream_recipe_details(groq_client, recipe, refresh=False):
+    """Stream detailed recipe information from Groq as tokens arrive.
+
+    Returns a CompletionStream; iterate it to receive text deltas, then read
+    ``text``, ``time_to_first_token`` and ``tokens_per_second``. Cached
+    completions are returned as a single delta, and completed streams are
+    written back to the generation cache.
+    """
+    messages = build_recipe_messages(recipe)
+    cache = get_generation_cache()
+    key = cache.make_key(RECIPE_MODEL, messages, **RECIPE_PARAMS)
+    if not refresh:
+        cached = cache.get(key)
+        increment("cache_lookups", cache="generation", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return CompletionStream.from_text(cached)
+
+    return stream_chat_completion(
+        groq_client,
+        RECIPE_MODEL,
+        messages,
+        on_complete=lambda text: cache.set(key, RECIPE_MODEL, text),
+        provider="groq",
+        **RECIPE_PARAMS
+    )
+
+def build_batch_recipe_messages(recipes):
+    """Build the chat messages used to generate details for several recipes at once."""
+    recipe_list = "\n".join(
+        f"""
+        Recipe {index}: "{recipe['title']}"
+        Ingredients:
+        {_ingredient_lines(recipe)}
+        """
+        for index, recipe in enumerate(recipes)
+    )
+    prompt = f"""
+        Generate detailed recipes for each of the following {len(recipes)} dishes:
+        {recipe_list}
+
+        Respond with only a JSON array containing one object per recipe, in this exact structure:
+        [
+            {{
+                "index": [Recipe number as given above],
+                "key_information": {{
+                    "Calories": "[Estimated calories per serving]",
+                    "Cooking Time": "[Estimated total time in minutes]",
+                    "Price": "[Estimated price per serving in USD]",
+                    "Dietary": "[Dietary categories this recipe fits, e.g., Vegetarian, Vegan, Gluten-Free, etc.]",
+                    "Cuisine": "[Type of cuisine, e.g., Italian, Mexican, etc.]",
+                    "Difficulty": "[Easy/Medium/Hard]"
+                }},
+                "description": "[A brief, enticing description of the dish in 2-3 sentences]",
+                "instructions": ["[Step 1]", "[Step 2]"],
+                "additional_information": "[Flavor Profile, Texture, Nutritional Highlights, Serving Suggestions, Tips]"
+            }}
+        ]
+        """
+    return [
+        {"role": "system", "content": RECIPE_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def format_recipe_details(entry):
+    """Render a parsed batch entry in the same text layout as generate_recipe_details."""
+    key_info = entry["key_information"]
+    instructions = entry["instructions"]
+    if not isinstance(key_info, dict) or not isinstance(instructions, list) or not instructions:
+        raise ValueError("Malformed recipe entry")
+
+    lines = ["Key Information:"]
+    lines.extend(f"{field}: {key_info.get(field, 'Not specified')}" for field in KEY_INFORMATION_FIELDS)
+    lines.extend(["", "Description:", str(entry.get("description", "")).strip(), "", "Instructions:"])
+    lines.extend(f"{step_number}. {str(step).strip()}" for step_number, step in enumerate(instructions, 1))
+    additional = str(entry.get("additional_information", "")).strip()
+    if additional:
+        lines.extend(["", "Additional Information:", additional])
+    return "\n".join(lines)
+
+def parse_batch_response(content, count):
+    """Split a batch completion into per-recipe detail texts.
+
+    Returns a list of length ``count`` holding the formatted details for
+    each recipe, or None where the entry was missing or failed to parse.
+    """
+    results = [None] * count
+    try:
+        start = content.index("[")
+        end = content.rindex("]") + 1
+        entries = json.loads(content[start:end])
+    except ValueError as e:
+        logger.error("Could not parse batch recipe response: %s", e)
+        return results
+
+    for position, entry in enumerate(entries if isinstance(entries, list) else []):
+        try:
+            index = int(entry.get("index", position))
+            if 0 <= index < count and results[index] is None:
+                results[index] = format_recipe_details(entry)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning("Skipping malformed batch entry %s: %s", position, e)
+    return results
+
+def generate_recipe_details_batch(groq_client, recipes, refresh=False):
+    """Generate detailed recipe information for several recipes in one Groq call.
+
+    Recipes cached from single-recipe calls are served from the generation
+    cache and the rest are requested together. Batch output is cached under
+    the batch prompt and the recipe's position in it, never under the
+    single-recipe key, since it comes from a different prompt. Any entry
+    that fails to parse falls back to a single-recipe call.
+
+    Returns:
+        One details string per input recipe, or None for a recipe without
+        a title or ingredient text to build its prompt from
+    """
+    cache = get_generation_cache()
+    results = [None] * len(recipes)
+    keys = [None] * len(recipes)
+    for i, recipe in enumerate(recipes):
+        try:
+            keys[i] = cache.make_key(RECIPE_MODEL, build_recipe_messages(recipe), **RECIPE_PARAMS)
+        except (KeyError, TypeError) as e:
+            logger.warning("Skipping batch recipe %s without a usable prompt: %s", i, e)
+    valid = [i for i, key in enumerate(keys) if key is not None]
+
+    if not refresh:
+        for i in valid:
+            results[i] = cache.get(keys[i])
+
+    pending = [i for i in valid if results[i] is None]
+    for chunk_start in range(0, len(pending), MAX_BATCH_SIZE):
+        chunk = pending[chunk_start:chunk_start + MAX_BATCH_SIZE]
+        if len(chunk) < 2:
+            continue
+        messages = build_batch_recipe_messages([recipes[i] for i in chunk])
+        params = {"temperature": RECIPE_PARAMS["temperature"], "max_tokens": BATCH_TOKENS_PER_RECIPE * len(chunk)}
+        batch_keys = [cache.make_key(RECIPE_MODEL, messages, item=position, **params) for position in range(len(chunk))]
+        if not refresh:
+            for i, batch_key in zip(chunk, batch_keys):
+                results[i] = cache.get(batch_key)
+            if all(results[i] is not None for i in chunk):
+                continue
+        try:
+            with span("groq.recipe_details_batch", provider="groq", model=RECIPE_MODEL, recipes=len(chunk)) as call:
+                response = groq_client.chat.completions.create(model=RECIPE_MODEL, messages=messages, **params)
+                record_usage(call, response)
+                parsed = parse_batch_response(response.choices[0].message.content, len(chunk))
+                call.set_attribute("parsed", sum(1 for details in parsed if details))
+        except Exception as e:
+            logger.error("Batch recipe generation failed: %s", e)
+            continue
+
+        for i, batch_key, details in zip(chunk, batch_keys, parsed):
+            if details:
+                results[i] = details
+                cache.set(batch_key, RECIPE_MODEL, details)
+
+    # Fall back to one call per recipe for anything the batch did not cover
+    for i in valid:
+        if results[i] is None:
+            results[i] = generate_recipe_details(groq_client, recipes[i], refresh=refresh)
+    return results
\ No newline at end of file
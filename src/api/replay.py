@@ -0,0 +1,426 @@
+"""Record/replay stand-ins for external providers.
+
+The provider mode is selected with ``MAMABEAR_PROVIDER_MODE``:
+
+- ``live`` (default): clients talk to the real providers.
+- ``record``: clients talk to the real providers and every response is
+  appended to ``<MAMABEAR_FIXTURES_DIR>/<provider>.jsonl``.
+- ``replay``: no network access; responses are served from the fixture
+  files with simulated latency and optional error injection.
+
+Replay tuning, optionally per provider by appending ``_<PROVIDER>`` (for
+example ``MAMABEAR_REPLAY_LATENCY_GROQ``):
+
+- ``MAMABEAR_REPLAY_LATENCY``: ``recorded`` (default), ``none``,
+  ``fixed:<s>``, ``uniform:<low>,<high>`` or ``lognormal:<median>,<sigma>``
+- ``MAMABEAR_REPLAY_ERROR_RATE``: probability of an injected failure
+- ``MAMABEAR_REPLAY_SEED``: seed for repeatable latency and error draws
+
+Requests are matched on a hash of the provider, operation and arguments.
+When no exact match exists, replay falls back to a deterministic pick
+among the recordings for the same operation, so runs with synthetic
+inputs still get realistic payloads.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+DEFAULT_FIXTURES_DIR = os.path.join("fixtures", "providers")
+
+# Arguments that never belong in a fixture key or file
+_SECRET_PARAMS = {"apiKey", "api_key", "key"}
+# Arguments that change on every call and would defeat exact matching
+_VOLATILE_PARAMS = {"timeMin", "timeMax", "syncToken"}
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised in replay mode when no recording exists for an operation."""
+
+
+class InjectedProviderError(ConnectionError):
+    """Failure raised by replay error injection."""
+
+
+def get_provider_mode() -> str:
+    mode = os.getenv("MAMABEAR_PROVIDER_MODE", LIVE).lower()
+    if mode not in (LIVE, RECORD, REPLAY):
+        raise ValueError(f"Unknown MAMABEAR_PROVIDER_MODE: {mode}")
+    return mode
+
+
+def is_replay() -> bool:
+    return get_provider_mode() == REPLAY
+
+
+def _provider_setting(name: str, provider: str, default: str) -> str:
+    return os.getenv(f"{name}_{provider.upper()}", os.getenv(name, default))
+
+
+class LatencyModel:
+    """Latency distribution parsed from a ``MAMABEAR_REPLAY_LATENCY`` spec."""
+
+    def __init__(self, spec: str = "recorded", rng: Optional[random.Random] = None):
+        self.spec = spec
+        self.rng = rng or random.Random()
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        if kind not in ("recorded", "none", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency model: {spec}")
+
+    def sample(self, recorded: float) -> float:
+        if self.kind == "recorded":
+            return recorded
+        if self.kind == "none":
+            return 0.0
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.args[0], self.args[1])
+        median, sigma = self.args
+        return self.rng.lognormvariate(0, sigma) * median
+
+
+class AttrDict(dict):
+    """Dictionary that also exposes its keys as attributes, standing in for SDK response objects."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _to_attr(value):
+    if isinstance(value, dict):
+        return AttrDict({k: _to_attr(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_attr(v) for v in value]
+    return value
+
+
+def _serialize_response(value) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(getattr(value, "text", None), str):
+        return {"text": value.text}
+    return str(value)
+
+
+def _serialize_arg(value) -> Any:
+    if isinstance(value, dict):
+        return {k: _serialize_arg(v) for k, v in value.items() if k not in _SECRET_PARAMS}
+    if isinstance(value, (list, tuple)):
+        return [_serialize_arg(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "tobytes"):
+        # Images are identified by content so the fixture stays small
+        return {"sha256": hashlib.sha256(value.tobytes()).hexdigest()}
+    if callable(value):
+        return None
+    return type(value).__name__
+
+
+def _request_key(provider: str, operation: str, args: Any) -> str:
+    if isinstance(args, dict):
+        args = {k: v for k, v in args.items() if k not in _VOLATILE_PARAMS}
+    encoded = json.dumps([provider, operation, args], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Append-only JSONL recordings for one provider."""
+
+    def __init__(self, provider: str, fixtures_dir: str):
+        self.provider = provider
+        self.path = os.path.join(fixtures_dir, f"{provider}.jsonl")
+        self._lock = threading.Lock()
+        self._by_key: Optional[Dict[str, Dict]] = None
+        self._by_operation: Dict[str, List[Dict]] = {}
+
+    def _load(self):
+        self._by_key = {}
+        self._by_operation = {}
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._by_key[entry["key"]] = entry
+                self._by_operation.setdefault(entry["operation"], []).append(entry)
+
+    def append(self, entry: Dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+            self._by_key = None
+
+    def find(self, key: str, operation: str) -> Dict:
+        with self._lock:
+            if self._by_key is None:
+                self._load()
+            entry = self._by_key.get(key)
+            if entry is not None:
+                return entry
+            candidates = self._by_operation.get(operation)
+        if not candidates:
+            raise FixtureNotFoundError(f"No {self.provider} recording for {operation} in {self.path}")
+        logger.debug("No exact %s recording for %s, using nearest operation match", self.provider, operation)
+        return candidates[int(key[:8], 16) % len(candidates)]
+
+
+class ProviderRecorder:
+    """Records and replays calls for one provider."""
+
+    def __init__(self, provider: str, mode: str, fixtures_dir: str):
+        self.provider = provider
+        self.mode = mode
+        self.store = FixtureStore(provider, fixtures_dir)
+        seed = os.getenv("MAMABEAR_REPLAY_SEED")
+        self.rng = random.Random(int(seed) if seed else None)
+        self.latency = LatencyModel(_provider_setting("MAMABEAR_REPLAY_LATENCY", provider, "recorded"), self.rng)
+        self.error_rate = float(_provider_setting("MAMABEAR_REPLAY_ERROR_RATE", provider, "0"))
+        self._rng_lock = threading.Lock()
+
+    def record(self, operation: str, args: Any, response: Any, latency: float):
+        args = _serialize_arg(args)
+        self.store.append({
+            "key": _request_key(self.provider, operation, args),
+            "operation": operation,
+            "request": args,
+            "response": response,
+            "latency": latency
+        })
+
+    def replay(self, operation: str, args: Any) -> Dict:
+        """Return the recorded entry for a call after simulating its latency and failures."""
+        args = _serialize_arg(args)
+        entry = self.store.find(_request_key(self.provider, operation, args), operation)
+        with self._rng_lock:
+            delay = self.latency.sample(entry.get("latency", 0.0))
+            fail = self.rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise InjectedProviderError(f"Injected {self.provider} failure for {operation}")
+        return entry
+
+
+class ReplayStream:
+    """Iterator over recorded stream chunks that also supports ``close``."""
+
+    def __init__(self, chunks: List):
+        self._chunks = iter(chunks)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self._chunks = iter(())
+
+
+class ProviderProxy:
+    """Stand-in for an SDK client, resource or request object.
+
+    Attribute access returns child proxies. With ``terminal="call"`` (Groq,
+    OpenAI, Gemini) any method call is a provider round trip; with
+    ``terminal="execute"`` (Google API discovery clients) method calls build
+    requests and ``execute()`` performs them. In replay mode there is no
+    underlying target.
+    """
+
+    def __init__(self, recorder: ProviderRecorder, target: Any, path: str, terminal: str, args: Any = None):
+        self._recorder = recorder
+        self._target = target
+        self._path = path
+        self._terminal = terminal
+        self._args = args
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        target = getattr(self._target, name) if self._target is not None else None
+        path = f"{self._path}.{name}" if self._path else name
+        return ProviderProxy(self._recorder, target, path, self._terminal)
+
+    def __call__(self, *args, **kwargs):
+        call_args = {"args": list(args), "kwargs": kwargs} if args else kwargs
+        if self._path.endswith("new_batch_http_request"):
+            return ReplayBatch(kwargs.get("callback"))
+        if self._terminal == "call":
+            return self._perform(call_args, lambda: self._target(*args, **kwargs), kwargs.get("stream", False))
+        target = self._target(*args, **kwargs) if self._target is not None else None
+        return ProviderProxy(self._recorder, target, self._path, self._terminal, call_args)
+
+    def execute(self, *args, **kwargs):
+        return self._perform(self._args or {}, lambda: self._target.execute(*args, **kwargs), False)
+
+    def _perform(self, call_args: Any, invoke: Callable, stream: bool):
+        recorder = self._recorder
+        if recorder.mode == REPLAY:
+            response = recorder.replay(self._path, call_args)["response"]
+            if stream:
+                return ReplayStream([_to_attr(chunk) for chunk in response])
+            return _to_attr(response)
+
+        start = time.perf_counter()
+        result = invoke()
+        if stream:
+            chunks = [_serialize_response(chunk) for chunk in result]
+            recorder.record(self._path, call_args, chunks, time.perf_counter() - start)
+            return ReplayStream([_to_attr(chunk) for chunk in chunks])
+        recorder.record(self._path, call_args, _serialize_response(result), time.perf_counter() - start)
+        return result
+
+
+class ReplayBatch:
+    """Batch request stand-in that executes proxied requests one by one."""
+
+    def __init__(self, callback: Optional[Callable] = None):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback: Optional[Callable] = None, request_id: Optional[str] = None):
+        self._requests.append((request_id or str(len(self._requests) + 1), request, callback or self._callback))
+
+    def execute(self):
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = request.execute(), None
+            except Exception as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class ReplayHttpResponse:
+    """Minimal ``requests.Response`` stand-in built from a recording."""
+
+    def __init__(self, status_code: int, body: Any, headers: Dict, url: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.url = url
+        self._body = body
+
+    @property
+    def text(self) -> str:
+        return self._body if isinstance(self._body, str) else json.dumps(self._body)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self._body) if isinstance(self._body, str) else self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class ProviderHttp:
+    """``requests``-compatible GET that records or replays HTTP providers."""
+
+    def __init__(self, recorder: ProviderRecorder):
+        self._recorder = recorder
+        self._session = None
+
+    def get(self, url: str, params: Optional[Dict] = None, **kwargs):
+        args = {"url": url, "params": params or {}}
+        if self._recorder.mode == REPLAY:
+            try:
+                entry = self._recorder.replay("GET", args)
+            except InjectedProviderError:
+                return ReplayHttpResponse(503, {"message": "Injected failure"}, {}, url)
+            response = entry["response"]
+            return ReplayHttpResponse(response["status_code"], response["body"], response["headers"], url)
+
+        import requests
+        if self._session is None:
+            self._session = requests.Session()
+        start = time.perf_counter()
+        response = self._session.get(url, params=params, **kwargs)
+        if self._recorder.mode == RECORD:
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            self._recorder.record("GET", args, {
+                "status_code": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower().startswith(("x-api-quota", "content-type"))},
+                "body": body
+            }, time.perf_counter() - start)
+        return response
+
+
+_recorders: Dict[tuple, ProviderRecorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def get_recorder(provider: str) -> ProviderRecorder:
+    """Return the shared recorder for a provider, rebuilt whenever its configuration changes."""
+    mode = get_provider_mode()
+    fixtures_dir = os.getenv("MAMABEAR_FIXTURES_DIR", DEFAULT_FIXTURES_DIR)
+    config = (
+        provider,
+        mode,
+        fixtures_dir,
+        _provider_setting("MAMABEAR_REPLAY_LATENCY", provider, "recorded"),
+        _provider_setting("MAMABEAR_REPLAY_ERROR_RATE", provider, "0"),
+        os.getenv("MAMABEAR_REPLAY_SEED")
+    )
+    with _recorders_lock:
+        recorder = _recorders.get(config)
+        if recorder is None:
+            recorder = ProviderRecorder(provider, mode, fixtures_dir)
+            _recorders[config] = recorder
+        return recorder
+
+
+def provider_client(provider: str, factory: Callable[[], Any], terminal: str = "call") -> Any:
+    """
+    Build a provider client according to the configured provider mode.
+
+    Args:
+        provider: Fixture name, e.g. "groq", "openai", "gemini" or "calendar"
+        factory: Creates the real client; not called in replay mode
+        terminal: "call" for SDKs whose method calls hit the network,
+            "execute" for Google API clients whose requests run on ``execute()``
+
+    Returns:
+        The real client in live mode, otherwise a recording or replaying proxy
+    """
+    mode = get_provider_mode()
+    if mode == LIVE:
+        return factory()
+    target = factory() if mode == RECORD else None
+    return ProviderProxy(get_recorder(provider), target, "", terminal)
+
+
+def provider_http(provider: str):
+    """Return the ``requests``-compatible HTTP client for a provider."""
+    if get_provider_mode() == LIVE:
+        import requests
+        return requests
+    return ProviderHttp(get_recorder(provider))
@@ -4,15 +4,33 @@ import logging
 from typing import Dict, List, Optional
 import streamlit as st
 from src.utils.decorators import timeout
+from src.api.replay import is_replay, provider_http
+from src.utils.resource_registry import get_resource_registry
+from src.utils.metrics import increment, set_gauge
+from src.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+def record_quota(response):
+    """Track Spoonacular's daily points quota from the X-API-Quota response headers."""
+    headers = {key.lower(): value for key, value in (response.headers or {}).items()}
+    try:
+        if 'x-api-quota-request' in headers:
+            increment("quota_points", float(headers['x-api-quota-request']), provider="spoonacular")
+        if 'x-api-quota-used' in headers:
+            set_gauge("quota_used", float(headers['x-api-quota-used']), provider="spoonacular")
+        if 'x-api-quota-left' in headers:
+            set_gauge("quota_left", float(headers['x-api-quota-left']), provider="spoonacular")
+    except ValueError:
+        logger.debug("Unparseable Spoonacular quota headers")
+
 class SpoonacularClient:
     def __init__(self):
         self.api_key = os.getenv("SPOONACULAR_API_KEY")
-        if not self.api_key:
+        if not self.api_key and not is_replay():
             raise ValueError("SPOONACULAR_API_KEY not found in environment variables")
         self.base_url = "https://api.spoonacular.com"
+        self.http = provider_http("spoonacular")
 
     @timeout(30)
     def get_recipes_by_ingredients(
@@ -33,11 +51,15 @@ class SpoonacularClient:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json()
+            with span("spoonacular.search", provider="spoonacular", ingredients=len(ingredients), offset=offset) as call:
+                response = self.http.get(endpoint, params=params)
+                record_quota(response)
+                response.raise_for_status()
+                recipes = response.json()
+                call.set_attributes(bytes_received=len(response.content), results=len(recipes))
+            return recipes
         except requests.exceptions.RequestException as e:
-            logger.error(f"Spoonacular API error: {str(e)}")
+            logger.error("Spoonacular API error: %s", e)
             return []
 
     @timeout(30)
@@ -54,21 +76,19 @@ class SpoonacularClient:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json()
+            with span("spoonacular.information", provider="spoonacular", recipe_id=recipe_id) as call:
+                response = self.http.get(endpoint, params=params)
+                record_quota(response)
+                response.raise_for_status()
+                call.set_attribute("bytes_received", len(response.content))
+                return response.json()
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching recipe details: {str(e)}")
+            logger.error("Error fetching recipe details: %s", e)
             return None
 
-# Initialize a single client instance
-_client: Optional[SpoonacularClient] = None
-
 def get_client() -> SpoonacularClient:
-    global _client
-    if _client is None:
-        _client = SpoonacularClient()
-    return _client
+    """Return the shared client, rebuilt only when the API key changes."""
+    return get_resource_registry().get('spoonacular', SpoonacularClient, ["SPOONACULAR_API_KEY"])
 
 @timeout(30)
 def get_recipes_from_spoonacular(ingredients: List[str], max_recipes: int = 4, offset: int = 0) -> List[Dict]:
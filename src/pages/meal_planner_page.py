@@ -1,78 +1,109 @@
 import streamlit as st
-from datetime import datetime, timedelta
-import pytz
-import numpy as np
-import pandas as pd
-import plotly.figure_factory as ff
-import plotly.express as px
+from datetime import datetime
+import hashlib
+import json
 from src.services.meal_planner_service import initialize_meal_planner
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-def create_calendar_view(events, selected_slot=None):
-    """Create a Gantt chart calendar view using plotly."""
-    if not events:
-        return None
-        
-    # Prepare data for Gantt chart
-    df_dict = {
-        'Task': [],
-        'Start': [],
-        'Finish': [],
-        'Type': []  # To differentiate between existing events and selected slot
-    }
-    
-    # Add existing events
-    for event in events:
-        start = datetime.fromisoformat(event['start'].get('dateTime', event['start'].get('date'))).replace(tzinfo=pytz.UTC)
-        end = datetime.fromisoformat(event['end'].get('dateTime', event['end'].get('date'))).replace(tzinfo=pytz.UTC)
-        
-        df_dict['Task'].append(event.get('summary', 'Busy'))
-        df_dict['Start'].append(start)
-        df_dict['Finish'].append(end)
-        df_dict['Type'].append('existing')
-    
-    # Add selected slot if exists
+# Windows longer than this are drawn as busy hours per day by default
+DAY_LEVEL_WINDOW_DAYS = 14
+CALENDAR_COLORS = {
+    'existing': 'rgb(100, 149, 237)',  # Cornflower blue
+    'selected': 'rgb(255, 127, 80)'    # Coral
+}
+
+def event_intervals(events, selected_slot=None) -> Tuple[tuple, tuple, tuple, tuple]:
+    """Flatten events and the selected slot into parallel (task, start, finish, type) tuples of raw strings."""
+    tasks, starts, finishes, types = [], [], [], []
+    for event in events or []:
+        tasks.append(event.get('summary', 'Busy'))
+        starts.append(event['start'].get('dateTime', event['start'].get('date')))
+        finishes.append(event['end'].get('dateTime', event['end'].get('date')))
+        types.append('existing')
     if selected_slot:
-        start = datetime.fromisoformat(selected_slot['start'])
-        end = datetime.fromisoformat(selected_slot['end'])
-        df_dict['Task'].append('Selected Meal Prep')
-        df_dict['Start'].append(start)
-        df_dict['Finish'].append(end)
-        df_dict['Type'].append('selected')
-    
-    df = pd.DataFrame(df_dict)
-    
-    # Create color mapping
-    colors = {
-        'existing': 'rgb(100, 149, 237)',  # Cornflower blue
-        'selected': 'rgb(255, 127, 80)'    # Coral
-    }
-    
-    fig = ff.create_gantt(
-        df,
-        colors=colors,
-        index_col='Type',
-        show_colorbar=True,
-        group_tasks=True,
-        showgrid_x=True,
-        showgrid_y=True
-    )
-    
+        tasks.append('Selected Meal Prep')
+        starts.append(selected_slot['start'])
+        finishes.append(selected_slot['end'])
+        types.append('selected')
+    return tuple(tasks), tuple(starts), tuple(finishes), tuple(types)
+
+# cache_data hands every caller its own copy, so no session can mutate a figure another one shows
+@st.cache_data(max_entries=32, show_spinner=False)
+def _calendar_figure(digest: str, day_level: bool, _intervals: tuple):
+    """Cached ``build_calendar_figure``, keyed by the digest of the intervals."""
+    return build_calendar_figure(_intervals, day_level)
+
+def build_calendar_figure(intervals: tuple, day_level: bool = False):
+    """Build the calendar chart from ``event_intervals`` output without caching."""
+    # Plotting libraries are heavy, so they load on the first chart instead of at startup
+    import pandas as pd
+    import plotly.express as px
+
+    tasks, starts, finishes, types = intervals
+    df = pd.DataFrame({
+        'Task': tasks,
+        'Start': pd.to_datetime(pd.Series(starts, dtype=object), utc=True, format='ISO8601'),
+        'Finish': pd.to_datetime(pd.Series(finishes, dtype=object), utc=True, format='ISO8601'),
+        'Type': types
+    })
+
+    if day_level:
+        df['Day'] = df['Start'].dt.floor('D')
+        df['Hours'] = (df['Finish'] - df['Start']).dt.total_seconds() / 3600
+        daily = df.groupby(['Day', 'Type'], as_index=False)['Hours'].sum()
+        fig = px.bar(daily, x='Day', y='Hours', color='Type', color_discrete_map=CALENDAR_COLORS)
+        yaxis_title = 'Busy hours'
+    else:
+        fig = px.timeline(
+            df,
+            x_start='Start',
+            x_end='Finish',
+            y='Task',
+            color='Type',
+            color_discrete_map=CALENDAR_COLORS
+        )
+        fig.update_yaxes(autorange='reversed')
+        yaxis_title = 'Events'
+
     # Update layout
     fig.update_layout(
         title='Calendar View',
         height=400,
         xaxis_title='Date/Time',
-        yaxis_title='Events'
+        yaxis_title=yaxis_title,
+        showlegend=True
     )
-    
     return fig
 
+def create_calendar_view(events, selected_slot=None, day_level: bool = False):
+    """
+    Create a timeline chart of calendar events and the selected slot.
+
+    Timestamps are parsed in one vectorized pass and figures are cached by
+    a hash of the events and selected slot, so redraws after picking a slot
+    or rerunning the page are free.
+
+    Args:
+        events: Google Calendar event resources
+        selected_slot: Slot to highlight
+        day_level: Show busy hours per day instead of individual events
+
+    Returns:
+        Plotly figure, or None when there are no events
+    """
+    if not events:
+        return None
+
+    intervals = event_intervals(events, selected_slot)
+    digest = hashlib.sha256(json.dumps(intervals).encode('utf-8')).hexdigest()
+    return _calendar_figure(digest, day_level, intervals)
+
 def render_meal_planner_page(recipe_data=None):
     st.header("📅 Meal Planning")
     
-    # Initialize meal planner if recipe is selected
-    if not recipe_data:
+    # Initialize meal planner if a recipe, or recipes for a weekly plan, are selected
+    plan_recipes = st.session_state.get('plan_recipes')
+    if not recipe_data and not plan_recipes:
         st.warning("Please select a recipe first!")
         return
 
@@ -81,7 +112,7 @@ def render_meal_planner_page(recipe_data=None):
     with col2:
         planning_window = st.selectbox(
             "Planning Window",
-            options=[7, 14, 21],
+            options=[7, 14, 21, 30, 60, 90],
             format_func=lambda x: f"{x} days",
             help="Select how many days ahead to plan"
         )
@@ -92,101 +123,192 @@ def render_meal_planner_page(recipe_data=None):
             meal_planner = initialize_meal_planner()
             
             # Display recipe details
-            col1, col2 = st.columns([2, 1])
-            with col1:
-                st.subheader(f"Planning for: {recipe_data['title']}")
-                st.write(f"Preparation time: {recipe_data.get('readyInMinutes', 30)} minutes")
+            if recipe_data:
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    st.subheader(f"Planning for: {recipe_data['title']}")
+                    st.write(f"Preparation time: {recipe_data.get('readyInMinutes', 30)} minutes")
             
             status.update(label="Finding available time slots...", state="running")
             st.write("📅 Checking your calendar...")
             
-            # Get calendar events using selected planning window
-            now = datetime.now(pytz.UTC)
-            time_max = (now + timedelta(days=planning_window)).isoformat()
-            events_result = meal_planner.service.events().list(
-                calendarId='primary',
-                timeMin=now.isoformat(),
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            # Served from the shared event cache; only changed events are fetched
+            events = meal_planner.get_events(planning_window)
             
             st.write("⏳ Analyzing schedule...")
-            events = events_result.get('items', [])
             
             status.update(label="Calendar loaded!", state="complete")
 
         # Display current calendar
         st.subheader("Current Schedule")
-        calendar_fig = create_calendar_view(events)
+        day_level = st.toggle(
+            "Daily summary",
+            value=planning_window > DAY_LEVEL_WINDOW_DAYS,
+            help="Show busy hours per day instead of individual events"
+        )
+        st.session_state.calendar_day_level = day_level
+        calendar_fig = create_calendar_view(events, day_level=day_level)
         if calendar_fig:
             st.plotly_chart(calendar_fig, use_container_width=True)
         else:
             st.info("No events scheduled in the selected time period.")
 
+        calendar_ids = select_calendars(meal_planner)
+
+        if plan_recipes:
+            render_weekly_plan(meal_planner, plan_recipes, planning_window, calendar_ids)
+        if not recipe_data:
+            return
+
         # Find available time slots
         with st.spinner("Finding available time slots..."):
             available_slots = meal_planner.find_meal_prep_slots(
                 recipe_data,
-                days_ahead=planning_window
+                days_ahead=planning_window,
+                calendar_ids=calendar_ids
             )
 
         if not available_slots:
             st.warning(f"No available time slots found in the next {planning_window} days.")
             return
 
-        # Group and display available slots
-        st.subheader("Available Time Slots")
-        slots_by_date = {}
-        selected_slot = None
-        
-        for slot in available_slots:
-            start_time = datetime.fromisoformat(slot['start'])
-            date_key = start_time.strftime('%Y-%m-%d')
-            if date_key not in slots_by_date:
-                slots_by_date[date_key] = []
-            slots_by_date[date_key].append(slot)
+        render_slot_picker(meal_planner, recipe_data, events, available_slots)
+
+    except Exception as e:
+        st.error(f"Error in meal planner: {str(e)}")
+
+def render_weekly_plan(meal_planner, recipes: List[Dict], planning_window: int, calendar_ids: Optional[List[str]]):
+    """Plan several recipes at once and book them with one batched calendar write."""
+    st.subheader("🗓️ Weekly Plan")
+    meal_options = ["Breakfast", "Lunch", "Dinner"]
+
+    with st.form("weekly_plan"):
+        meal_types = {}
+        for recipe in recipes:
+            meal_types[recipe.get('id')] = st.selectbox(
+                f"{recipe.get('title', 'Recipe')} ({recipe.get('readyInMinutes', 30)} min)",
+                meal_options,
+                index=2,
+                key=f"plan_meal_{recipe.get('id')}"
+            )
+        max_prep = st.slider("Max prep time per day (minutes)", 30, 300, 120, step=15)
+        submitted = st.form_submit_button("Optimize Plan")
+
+    if submitted:
+        with st.spinner("Optimizing plan..."):
+            st.session_state.weekly_plan = meal_planner.plan_meals(
+                recipes,
+                days_ahead=planning_window,
+                calendar_ids=calendar_ids,
+                meal_types=meal_types,
+                max_prep_minutes_per_day=max_prep
+            )
+
+    plan = st.session_state.get('weekly_plan')
+    if not plan:
+        return
+
+    for assignment in plan['assignments']:
+        slot = assignment['slot']
+        st.write(f"**{slot['day']}** {slot['display_time']}: {assignment['meal_type']} - {assignment['recipe'].get('title')}")
+    for recipe in plan['unassigned']:
+        st.warning(f"No slot found for {recipe.get('title')}")
+
+    if plan['assignments'] and st.button("📅 Book Entire Plan"):
+        with st.status("Scheduling plan...", expanded=True) as status:
+            results = meal_planner.schedule_plan(plan['assignments'])
+            failed = [result for result in results if not result['success']]
+            for result in failed:
+                st.error(f"❌ {result['title']}: {result.get('error', 'Failed to schedule')}")
+            if failed:
+                status.update(label="Some sessions could not be scheduled", state="error")
+            else:
+                status.update(label="Plan scheduled!", state="complete")
+                st.success(f"✅ Scheduled {len(results)} meal prep sessions. Check your Google Calendar.")
+                st.session_state.weekly_plan = None
+
+def select_calendars(meal_planner) -> Optional[List[str]]:
+    """Let the user pick extra calendars (household, work) whose busy time slots must avoid.
 
-        # Add meal type selection
-        meal_type = st.selectbox("Meal Type", ["Breakfast", "Lunch", "Dinner"])
+    Returns None when only the primary calendar is selected.
+    """
+    if 'available_calendars' not in st.session_state:
+        try:
+            st.session_state.available_calendars = meal_planner.list_calendars()
+        except Exception:
+            st.session_state.available_calendars = []
 
-        for date_key, slots in slots_by_date.items():
-            date_obj = datetime.strptime(date_key, '%Y-%m-%d')
-            st.write(f"**{date_obj.strftime('%A, %B %d')}**")
+    calendars = st.session_state.available_calendars
+    if len(calendars) < 2:
+        return None
+
+    names = {calendar['id']: calendar['summary'] for calendar in calendars}
+    selected = st.multiselect(
+        "Check availability across calendars",
+        options=list(names),
+        default=['primary'] if 'primary' in names else [],
+        format_func=lambda calendar_id: names[calendar_id],
+        help="Slots avoid busy time in every selected calendar"
+    )
+    if not selected or selected == ['primary']:
+        return None
+    return selected
+
+@st.fragment
+def render_slot_picker(meal_planner, recipe_data, events, available_slots):
+    """Render the slot grid as a fragment so picking a slot reruns only the grid."""
+    # Group and display available slots
+    st.subheader("Available Time Slots")
+    slots_by_date = {}
+    selected_slot = None
+    
+    for slot in available_slots:
+        start_time = datetime.fromisoformat(slot['start'])
+        date_key = start_time.strftime('%Y-%m-%d')
+        if date_key not in slots_by_date:
+            slots_by_date[date_key] = []
+        slots_by_date[date_key].append(slot)
+
+    # Add meal type selection
+    meal_type = st.selectbox("Meal Type", ["Breakfast", "Lunch", "Dinner"])
+
+    for date_key, slots in slots_by_date.items():
+        date_obj = datetime.strptime(date_key, '%Y-%m-%d')
+        st.write(f"**{date_obj.strftime('%A, %B %d')}**")
+        
+        cols = st.columns(2)
+        for i, slot in enumerate(slots):
+            start_time = datetime.fromisoformat(slot['start'])
+            end_time = datetime.fromisoformat(slot['end'])
             
-            cols = st.columns(2)
-            for i, slot in enumerate(slots):
-                start_time = datetime.fromisoformat(slot['start'])
-                end_time = datetime.fromisoformat(slot['end'])
-                
-                with cols[i % 2]:
-                    slot_text = f"{start_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')} UTC"
-                    if st.button(f"📅 {slot_text}", key=f"slot_{date_key}_{i}"):
-                        selected_slot = slot
-                        selected_slot['meal_type'] = meal_type
-                        
-                        # Update calendar view with selected slot
-                        updated_fig = create_calendar_view(events, selected_slot)
-                        if updated_fig:
-                            st.plotly_chart(updated_fig, use_container_width=True)
-
-        # When scheduling a slot
-        if selected_slot:
-            with st.status("Scheduling meal prep...", expanded=True) as status:
-                st.write("📝 Creating calendar event...")
-                start_time = datetime.fromisoformat(selected_slot['start'])
-                success = meal_planner.schedule_meal_prep(
-                    recipe=recipe_data,
-                    start_time=start_time,
-                    meal_type=selected_slot['meal_type']
-                )
-                
-                if success:
-                    status.update(label="Successfully scheduled!", state="complete")
-                    st.success(f"✅ {meal_type} meal prep scheduled! Check your Google Calendar.")
-                else:
-                    status.update(label="Scheduling failed", state="error")
-                    st.error("❌ Failed to schedule meal prep. Please try again.")
+            with cols[i % 2]:
+                slot_text = f"{start_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')} UTC"
+                if st.button(f"📅 {slot_text}", key=f"slot_{date_key}_{i}"):
+                    selected_slot = dict(slot, meal_type=meal_type)
+                    
+                    # Update calendar view with selected slot
+                    updated_fig = create_calendar_view(
+                        events,
+                        selected_slot,
+                        day_level=st.session_state.get('calendar_day_level', False)
+                    )
+                    if updated_fig:
+                        st.plotly_chart(updated_fig, use_container_width=True)
 
-    except Exception as e:
-        st.error(f"Error in meal planner: {str(e)}")
\ No newline at end of file
+    # When scheduling a slot
+    if selected_slot:
+        with st.status("Scheduling meal prep...", expanded=True) as status:
+            st.write("📝 Creating calendar event...")
+            start_time = datetime.fromisoformat(selected_slot['start'])
+            success = meal_planner.schedule_meal_prep(
+                recipe=recipe_data,
+                start_time=start_time,
+                meal_type=selected_slot['meal_type']
+            )
+            
+            if success:
+                status.update(label="Successfully scheduled!", state="complete")
+                st.success(f"✅ {meal_type} meal prep scheduled! Check your Google Calendar.")
+            else:
+                status.update(label="Scheduling failed", state="error")
+                st.error("❌ Failed to schedule meal prep. Please try again.")
\ No newline at end of file
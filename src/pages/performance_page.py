@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import streamlit as st
+from typing import Dict, List, Optional
+from src.utils.metrics import get_metrics
+from src.utils.artifact_store import get_artifact_store
+from src.services.job_queue import get_analysis_queue
+
+def process_memory_mb() -> Optional[float]:
+    """Current resident memory of the process in MB, where /proc reports it."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def hit_rates(lookups: List[Dict]) -> List[Dict]:
+    """Combine hit and miss counters into one row per cache."""
+    caches = {}
+    for row in lookups:
+        counts = caches.setdefault(row['cache'], {'hit': 0, 'miss': 0})
+        counts[row['result']] = counts.get(row['result'], 0) + row['value']
+    return [
+        {
+            'Cache': cache,
+            'Hits': int(counts['hit']),
+            'Misses': int(counts['miss']),
+            'Hit rate': f"{counts['hit'] / (counts['hit'] + counts['miss']):.0%}" if counts['hit'] + counts['miss'] else '-'
+        }
+        for cache, counts in sorted(caches.items())
+    ]
+
+def latency_rows(histograms: List[Dict]) -> List[Dict]:
+    """Latency percentiles per provider and stage, slowest p90 first."""
+    rows = [
+        {
+            'Provider': row.get('provider', 'internal'),
+            'Stage': row.get('stage'),
+            'Calls': row['count'],
+            'p50 ms': round(row['p50'], 1),
+            'p90 ms': round(row['p90'], 1),
+            'p99 ms': round(row['p99'], 1),
+            'Max ms': round(row['max'], 1)
+        }
+        for row in histograms if row['count']
+    ]
+    return sorted(rows, key=lambda row: row['p90 ms'], reverse=True)
+
+def failure_rows(errors: List[Dict], timeouts: List[Dict]) -> List[Dict]:
+    """Errors and timeouts per provider and stage."""
+    rows = {}
+    for name, series in (('Errors', errors), ('Timeouts', timeouts)):
+        for row in series:
+            key = (row.get('provider', 'internal'), row.get('stage'))
+            rows.setdefault(key, {'Provider': key[0], 'Stage': key[1], 'Errors': 0, 'Timeouts': 0})[name] += int(row['value'])
+    return sorted(rows.values(), key=lambda row: (-row['Errors'], row['Provider']))
+
+def render_performance_page():
+    """Render live process metrics collected by the in-process metrics registry."""
+    st.header("📈 Performance")
+
+    if st.toggle("Auto-refresh", value=False, help="Refresh the metrics every 5 seconds"):
+        st.fragment(run_every=5)(render_metrics)()
+    else:
+        render_metrics()
+
+def render_metrics():
+    metrics = get_metrics()
+    queue = get_analysis_queue().stats()
+    store = get_artifact_store().stats()
+    memory = process_memory_mb()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Threads", threading.active_count())
+    col2.metric("Resident memory", f"{memory:.0f} MB" if memory is not None else "n/a")
+    col3.metric("Sessions with artifacts", store['sessions'])
+    col4.metric("Uptime", f"{(time.time() - metrics.started_at) / 60:.0f} min")
+
+    st.subheader("Latency by provider and stage")
+    latency = latency_rows(metrics.histograms("latency_ms"))
+    if latency:
+        st.dataframe(latency, use_container_width=True, hide_index=True)
+    else:
+        st.info("No requests recorded yet.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Cache hit rates")
+        caches = hit_rates(metrics.counters("cache_lookups"))
+        if caches:
+            st.dataframe(caches, use_container_width=True, hide_index=True)
+        else:
+            st.info("No cache lookups yet.")
+    with col2:
+        st.subheader("Errors and timeouts")
+        failures = failure_rows(metrics.counters("errors"), metrics.counters("timeouts"))
+        if failures:
+            st.dataframe(failures, use_container_width=True, hide_index=True)
+        else:
+            st.success("No errors recorded.")
+
+    st.subheader("Analysis workers")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Running", f"{queue['running']} / {queue['max_workers']}")
+    col2.metric("Queued", f"{queue['queued']} / {queue['max_pending']}")
+    col3.metric("Rejected", queue['rejected'])
+    waits = metrics.histograms("queue_wait_ms")
+    col4.metric("Queue wait p90", f"{waits[0]['p90']:.0f} ms" if waits and waits[0]['count'] else "n/a")
+
+    st.subheader("Quota consumption")
+    quota = (
+        [{'Provider': row['provider'], 'Metric': 'points used by this process', 'Value': row['value']}
+         for row in metrics.counters("quota_points")] +
+        [{'Provider': row['provider'], 'Metric': 'used today', 'Value': row['value']}
+         for row in metrics.gauges("quota_used")] +
+        [{'Provider': row['provider'], 'Metric': 'left today', 'Value': row['value']}
+         for row in metrics.gauges("quota_left")] +
+        [{'Provider': row['provider'], 'Metric': row['kind'].replace('_', ' '), 'Value': row['value']}
+         for row in metrics.counters("tokens")]
+    )
+    if quota:
+        st.dataframe(quota, use_container_width=True, hide_index=True)
+    else:
+        st.info("No quota usage recorded yet.")
+
+    st.subheader("Memory per session")
+    st.caption(f"Artifact store: {store['total_bytes'] / 1024:.0f} KB of {store['max_bytes'] / 1024:.0f} KB, "
+               f"{store['evictions']} evictions, {store['expired_sessions']} idle sessions released")
+    sessions = [
+        {'Session': session_id[:8], 'KB': round(usage['bytes'] / 1024, 1), 'Shared KB': round(usage['shared_bytes'] / 1024, 1)}
+        for session_id, usage in store['per_session'].items()
+    ]
+    if sessions:
+        st.dataframe(sorted(sessions, key=lambda row: -row['KB']), use_container_width=True, hide_index=True)
+    else:
+        st.info("No session artifacts stored.")
@@ -1,13 +1,16 @@
+import hashlib
 import streamlit as st
-from src.utils.image_processing import process_image
-from src.services.image_analysis_service import analyze_fridge_image
-from src.services.recipe_service import get_recipes_from_spoonacular
 from src.ui.components import create_recipe_card
 from src.api.spoonacular_client import (
     get_recipes_from_spoonacular,
     get_recipe_information,
     initialize_spoonacular_client
 )
+from src.services.thumbnail_service import get_recipe_thumbnail
+from src.services.recipe_service import get_recipe_service
+from src.utils.artifact_store import get_artifact_store
+from src.utils.streamlit_context import get_session_id
+from src.services.job_queue import DONE, QUEUED, QueueFullError, get_analysis_queue
 
 @st.cache_resource
 def preload_components():
@@ -24,6 +27,17 @@ def preload_components():
         }
     }
 
+def get_artifact(name: str):
+    """Read an analysis artifact for the current session from the shared artifact store."""
+    return get_artifact_store().get(get_session_id(), name)
+
+def set_artifact(name: str, value):
+    """Store an analysis artifact for the current session, or drop it when value is None."""
+    if value is None:
+        get_artifact_store().delete(get_session_id(), name)
+    else:
+        get_artifact_store().put(get_session_id(), name, value)
+
 def render_recipe_page(apis):
     """Render the recipe analysis and suggestion page."""
     # Preload components at start
@@ -32,16 +46,6 @@ def render_recipe_page(apis):
     
     st.header("🔍 Recipe Analysis")
     
-    # Initialize session state variables if they don't exist
-    if 'current_analysis' not in st.session_state:
-        st.session_state.current_analysis = None
-    if 'current_annotated_image' not in st.session_state:
-        st.session_state.current_annotated_image = None
-    if 'current_items_info' not in st.session_state:
-        st.session_state.current_items_info = None
-    if 'current_recipes' not in st.session_state:
-        st.session_state.current_recipes = None
-    
     # Image upload section
     uploaded_file = st.file_uploader(
         "📸 Upload an image of your fridge", 
@@ -50,57 +54,89 @@ def render_recipe_page(apis):
     )
     
     if uploaded_file:
-        # Create a loading container with multiple status updates
-        with st.status("Processing your image...", expanded=True) as status:
-            st.write("Initializing analysis...")
-            temp_path = process_image(uploaded_file)
-            
-            if temp_path:
-                try:
-                    # Update status for each major step
-                    status.update(label="Analyzing image...", state="running")
-                    st.write("🔍 Detecting items...")
-                    analysis_result, annotated_image, items_info = analyze_fridge_image(temp_path)
-                    
-                    if analysis_result and items_info:
-                        status.update(label="Storing results...", state="running")
-                        st.write("💾 Saving analysis...")
-                        # Store results in session state
-                        st.session_state.current_analysis = analysis_result
-                        st.session_state.current_annotated_image = annotated_image
-                        st.session_state.current_items_info = items_info
-                        
-                        # Clear previous recipes
-                        st.session_state.current_recipes = None
-                        status.update(label="Analysis complete!", state="complete")
-                finally:
-                    try:
-                        import os
-                        os.remove(temp_path)
-                    except:
-                        pass
+        image_data = uploaded_file.getvalue()
+        image_hash = hashlib.sha256(image_data).hexdigest()
+        
+        # Only a new image starts a job; reruns with the same upload keep polling the existing one
+        if st.session_state.get('analysis_image_hash') != image_hash:
+            # Gemini and its dependencies load on the first analysis, not at page load
+            from src.services.image_analysis_service import submit_fridge_analysis
+            try:
+                job = submit_fridge_analysis(image_data, key=image_hash)
+                st.session_state.analysis_image_hash = image_hash
+                st.session_state.analysis_job_id = job.id
+            except QueueFullError:
+                st.warning("⏳ We're analyzing a lot of fridges right now. Please try again in a moment.")
+    
+    if st.session_state.get('analysis_error'):
+        st.error(st.session_state.pop('analysis_error'))
+    
+    if st.session_state.get('analysis_job_id'):
+        render_analysis_progress()
     
     # Display stored analysis results if they exist
-    if st.session_state.current_analysis and st.session_state.current_annotated_image:
+    current_analysis = get_artifact('analysis')
+    annotated_image = get_artifact('annotated_image')
+    if current_analysis and annotated_image:
         # Display results in columns
         col1, col2 = st.columns(2)
         
         with col1:
-            st.image(st.session_state.current_annotated_image, caption="Analyzed Fridge Contents")
+            # Already JPEG-encoded, so st.image does not re-encode it on each rerun
+            st.image(annotated_image, caption="Analyzed Fridge Contents")
         
         with col2:
             st.markdown("### 📝 Detected Items:")
-            st.write(st.session_state.current_analysis)
+            st.write(current_analysis)
         
         # Display recipe suggestions
         st.markdown("### 🍳 Recommended Recipes")
-        display_recipes(st.session_state.current_items_info, apis['groq'])
+        display_recipes(get_artifact('items_info') or {})
         
         # Add meal planning button
         if st.button("📅 Plan These Meals"):
+            # Full recipe details carry the cooking times the weekly planner needs
+            st.session_state.plan_recipes = [
+                load_recipe_information(recipe['id']) or recipe
+                for recipe in get_artifact('recipes') or []
+            ]
+            st.session_state.weekly_plan = None
             st.session_state.page = "Meal Planning"
 
-def display_recipes(items_info, groq_client):
+@st.fragment(run_every=1.0)
+def render_analysis_progress():
+    """Poll the background analysis job and store its results once it finishes."""
+    if not st.session_state.get('analysis_job_id'):
+        return
+    job = get_analysis_queue().get(st.session_state.analysis_job_id)
+    if job is None:
+        # Job expired before its results were collected
+        st.session_state.analysis_job_id = None
+        st.session_state.analysis_image_hash = None
+        st.rerun()
+        return
+    
+    if not job.finished:
+        label = job.message or ("Waiting for a free analyzer..." if job.status == QUEUED else "Analyzing image...")
+        st.progress(job.progress, text=f"🔍 {label}")
+        return
+    
+    if job.status == DONE and job.result['analysis'] and job.result['items_info']:
+        # Store compressed results in the shared artifact store, not session state
+        set_artifact('analysis', job.result['analysis'])
+        set_artifact('annotated_image', job.result['annotated_image'])
+        set_artifact('items_info', job.result['items_info'])
+        
+        # Clear previous recipes
+        set_artifact('recipes', None)
+    else:
+        # Failed jobs carry a user-facing message from the analysis service
+        st.session_state.analysis_error = job.error or "Could not analyze the image. Please try again."
+    
+    st.session_state.analysis_job_id = None
+    st.rerun()
+
+def display_recipes(items_info):
     """Display recipe cards in a grid layout with lazy loading."""
     # Add custom CSS to reduce padding and margins
     st.markdown("""
@@ -122,7 +158,7 @@ def display_recipes(items_info, groq_client):
         </style>
     """, unsafe_allow_html=True)
 
-    if st.session_state.current_recipes is None:
+    if get_artifact('recipes') is None:
         ingredients_key = tuple(sorted(items_info.keys()))
         
         # Create a loading container for recipe search
@@ -132,105 +168,164 @@ def display_recipes(items_info, groq_client):
             
             if recipes:
                 st.write(f"✅ Found {len(recipes)} matching recipes!")
-                st.session_state.current_recipes = recipes
+                set_artifact('recipes', recipes)
                 status.update(label="Recipes found!", state="complete")
             else:
                 status.update(label="No recipes found", state="error")
     
-    if st.session_state.current_recipes:
-        # Add a progress bar for recipe card generation
-        progress_text = "Generating recipe cards..."
-        recipe_count = len(st.session_state.current_recipes)
-        progress_bar = st.progress(0, text=progress_text)
-        
+    recipes = get_artifact('recipes')
+    if recipes:
+        # Each card is its own fragment, so interacting with one card reruns only that card
         cols = st.columns(2)
-        for idx, recipe in enumerate(st.session_state.current_recipes):
+        for idx, recipe in enumerate(recipes):
             with cols[idx % 2]:
-                # Update progress
-                progress = (idx + 1) / recipe_count
-                progress_bar.progress(progress, text=f"Generating recipe {idx + 1} of {recipe_count}")
-                
-                # Get complete recipe information from Spoonacular
-                recipe_details = get_recipe_information(recipe['id'])
-                
-                # Display recipe image and title
-                st.image(recipe.get('image', ''), use_container_width=True)
-                st.markdown(f"### {recipe['title']}")
-                
-                # Basic info in columns
-                info_col1, info_col2 = st.columns(2)
-                with info_col1:
-                    st.markdown("🔥 **Calories:** " + 
-                        (f"{recipe_details.get('nutrition', {}).get('nutrients', [{}])[0].get('amount', 'Not')} kcal" 
-                         if recipe_details and 'nutrition' in recipe_details 
-                         else "Not available"))
-                    st.markdown("⏱️ **Time:** " + 
-                        (f"{recipe_details.get('readyInMinutes', 'Not specified')} mins" 
-                         if recipe_details 
-                         else "Not specified mins"))
-                    st.markdown("💰 **Price:** $" + 
-                        (f"{recipe_details.get('pricePerServing', 'N/A')}/serving" 
-                         if recipe_details 
-                         else "N/A/serving"))
-                
-                with info_col2:
-                    st.markdown("🥗 **Dietary:** " + 
-                        (', '.join(recipe_details.get('diets', ['Not specified'])) 
-                         if recipe_details and recipe_details.get('diets') 
-                         else "Not specified"))
-                    st.markdown("🌎 **Cuisine:** " + 
-                        (', '.join(recipe_details.get('cuisines', ['Not specified'])) 
-                         if recipe_details and recipe_details.get('cuisines') 
-                         else "Not specified"))
-                    st.markdown("📊 **Difficulty:** " + 
-                        (get_difficulty_level(recipe_details) 
-                         if recipe_details 
-                         else "Not specified"))
-                
-                # Ingredients section
-                st.markdown("#### 🧂 Ingredients")
-                ing_col1, ing_col2 = st.columns(2)
-                with ing_col1:
-                    st.markdown("**Available:**\n" + 
-                        ', '.join([ing['name'] for ing in recipe.get('usedIngredients', []) 
-                                 if isinstance(ing, dict) and 'name' in ing]) or 'None')
-                
-                with ing_col2:
-                    st.markdown("**Missing:**\n" + 
-                        ', '.join([ing['name'] for ing in recipe.get('missedIngredients', []) 
-                                 if isinstance(ing, dict) and 'name' in ing]) or 'None')
-                
-                # Instructions in compact expander
-                with st.expander("📝 Instructions"):
-                    st.markdown(recipe_details.get('instructions', 'Instructions not available'))
-                
-                # Schedule button
-                if st.button(f"📅 Schedule {recipe['title']}", key=f"schedule_{recipe['id']}"):
-                    st.session_state.selected_recipe = recipe_details
-                    st.session_state.page = "Meal Planning"
-                    st.rerun()
-                
-                # Add a small divider between recipes
-                st.markdown("---")
+                render_recipe_card(recipe)
         
-        # Add "Load More" button centered at the bottom
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button("🔄 Load More Recipes", key="load_more"):
-                with st.spinner("Finding more recipes..."):
-                    more_recipes = get_recipes_from_spoonacular(
-                        ingredients_key,
-                        max_recipes=4,
-                        offset=len(st.session_state.current_recipes)
-                    )
-                    if more_recipes:
-                        st.session_state.current_recipes.extend(more_recipes)
-                        st.rerun()
-                    else:
-                        st.info("No more recipes found with these ingredients.")
+        render_load_more(items_info)
     else:
         st.warning("No recipes found. Try with different ingredients.")
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_recipe_information(recipe_id: int) -> dict:
+    details = get_recipe_information(recipe_id)
+    if not details:
+        # Raising keeps st.cache_data from storing the failure for an hour
+        raise LookupError(f"No information for recipe {recipe_id}")
+    return details
+
+def load_recipe_information(recipe_id: int) -> dict:
+    """Fetch complete recipe information from Spoonacular, shared across sessions and reruns.
+
+    Returns an empty dict if the request fails; failures are not cached, so
+    the next call tries again.
+    """
+    try:
+        return _fetch_recipe_information(recipe_id)
+    except (LookupError, TimeoutError):
+        return {}
+
+def build_recipe_card_data(recipe: dict, recipe_details: dict) -> dict:
+    """Assemble the display values for a recipe card."""
+    return {
+        'calories': (f"{recipe_details.get('nutrition', {}).get('nutrients', [{}])[0].get('amount', 'Not')} kcal"
+                     if recipe_details and 'nutrition' in recipe_details
+                     else "Not available"),
+        'time': (f"{recipe_details.get('readyInMinutes', 'Not specified')} mins"
+                 if recipe_details
+                 else "Not specified mins"),
+        'price': (f"{recipe_details.get('pricePerServing', 'N/A')}/serving"
+                  if recipe_details
+                  else "N/A/serving"),
+        'dietary': (', '.join(recipe_details.get('diets', ['Not specified']))
+                    if recipe_details and recipe_details.get('diets')
+                    else "Not specified"),
+        'cuisine': (', '.join(recipe_details.get('cuisines', ['Not specified']))
+                    if recipe_details and recipe_details.get('cuisines')
+                    else "Not specified"),
+        'difficulty': (get_difficulty_level(recipe_details)
+                       if recipe_details
+                       else "Not specified"),
+        'available': ', '.join([ing['name'] for ing in recipe.get('usedIngredients', [])
+                                if isinstance(ing, dict) and 'name' in ing]) or 'None',
+        'missing': ', '.join([ing['name'] for ing in recipe.get('missedIngredients', [])
+                              if isinstance(ing, dict) and 'name' in ing]) or 'None',
+        'instructions': recipe_details.get('instructions') if recipe_details else None
+    }
+
+@st.fragment
+def render_recipe_card(recipe: dict):
+    """Render one recipe card as an independently rerunnable fragment."""
+    # Get complete recipe information from Spoonacular
+    recipe_details = load_recipe_information(recipe['id'])
+    card = build_recipe_card_data(recipe, recipe_details)
+    
+    # Display recipe image (served from the local thumbnail cache) and title
+    image_url = recipe.get('image', '')
+    st.image(get_recipe_thumbnail(image_url) or image_url, use_container_width=True)
+    st.markdown(f"### {recipe['title']}")
+    
+    # Basic info in columns
+    info_col1, info_col2 = st.columns(2)
+    with info_col1:
+        st.markdown("🔥 **Calories:** " + card['calories'])
+        st.markdown("⏱️ **Time:** " + card['time'])
+        st.markdown("💰 **Price:** $" + card['price'])
+    
+    with info_col2:
+        st.markdown("🥗 **Dietary:** " + card['dietary'])
+        st.markdown("🌎 **Cuisine:** " + card['cuisine'])
+        st.markdown("📊 **Difficulty:** " + card['difficulty'])
+    
+    # Ingredients section
+    st.markdown("#### 🧂 Ingredients")
+    ing_col1, ing_col2 = st.columns(2)
+    with ing_col1:
+        st.markdown("**Available:**\n" + card['available'])
+    
+    with ing_col2:
+        st.markdown("**Missing:**\n" + card['missing'])
+    
+    # Instructions in compact expander
+    with st.expander("📝 Instructions"):
+        if card['instructions']:
+            st.markdown(card['instructions'])
+        else:
+            render_generated_instructions(recipe)
+    
+    # Schedule button switches pages, so it reruns the whole app
+    if st.button(f"📅 Schedule {recipe['title']}", key=f"schedule_{recipe['id']}"):
+        st.session_state.selected_recipe = recipe_details
+        st.session_state.page = "Meal Planning"
+        st.rerun()
+    
+    # Add a small divider between recipes
+    st.markdown("---")
+
+def render_generated_instructions(recipe: dict):
+    """Generate instructions Spoonacular lacks, only when asked, streaming them as they arrive.
+
+    Generation goes through the recipe service, so it falls back to another
+    provider when the fastest one is down.
+    """
+    state_key = f"generated_instructions_{recipe['id']}"
+    if st.session_state.get(state_key):
+        st.markdown(st.session_state[state_key])
+        return
+    if not st.button("✨ Generate instructions", key=f"generate_{recipe['id']}"):
+        return
+
+    # Streamed into a placeholder so a failed stream leaves no partial text behind
+    placeholder = st.empty()
+    try:
+        stream = get_recipe_service().stream_recipe_details(recipe)
+        if stream is None:
+            raise ValueError("No recipe provider available")
+        with placeholder.container():
+            st.session_state[state_key] = st.write_stream(stream)
+    except Exception:
+        placeholder.empty()
+        st.markdown('Instructions not available')
+
+@st.fragment
+def render_load_more(items_info):
+    """Render the "Load More" button; only a successful load reruns the full page."""
+    ingredients_key = tuple(sorted(items_info.keys()))
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if st.button("🔄 Load More Recipes", key="load_more"):
+            with st.spinner("Finding more recipes..."):
+                recipes = get_artifact('recipes') or []
+                more_recipes = get_recipes_from_spoonacular(
+                    ingredients_key,
+                    max_recipes=4,
+                    offset=len(recipes)
+                )
+                if more_recipes:
+                    set_artifact('recipes', recipes + more_recipes)
+                    st.rerun()
+                else:
+                    st.info("No more recipes found with these ingredients.")
+
 def get_difficulty_level(recipe_details: dict) -> str:
     """Calculate difficulty level based on recipe attributes."""
     if not recipe_details:
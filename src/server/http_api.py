@@ -0,0 +1,332 @@
+import warnings
+warnings.filterwarnings('ignore', message='.*missing ScriptRunContext.*')
+
+import base64
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+import pytz
+
+from src.api.replay import is_replay
+from src.services.job_queue import DONE, QueueFullError, get_analysis_queue
+from src.utils.metrics import get_metrics
+from src.utils.resource_registry import get_resource_registry
+from src.utils.tracing import propagate, span
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+MAX_BATCH_ITEMS = 32
+# Spoonacular returns at most 100 results and pages no further than offset 900
+MAX_RECIPES = 100
+MAX_RECIPE_OFFSET = 900
+MAX_COOKING_MINUTES = 24 * 60
+MAX_DAYS_AHEAD = 90
+
+# Fans batch items out over the same provider clients the UI uses
+_batch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="api-batch")
+
+
+class ApiError(Exception):
+    """An error reported to the client with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _require(body: Dict, field: str, kind: type) -> Any:
+    value = body.get(field)
+    if not isinstance(value, kind):
+        raise ApiError(400, f"'{field}' must be a {kind.__name__}")
+    return value
+
+
+def _int_param(body: Dict, field: str, default: int, minimum: int, maximum: int) -> int:
+    value = body.get(field, default)
+    if isinstance(value, bool):
+        raise ApiError(400, f"'{field}' must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"'{field}' must be an integer")
+    if not minimum <= value <= maximum:
+        raise ApiError(400, f"'{field}' must be between {minimum} and {maximum}")
+    return value
+
+
+def _batch_items(body: Dict, field: str) -> List[Any]:
+    items = _require(body, field, list)
+    if not items:
+        raise ApiError(400, f"'{field}' must not be empty")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise ApiError(400, f"At most {MAX_BATCH_ITEMS} items per batch")
+    return items
+
+
+def _run_batch(items: List[Any], handler: Callable[[Any], Any]) -> List[Dict[str, Any]]:
+    """Run ``handler`` for every item concurrently, reporting failures per item."""
+    def run(item):
+        try:
+            return {"result": handler(item)}
+        except ApiError as e:
+            return {"error": e.message, "status": e.status}
+        except Exception as e:
+            logger.error("Batch item failed: %s", e)
+            return {"error": str(e), "status": 500}
+
+    # Item spans nest under the request span
+    return list(_batch_executor.map(propagate(run), items))
+
+
+def _groq_client():
+    from src.api.groq_client import initialize_groq_client
+    return get_resource_registry().get('groq', initialize_groq_client, ["GROQ_API_KEY"])
+
+
+def _decode_image(value: Any) -> bytes:
+    if not isinstance(value, str):
+        raise ApiError(400, "'image' must be a base64 string")
+    try:
+        return base64.b64decode(value, validate=True)
+    except ValueError:
+        raise ApiError(400, "'image' is not valid base64")
+
+
+def _job_payload(job) -> Dict[str, Any]:
+    payload = job.to_dict()
+    if job.status == DONE:
+        result = job.result
+        payload["result"] = {
+            "analysis": result["analysis"],
+            "items_info": result["items_info"],
+            "annotated_image": base64.b64encode(result["annotated_image"]).decode("ascii")
+        }
+    return payload
+
+
+def submit_analysis(image: Any) -> Dict[str, Any]:
+    from src.services.image_analysis_service import submit_fridge_analysis
+
+    try:
+        job = submit_fridge_analysis(_decode_image(image))
+    except QueueFullError as e:
+        raise ApiError(429, str(e))
+    return _job_payload(job)
+
+
+def handle_analyze(body: Dict) -> Dict[str, Any]:
+    return submit_analysis(body.get("image"))
+
+
+def handle_analyze_batch(body: Dict) -> Dict[str, Any]:
+    return {"items": _run_batch(_batch_items(body, "images"), submit_analysis)}
+
+
+def handle_job(job_id: str) -> Dict[str, Any]:
+    job = get_analysis_queue().get(job_id)
+    if job is None:
+        raise ApiError(404, f"Unknown job: {job_id}")
+    return _job_payload(job)
+
+
+def search_recipes(query: Any) -> List[Dict]:
+    from src.api.spoonacular_client import get_recipes_from_spoonacular
+
+    if not isinstance(query, dict):
+        raise ApiError(400, "Each search must be an object")
+    ingredients = _require(query, "ingredients", list)
+    return get_recipes_from_spoonacular(
+        tuple(sorted(str(item) for item in ingredients)),
+        max_recipes=_int_param(query, "max_recipes", 4, 1, MAX_RECIPES),
+        offset=_int_param(query, "offset", 0, 0, MAX_RECIPE_OFFSET)
+    )
+
+
+def handle_search(body: Dict) -> Dict[str, Any]:
+    return {"recipes": search_recipes(body)}
+
+
+def handle_search_batch(body: Dict) -> Dict[str, Any]:
+    return {"items": _run_batch(_batch_items(body, "searches"), search_recipes)}
+
+
+def handle_details(body: Dict) -> Dict[str, Any]:
+    from src.services.recipe_service import get_recipe_service
+
+    recipe = _require(body, "recipe", dict)
+    # Routed like the UI: fastest healthy provider first, with fallback
+    try:
+        details = get_recipe_service().get_recipe_details(recipe, refresh=bool(body.get("refresh")))
+    except (KeyError, TypeError):
+        raise ApiError(400, "Recipe needs a 'title' and ingredients with 'original' text")
+    if details is None:
+        raise ApiError(502, "No recipe provider could generate details")
+    return {"details": details}
+
+
+def handle_details_batch(body: Dict) -> Dict[str, Any]:
+    from src.api.groq_client import generate_recipe_details_batch
+
+    recipes = _batch_items(body, "recipes")
+    if not all(isinstance(recipe, dict) for recipe in recipes):
+        raise ApiError(400, "Each recipe must be an object")
+    # One combined completion covers every uncached recipe
+    details = generate_recipe_details_batch(_groq_client(), recipes, refresh=bool(body.get("refresh")))
+    return {"items": [
+        {"result": item} if item is not None
+        else {"error": "Recipe needs a 'title' and ingredients with 'original' text", "status": 400}
+        for item in details
+    ]}
+
+
+def find_slots(query: Any) -> List[Dict]:
+    from src.services.meal_planner_service import compute_meal_prep_slots
+
+    if not isinstance(query, dict):
+        raise ApiError(400, "Each slot query must be an object")
+    events = query.get("events", [])
+    if not isinstance(events, list):
+        raise ApiError(400, "'events' must be a list")
+
+    if query.get("now"):
+        try:
+            now = datetime.fromisoformat(query["now"])
+        except (TypeError, ValueError):
+            raise ApiError(400, "'now' must be an ISO 8601 timestamp")
+        if now.tzinfo is None:
+            now = pytz.UTC.localize(now)
+    else:
+        # Same lead time as the meal planner page
+        now = datetime.now(pytz.UTC) + timedelta(minutes=5)
+
+    cooking_time = _int_param(query, "cooking_time", 30, 1, MAX_COOKING_MINUTES)
+    days_ahead = _int_param(query, "days_ahead", 7, 1, MAX_DAYS_AHEAD)
+    try:
+        return compute_meal_prep_slots(events, cooking_time, days_ahead, now)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ApiError(400, f"Invalid events: {str(e)}")
+
+
+def handle_slots(body: Dict) -> Dict[str, Any]:
+    return {"slots": find_slots(body)}
+
+
+def handle_slots_batch(body: Dict) -> Dict[str, Any]:
+    return {"items": _run_batch(_batch_items(body, "queries"), find_slots)}
+
+
+def handle_health() -> Dict[str, Any]:
+    from src.services.recipe_service import get_recipe_service
+    from src.services.provider_router import get_provider_router
+
+    return {
+        "status": "ok",
+        "replay": is_replay(),
+        "providers": get_recipe_service().get_health(),
+        "router": get_provider_router().snapshot(),
+        "analysis_queue": get_analysis_queue().stats(),
+        "resources": get_resource_registry().stats()
+    }
+
+
+def handle_metrics() -> Dict[str, Any]:
+    return get_metrics().snapshot()
+
+
+POST_ROUTES = {
+    "/v1/analyze": handle_analyze,
+    "/v1/analyze:batch": handle_analyze_batch,
+    "/v1/recipes/search": handle_search,
+    "/v1/recipes/search:batch": handle_search_batch,
+    "/v1/recipes/details": handle_details,
+    "/v1/recipes/details:batch": handle_details_batch,
+    "/v1/slots": handle_slots,
+    "/v1/slots:batch": handle_slots_batch
+}
+
+JOB_PATH = re.compile(r"^/v1/jobs/([0-9a-f]+)$")
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """JSON request handler; every response body is a JSON object."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MamaBear"
+
+    def _send(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "Content-Length must be an integer")
+        if length < 0:
+            raise ApiError(400, "Content-Length must not be negative")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ApiError(400, "Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Request body must be a JSON object")
+        return body
+
+    def _dispatch(self, route: str, handler: Callable[[], Dict[str, Any]], status: int = 200):
+        # Spans, and the latency series derived from them, are named by route template
+        with span(f"http {self.command} {route}", path=self.path.split("?", 1)[0]) as call:
+            try:
+                payload = handler()
+            except ApiError as e:
+                status, payload = e.status, {"error": e.message}
+            except Exception as e:
+                logger.error("%s %s failed: %s", self.command, self.path, e)
+                status, payload = 500, {"error": str(e)}
+            call.set_attribute("status", status)
+        self._send(status, payload)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/v1/health":
+            self._dispatch(path, handle_health)
+            return
+        if path == "/v1/metrics":
+            self._dispatch(path, handle_metrics)
+            return
+        match = JOB_PATH.match(path)
+        if match:
+            self._dispatch("/v1/jobs/{id}", lambda: handle_job(match.group(1)))
+            return
+        self._send(404, {"error": f"Unknown path: {path}"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        route = POST_ROUTES.get(path)
+        if route is None:
+            self._send(404, {"error": f"Unknown path: {path}"})
+            return
+        self._dispatch(path, lambda: route(self._read_body()))
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8600) -> ThreadingHTTPServer:
+    """Build the API server; the caller runs ``serve_forever``."""
+    get_resource_registry().load_environment()
+    server = ThreadingHTTPServer((host, port), ApiRequestHandler)
+    server.daemon_threads = True
+    return server
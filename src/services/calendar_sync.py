@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytz
+
+from src.utils.metrics import increment
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Full syncs start this far in the past so today's earlier events are cached too
+SYNC_LOOKBACK = timedelta(days=1)
+# The longest planning window; events further ahead are never cached
+MAX_PLANNING_WINDOW = timedelta(days=90)
+# Extra days synced past the planning window, so the window slides for a day before a full resync
+SYNC_SLACK = timedelta(days=1)
+# Users whose calendars are cached; least recently used go first
+MAX_CACHED_USERS = 32
+# The Calendar API maximum; fewer, larger pages cut round trips on long windows
+EVENT_PAGE_SIZE = 2500
+# Everything slot finding, the calendar view and syncing read from an event
+EVENT_LIST_FIELDS = "nextPageToken,nextSyncToken,items(id,status,summary,start,end)"
+
+
+def _event_bounds(event: Dict) -> tuple:
+    start = datetime.fromisoformat(event['start'].get('dateTime', event['start'].get('date'))).astimezone(pytz.UTC)
+    end = datetime.fromisoformat(event['end'].get('dateTime', event['end'].get('date'))).astimezone(pytz.UTC)
+    return start, end
+
+
+def iter_event_pages(
+    service,
+    calendar_id: str = 'primary',
+    page_size: Optional[int] = None,
+    fields: str = EVENT_LIST_FIELDS,
+    **params
+) -> Iterator[Dict]:
+    """
+    Stream every page of an events().list query, following ``nextPageToken``.
+
+    Only the fields in ``fields`` are transferred, and pages are requested
+    lazily, so callers can process events as they arrive.
+
+    Args:
+        service: Google Calendar API service
+        calendar_id: Calendar to read
+        page_size: Events per page; defaults to MAMABEAR_CALENDAR_PAGE_SIZE or EVENT_PAGE_SIZE
+        fields: Partial-response field mask
+        params: Further events().list parameters, e.g. timeMin or syncToken
+
+    Yields:
+        Response pages with ``items`` and, on the last page, ``nextSyncToken``
+    """
+    page_size = page_size or int(os.getenv("MAMABEAR_CALENDAR_PAGE_SIZE", EVENT_PAGE_SIZE))
+    page_token = None
+    while True:
+        if page_token:
+            params['pageToken'] = page_token
+        with span("calendar.events.list", provider="calendar", incremental='syncToken' in params) as call:
+            page = service.events().list(
+                calendarId=calendar_id,
+                singleEvents=True,
+                maxResults=page_size,
+                fields=fields,
+                **params
+            ).execute()
+            call.set_attribute("events", len(page.get('items', [])))
+        yield page
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def _is_sync_token_expired(error: Exception) -> bool:
+    return getattr(getattr(error, 'resp', None), 'status', None) == 410
+
+
+class CalendarEventCache:
+    """Local copy of one user's calendar, kept current with Calendar sync tokens.
+
+    The first sync lists the events from shortly before now to just past
+    MAX_PLANNING_WINDOW ahead and stores the returned ``nextSyncToken``.
+    Later syncs send only that token and apply the changed and cancelled
+    events inside that window; once the planning window would reach past
+    it, a full sync starts a new one. Syncs closer together than
+    ``min_sync_interval`` seconds are skipped; events we create are added
+    locally right away through ``upsert``.
+    """
+
+    def __init__(self, calendar_id: str = 'primary', min_sync_interval: float = 30):
+        self.calendar_id = calendar_id
+        self.min_sync_interval = min_sync_interval
+        self._lock = threading.Lock()
+        self._events: Dict[str, Dict] = {}
+        self._sync_token: Optional[str] = None
+        self._window: Optional[tuple] = None
+        self._last_sync = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+
+    def _apply_pages(self, service, events: Dict[str, Dict], **params) -> tuple:
+        """Apply each page of an events().list query to ``events`` as it arrives.
+
+        Returns:
+            Tuple of (number of events received, next sync token)
+        """
+        received = 0
+        sync_token = None
+        for page in iter_event_pages(service, self.calendar_id, **params):
+            for event in page.get('items', []):
+                received += 1
+                # Sync-token results are not limited to the window, so it is applied here
+                if event.get('status') == 'cancelled' or not self._in_window(event):
+                    events.pop(event['id'], None)
+                else:
+                    events[event['id']] = event
+            sync_token = page.get('nextSyncToken', sync_token)
+        return received, sync_token
+
+    def _in_window(self, event: Dict) -> bool:
+        start, end = _event_bounds(event)
+        return end > self._window[0] and start < self._window[1]
+
+    def _full_sync(self, service, now: datetime):
+        self._window = (now - SYNC_LOOKBACK, now + MAX_PLANNING_WINDOW + SYNC_SLACK)
+        # Filled into a new dict so a failed sync leaves the previous copy intact
+        events: Dict[str, Dict] = {}
+        _, sync_token = self._apply_pages(
+            service,
+            events,
+            timeMin=self._window[0].isoformat(),
+            timeMax=self._window[1].isoformat()
+        )
+        self._events = events
+        self._sync_token = sync_token
+        self.full_syncs += 1
+        logger.info("Full calendar sync loaded %s events", len(self._events))
+
+    def _incremental_sync(self, service):
+        received, sync_token = self._apply_pages(service, self._events, syncToken=self._sync_token)
+        if sync_token:
+            self._sync_token = sync_token
+        self.incremental_syncs += 1
+        logger.info("Incremental calendar sync applied %s changes", received)
+
+    def sync(self, service, force: bool = False, now: Optional[datetime] = None):
+        """
+        Bring the cache up to date with the calendar.
+
+        Args:
+            service: Google Calendar API service
+            force: Sync even if the last sync was moments ago
+            now: Current time; defaults to the wall clock
+        """
+        now = now or datetime.now(pytz.UTC)
+        with self._lock:
+            if not force and self._last_sync and time.time() - self._last_sync < self.min_sync_interval:
+                increment("cache_lookups", cache="calendar_events", result="hit")
+                return
+            increment("cache_lookups", cache="calendar_events", result="miss")
+            if self._sync_token is None or now + MAX_PLANNING_WINDOW > self._window[1]:
+                self._full_sync(service, now)
+            else:
+                try:
+                    self._incremental_sync(service)
+                except Exception as e:
+                    if not _is_sync_token_expired(e):
+                        raise
+                    logger.info("Calendar sync token expired, running a full sync")
+                    self._full_sync(service, now)
+            self._last_sync = time.time()
+
+    def iter_events(self, time_min: datetime, time_max: datetime) -> Iterator[Dict]:
+        """Yield cached events overlapping ``[time_min, time_max)`` in no particular order."""
+        with self._lock:
+            cached = list(self._events.values())
+        for event in cached:
+            start, end = _event_bounds(event)
+            if end > time_min and start < time_max:
+                yield event
+
+    def events(self, time_min: datetime, time_max: datetime) -> List[Dict]:
+        """Return cached events overlapping ``[time_min, time_max)``, ordered by start time."""
+        return sorted(self.iter_events(time_min, time_max), key=lambda event: _event_bounds(event)[0])
+
+    def upsert(self, event: Dict):
+        """Add or replace an event, e.g. one we just created."""
+        if event and event.get('id'):
+            with self._lock:
+                self._events[event['id']] = event
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "events": len(self._events),
+                "full_syncs": self.full_syncs,
+                "incremental_syncs": self.incremental_syncs,
+                "last_sync": self._last_sync
+            }
+
+
+_caches: "OrderedDict[tuple, CalendarEventCache]" = OrderedDict()
+_caches_lock = threading.Lock()
+
+
+def get_event_cache(user_key: str, calendar_id: str = 'primary') -> CalendarEventCache:
+    """Return the process-wide event cache for one user's calendar.
+
+    At most MAX_CACHED_USERS calendars are kept; the least recently used
+    is dropped first.
+    """
+    with _caches_lock:
+        cache = _caches.get((user_key, calendar_id))
+        if cache is None:
+            cache = CalendarEventCache(
+                calendar_id,
+                min_sync_interval=float(os.getenv("MAMABEAR_CALENDAR_SYNC_SECONDS", 30))
+            )
+            _caches[(user_key, calendar_id)] = cache
+        _caches.move_to_end((user_key, calendar_id))
+        while len(_caches) > MAX_CACHED_USERS:
+            _caches.popitem(last=False)
+        return cache
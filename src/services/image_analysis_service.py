@@ -1,6 +1,4 @@
 import os
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
 import streamlit as st
 from PIL import Image, ImageDraw, ImageFont
 import logging
@@ -9,11 +7,32 @@ from typing import Dict, Any
 from functools import wraps
 import time
 import threading
+import io
+import hashlib
+from src.api.replay import is_replay, provider_client
+from src.utils.resource_registry import get_resource_registry
+from src.utils.image_processing import process_image
+from src.services.job_queue import Job, get_analysis_queue
+from src.utils.logging_config import log_payload
+from src.utils.tracing import propagate, span, traced
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+GEMINI_VISION_MODEL = 'gemini-1.5-pro'
+# Overall time budget for one analysis, across every Gemini call and retry
+ANALYSIS_DEADLINE_SECONDS = 90
+# Gemini calls in flight across the process, counting calls whose caller stopped waiting
+_gemini_slots = threading.BoundedSemaphore(int(os.getenv("MAMABEAR_GEMINI_CONCURRENCY", 2)))
+
+class AnalysisError(Exception):
+    """Analysis failure with a message that can be shown to the user."""
+
+def analysis_error_message(error: Exception) -> str:
+    """Return the user-facing message for an analysis failure."""
+    if isinstance(error, TimeoutError):
+        return "Analysis took too long. Please try again."
+    return "Could not analyze the image. Please try again."
+
 def timeout(seconds):
     """Timeout decorator."""
     def decorator(func):
@@ -23,7 +42,7 @@ def timeout(seconds):
             result = []
             def target():
                 result.append(func(*args, **kwargs))
-            thread = threading.Thread(target=target)
+            thread = threading.Thread(target=propagate(target))
             thread.start()
             thread.join(seconds)
             if thread.is_alive():
@@ -39,7 +58,7 @@ def with_streamlit_context(func):
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            logger.error(f"Error in {func.__name__}: {str(e)}", exc_info=True)
+            logger.error("Error in %s: %s", func.__name__, e, exc_info=True)
             raise
     return wrapper
 
@@ -47,15 +66,17 @@ def initialize_gemini():
     """Initialize Google Gemini AI."""
     try:
         api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        if not api_key and not is_replay():
             raise ValueError("GOOGLE_API_KEY environment variable not set. Please add it to your .env file.")
             
         # Configure Gemini with the API key
-        genai.configure(api_key=api_key)
+        import google.generativeai as genai
+        if api_key:
+            genai.configure(api_key=api_key)
         
         try:
             # Use Gemini 1.5 Pro model
-            model = genai.GenerativeModel('gemini-1.5-pro')
+            model = provider_client("gemini", lambda: genai.GenerativeModel(GEMINI_VISION_MODEL))
             
             # Test the model with a simple request
             logger.info("Testing Gemini model connection...")
@@ -64,7 +85,7 @@ def initialize_gemini():
                 raise ValueError("Could not validate model connection")
                 
         except Exception as e:
-            logger.error(f"Error testing model: {str(e)}")
+            logger.error("Error testing model: %s", e)
             raise ValueError(f"Failed to initialize model: {str(e)}")
             
         logger.info("Successfully initialized Gemini AI")
@@ -73,7 +94,6 @@ def initialize_gemini():
     except Exception as e:
         error_msg = f"Failed to initialize Gemini AI: {str(e)}"
         logger.error(error_msg, exc_info=True)
-        st.error(error_msg)
         raise
 
 def hex_to_rgb(hex_color: str) -> tuple:
@@ -156,7 +176,7 @@ def draw_annotations(image: Image, items_info: Dict, analysis_result: str) -> Im
         return annotated.convert('RGB')
         
     except Exception as e:
-        logger.error(f"Error creating annotations: {str(e)}")
+        logger.error("Error creating annotations: %s", e)
         return image
 
 def is_shelf_line(image: Image, y: int, width: int) -> bool:
@@ -177,7 +197,7 @@ def is_shelf_line(image: Image, y: int, width: int) -> bool:
         return variance < 100 and avg > 200  # Adjust these thresholds as needed
         
     except Exception as e:
-        logger.error(f"Error detecting shelf line: {str(e)}")
+        logger.error("Error detecting shelf line: %s", e)
         return False
 
 def extract_organization_suggestions(analysis: str) -> list:
@@ -211,86 +231,157 @@ def parse_location(location: str, width: int, height: int) -> tuple:
     }
     return locations.get(location.lower().replace(' ', '_'), (width//2, height//2))
 
-def analyze_with_timeout(model, prompt, image, timeout_seconds=45):
-    """Helper function to run Gemini analysis with timeout."""
+def _time_left(deadline, seconds):
+    """Cap a timeout at the time left before ``deadline``, raising TimeoutError once it has passed."""
+    if deadline is None:
+        return seconds
+    left = deadline - time.time()
+    if left <= 0:
+        raise TimeoutError("Analysis deadline exceeded")
+    return min(seconds, left)
+
+def analyze_with_timeout(model, prompt, image, timeout_seconds=45, stage="vision", deadline=None):
+    """Helper function to run Gemini analysis with timeout.
+
+    With a ``deadline`` (a ``time.time()`` value), neither the call nor its
+    extended wait goes past it. A call that times out cannot be cancelled, so
+    it keeps its slot in ``_gemini_slots`` until it returns; the extended
+    wait reuses the running call instead of starting another one.
+    """
     start_time = time.time()
     
     def run_analysis():
         try:
-            # Remove timeout parameter and just call generate_content
-            response = model.generate_content([prompt, image])
-            if not response:
-                raise ValueError("Empty response from Gemini")
+            with span(
+                "gemini.generate",
+                provider="gemini",
+                model=GEMINI_VISION_MODEL,
+                stage=stage,
+                bytes_sent=len(prompt.encode("utf-8")) + image.width * image.height * len(image.getbands())
+            ) as call:
+                # Remove timeout parameter and just call generate_content
+                response = model.generate_content([prompt, image])
+                if not response:
+                    raise ValueError("Empty response from Gemini")
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    call.set_attributes(
+                        prompt_tokens=getattr(usage, "prompt_token_count", None),
+                        completion_tokens=getattr(usage, "candidates_token_count", None)
+                    )
             return response
         except Exception as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Gemini API error: {str(e)}")
+            logger.error("[%.2fs] Gemini API error: %s", time.time() - start_time, e)
             raise
 
-    try:
-        # Create and start thread
-        result = []
-        thread = threading.Thread(target=lambda: result.append(run_analysis()))
-        thread.start()
-        thread.join(timeout_seconds)
-        
+    def run_in_slot():
+        try:
+            result.append(run_analysis())
+        finally:
+            _gemini_slots.release()
+
+    wait_seconds = _time_left(deadline, timeout_seconds)
+    if not _gemini_slots.acquire(timeout=wait_seconds):
+        raise TimeoutError(f"No Gemini call slot free after {wait_seconds:.1f} seconds")
+
+    result = []
+    thread = threading.Thread(target=propagate(run_in_slot), daemon=True)
+    thread.start()
+    thread.join(_time_left(deadline, timeout_seconds))
+
+    if thread.is_alive():
+        # Give the same call more time rather than sending a second request
+        extended_timeout = _time_left(deadline, 30)
+        logger.warning("[%.2fs] Analysis still running, waiting %.1f more seconds", time.time() - start_time, extended_timeout)
+        thread.join(extended_timeout)
         if thread.is_alive():
-            logger.error(f"[{time.time() - start_time:.2f}s] Analysis timed out after {timeout_seconds} seconds")
-            raise TimeoutError(f"Analysis timed out after {timeout_seconds} seconds")
-            
-        if not result:
-            raise Exception("No result generated")
-            
-        return result[0]
-        
-    except TimeoutError:
-        # Try one more time with a longer timeout
-        logger.warning(f"[{time.time() - start_time:.2f}s] Retrying analysis with extended timeout")
-        thread = threading.Thread(target=lambda: result.append(run_analysis()))
-        thread.start()
-        thread.join(timeout_seconds + 30)  # Add 30 seconds for retry
-        
-        if thread.is_alive() or not result:
-            raise TimeoutError(f"Analysis timed out after {timeout_seconds + 30} seconds")
-            
-        return result[0]
+            logger.error("[%.2fs] Analysis timed out; the call keeps its slot until it returns", time.time() - start_time)
+            raise TimeoutError(f"Analysis timed out after {time.time() - start_time:.1f} seconds")
 
-@timeout(90)  # Increase overall timeout to 90 seconds
-@with_streamlit_context
-def analyze_fridge_image(image_path):
-    """Analyze fridge image using Gemini Pro Vision."""
+    if not result:
+        raise Exception("No result generated")
+
+    return result[0]
+
+def extract_detection_items(response_text: str, width: int, height: int) -> dict:
+    """
+    Parse Gemini's object detection reply into items with pixel bounding boxes.
+
+    Args:
+        response_text: Reply text, optionally wrapped in a Markdown code fence
+        width: Image width in pixels
+        height: Image height in pixels
+
+    Returns:
+        Items keyed by name, with ``box`` converted from percentages to pixels
+
+    Raises:
+        ValueError, KeyError: If the reply holds no parsable items object
+    """
+    json_str = response_text.strip()
+
+    # Extract JSON content
+    if "```json" in json_str:
+        json_str = json_str.split("```json")[1].split("```")[0].strip()
+    elif "```" in json_str:
+        json_str = json_str.split("```")[1].split("```")[0].strip()
+
+    items_info = json.loads(json_str)["items"]
+
+    # Convert coordinates
+    for item in items_info.values():
+        if 'box' in item:
+            box = item['box']
+            item['box'] = [
+                int(box[0] * width / 100),
+                int(box[1] * height / 100),
+                int(box[2] * width / 100),
+                int(box[3] * height / 100)
+            ]
+    return items_info
+
+@traced("analysis.fridge")
+def run_fridge_analysis(image_path, progress_callback=None, deadline=None):
+    """Analyze fridge image using Gemini Pro Vision without touching the Streamlit UI.
+
+    Safe to run on worker threads. Progress is reported through
+    ``progress_callback(percent, message=None)``; errors are logged and raised.
+    Gemini calls stop waiting at ``deadline``, a ``time.time()`` value.
+
+    Returns:
+        Tuple of (analysis_text, annotated_image, items_info)
+    """
     start_time = time.time()
+    report = progress_callback or (lambda percent, message=None: None)
     
     try:
-        logger.info(f"[{time.time() - start_time:.2f}s] Starting image analysis for: {image_path}")
+        logger.info("[%.2fs] Starting image analysis for: %s", time.time() - start_time, image_path)
         
-        # Add status indicator with more detailed progress
-        status = st.empty()
-        progress = st.progress(0)
-        status.info("Initializing Gemini AI...")
+        report(0, "Initializing Gemini AI...")
         
-        # Initialize Gemini
+        # Initialize Gemini (validated once per process and shared across sessions)
         try:
-            model = initialize_gemini()
-            logger.info(f"[{time.time() - start_time:.2f}s] Gemini initialization complete")
-            progress.progress(10)
+            model = get_resource_registry().get('gemini_vision', initialize_gemini, ["GOOGLE_API_KEY"])
+            logger.info("[%.2fs] Gemini initialization complete", time.time() - start_time)
+            report(10)
         except Exception as e:
-            logger.error(f"Gemini initialization failed after {time.time() - start_time:.2f}s: {str(e)}")
+            logger.error("Gemini initialization failed after %.2fs: %s", time.time() - start_time, e)
             raise
             
         # Open and process image
         try:
             image = Image.open(image_path)
             width, height = image.size
-            logger.info(f"[{time.time() - start_time:.2f}s] Image loaded: {image.size}, mode: {image.mode}")
-            progress.progress(20)
+            logger.info("[%.2fs] Image loaded: %s, mode: %s", time.time() - start_time, image.size, image.mode)
+            report(20)
         except Exception as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Failed to load image: {str(e)}")
+            logger.error("[%.2fs] Failed to load image: %s", time.time() - start_time, e)
             raise
             
-        status.info("Analyzing image contents...")
+        report(20, "Analyzing image contents...")
         
         # Generate object detection using Gemini
-        logger.info(f"[{time.time() - start_time:.2f}s] Starting object detection")
+        logger.info("[%.2fs] Starting object detection", time.time() - start_time)
         try:
             detection_prompt = """
             Analyze this refrigerator image and provide a JSON response with the following structure:
@@ -306,48 +397,34 @@ def analyze_fridge_image(image_path):
             }
             """
             
-            detection_response = analyze_with_timeout(model, detection_prompt, image, timeout_seconds=45)
-            logger.info(f"[{time.time() - start_time:.2f}s] Object detection complete")
-            progress.progress(50)
+            detection_response = analyze_with_timeout(model, detection_prompt, image, timeout_seconds=45, stage="detection", deadline=deadline)
+            logger.info("[%.2fs] Object detection complete", time.time() - start_time)
+            report(50, "Writing detailed analysis...")
             
         except TimeoutError as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Object detection timed out: {str(e)}")
+            logger.error("[%.2fs] Object detection timed out: %s", time.time() - start_time, e)
             raise
         except Exception as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Object detection failed: {str(e)}")
+            logger.error("[%.2fs] Object detection failed: %s", time.time() - start_time, e)
             raise
             
         # Process detection response
-        try:
-            json_str = detection_response.text.strip()
-            logger.debug(f"[{time.time() - start_time:.2f}s] Raw detection response: {json_str}")
-            
-            # Extract JSON content
-            if "```json" in json_str:
-                json_str = json_str.split("```json")[1].split("```")[0].strip()
-            elif "```" in json_str:
-                json_str = json_str.split("```")[1].split("```")[0].strip()
+        with span("analysis.parse") as parse_span:
+            try:
+                json_str = detection_response.text.strip()
+                parse_span.set_attribute("bytes_received", len(json_str))
+                log_payload(logger, "[%.2fs] Raw detection response: %s", json_str, time.time() - start_time)
             
-            items_info = json.loads(json_str)["items"]
-            logger.info(f"[{time.time() - start_time:.2f}s] Successfully parsed items_info with {len(items_info)} items")
-            
-            # Convert coordinates
-            for item in items_info.values():
-                if 'box' in item:
-                    box = item['box']
-                    item['box'] = [
-                        int(box[0] * width / 100),
-                        int(box[1] * height / 100),
-                        int(box[2] * width / 100),
-                        int(box[3] * height / 100)
-                    ]
+                items_info = extract_detection_items(json_str, width, height)
+                parse_span.set_attribute("items", len(items_info))
+                logger.info("[%.2fs] Successfully parsed items_info with %s items", time.time() - start_time, len(items_info))
                     
-        except Exception as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Error parsing detection response: {str(e)}")
-            items_info = {}
+            except Exception as e:
+                logger.error("[%.2fs] Error parsing detection response: %s", time.time() - start_time, e)
+                items_info = {}
 
         # Generate detailed analysis
-        logger.info(f"[{time.time() - start_time:.2f}s] Starting detailed analysis")
+        logger.info("[%.2fs] Starting detailed analysis", time.time() - start_time)
         try:
             analysis_prompt = """
             Analyze this refrigerator image in detail. Please provide:
@@ -359,8 +436,8 @@ def analyze_fridge_image(image_path):
             6. Specific tips for better organization, including where items should be moved
             """
             
-            analysis_response = analyze_with_timeout(model, analysis_prompt, image, timeout_seconds=45)
-            logger.info(f"[{time.time() - start_time:.2f}s] Detailed analysis complete")
+            analysis_response = analyze_with_timeout(model, analysis_prompt, image, timeout_seconds=45, stage="analysis", deadline=deadline)
+            logger.info("[%.2fs] Detailed analysis complete", time.time() - start_time)
             
             if not analysis_response or not analysis_response.text:
                 raise ValueError("No analysis generated")
@@ -368,36 +445,102 @@ def analyze_fridge_image(image_path):
             analysis_result = analysis_response.text
             
         except Exception as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Detailed analysis failed: {str(e)}")
+            logger.error("[%.2fs] Detailed analysis failed: %s", time.time() - start_time, e)
             raise
 
         # Create annotated image
-        logger.info(f"[{time.time() - start_time:.2f}s] Creating annotated image")
-        try:
-            annotated_image = image.convert('RGB')
-            if items_info:
-                annotated_image = draw_annotations(annotated_image, items_info, analysis_result)
-            logger.info(f"[{time.time() - start_time:.2f}s] Annotation complete")
-        except Exception as e:
-            logger.error(f"[{time.time() - start_time:.2f}s] Failed to create annotations: {str(e)}")
-            raise
+        logger.info("[%.2fs] Creating annotated image", time.time() - start_time)
+        with span("analysis.annotate"):
+            try:
+                annotated_image = image.convert('RGB')
+                if items_info:
+                    annotated_image = draw_annotations(annotated_image, items_info, analysis_result)
+                logger.info("[%.2fs] Annotation complete", time.time() - start_time)
+            except Exception as e:
+                logger.error("[%.2fs] Failed to create annotations: %s", time.time() - start_time, e)
+                raise
 
         total_time = time.time() - start_time
-        logger.info(f"[{total_time:.2f}s] Analysis completed successfully")
-        progress.progress(100)
+        logger.info("[%.2fs] Analysis completed successfully", total_time)
+        report(100, "Analysis complete")
         return analysis_result, annotated_image, items_info
 
     except TimeoutError as e:
         elapsed = time.time() - start_time
-        logger.error(f"Analysis timed out after {elapsed:.2f}s: {str(e)}")
-        st.error("Analysis took too long. Please try again.")
-        return None, None, None
+        logger.error("Analysis timed out after %.2fs: %s", elapsed, e)
+        raise
         
     except Exception as e:
         elapsed = time.time() - start_time
-        logger.error(f"Error analyzing image after {elapsed:.2f}s: {str(e)}", exc_info=True)
-        st.error("Could not analyze the image. Please try again.")
+        logger.error("Error analyzing image after %.2fs: %s", elapsed, e, exc_info=True)
+        raise
+
+@with_streamlit_context
+def analyze_fridge_image(image_path):
+    """Analyze fridge image using Gemini Pro Vision, showing progress on the current page.
+
+    Runs on the script thread, since it draws Streamlit elements; the
+    analysis deadline bounds how long it blocks.
+    """
+    status = st.empty()
+    progress = st.progress(0)
+
+    def report(percent, message=None):
+        progress.progress(percent)
+        if message:
+            status.info(message)
+
+    try:
+        return run_fridge_analysis(image_path, report, deadline=time.time() + ANALYSIS_DEADLINE_SECONDS)
+    except Exception as e:
+        st.error(analysis_error_message(e))
         return None, None, None
+
+@traced("analysis.job")
+def analyze_uploaded_image(image_data: bytes, progress_callback=None) -> dict:
+    """Background job body: resize an uploaded image, analyze it and encode the results.
+
+    The annotated image is returned as JPEG bytes so finished jobs hold
+    compact results until they are collected. Runs on a worker thread, so
+    it never draws Streamlit elements: failures are raised as AnalysisError
+    with a user-facing message, which the job keeps for the page to show.
+    """
+    try:
+        temp_path = process_image(io.BytesIO(image_data))
+    except Exception as e:
+        logger.error("Error processing uploaded image: %s", e)
+        raise AnalysisError("Could not read the uploaded image. Please try another photo.") from e
+    try:
+        analysis_result, annotated_image, items_info = run_fridge_analysis(
+            temp_path, progress_callback, deadline=time.time() + ANALYSIS_DEADLINE_SECONDS
+        )
+    except Exception as e:
+        raise AnalysisError(analysis_error_message(e)) from e
+    finally:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    with span("image.encode") as encode_span:
+        encoded = io.BytesIO()
+        annotated_image.save(encoded, "JPEG", quality=85)
+        encode_span.set_attribute("bytes", encoded.tell())
+    return {
+        "analysis": analysis_result,
+        "annotated_image": encoded.getvalue(),
+        "items_info": items_info
+    }
+
+def submit_fridge_analysis(image_data: bytes, key: str = None) -> Job:
+    """Queue analysis of an uploaded image, reusing any job for the same image.
+
+    Raises:
+        QueueFullError: If the analysis queue is at capacity
+    """
+    key = key or hashlib.sha256(image_data).hexdigest()
+    return get_analysis_queue().submit(key, analyze_uploaded_image, image_data)
+
 def parse_detection_response(response_text: str) -> dict:
     """Parse the detection response, cleaning any JSON formatting issues."""
     try:
@@ -405,6 +548,6 @@ def parse_detection_response(response_text: str) -> dict:
         cleaned_json = response_text.replace(",\n  }", "\n  }")
         return json.loads(cleaned_json)
     except json.JSONDecodeError as e:
-        logger.error(f"[{time.time()}s] Error parsing detection response: {str(e)}")
+        logger.error("[%ss] Error parsing detection response: %s", time.time(), e)
         # Return empty dict as fallback
         return {"items": {}}
@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.metrics import increment, observe
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is rejected because the queue is at capacity."""
+
+
+class Job:
+    """State of one background job, readable from any session or thread."""
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def update_progress(self, percent: int, message: Optional[str] = None):
+        self.progress = percent
+        if message:
+            self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "key": self.key,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue:
+    """Bounded worker pool with job deduplication and admission control.
+
+    Jobs are keyed by the caller (for example by image hash): submitting a
+    key that already has a queued, running or recently finished job returns
+    that job instead of starting a new one. At most ``max_pending`` jobs may
+    be queued or running at once; further submissions raise QueueFullError.
+    Finished jobs are kept for ``result_ttl`` seconds so pollers can collect
+    their results.
+    """
+
+    def __init__(self, name: str, max_workers: int = 2, max_pending: int = 8, result_ttl: float = 600):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, str] = {}
+        self.rejected = 0
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.result_ttl:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queue ``fn(*args, progress_callback=..., **kwargs)`` unless a job for ``key`` exists.
+
+        Args:
+            key: Deduplication key
+            fn: Job function; receives a ``progress_callback(percent, message=None)``
+
+        Returns:
+            The new or existing Job
+
+        Raises:
+            QueueFullError: If the queue already holds ``max_pending`` unfinished jobs
+        """
+        with self._lock:
+            self._expire()
+            existing = self._jobs.get(self._by_key.get(key))
+            if existing is not None and existing.status != FAILED:
+                return existing
+
+            if self._pending_count() >= self.max_pending:
+                self.rejected += 1
+                increment("queue_rejections", queue=self.name)
+                raise QueueFullError(f"{self.name} queue is full ({self.max_pending} jobs pending)")
+
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info("Queued %s job %s", self.name, job.id)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        job.status = RUNNING
+        job.started_at = time.time()
+        observe("queue_wait_ms", (job.started_at - job.submitted_at) * 1000, queue=self.name)
+        try:
+            with span(f"job.{self.name}", job_id=job.id, queued_ms=round((job.started_at - job.submitted_at) * 1000, 1)):
+                job.result = fn(*args, progress_callback=job.update_progress, **kwargs)
+            job.progress = 100
+            job.status = DONE
+        except Exception as e:
+            logger.error("%s job %s failed: %s", self.name, job.id, e)
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            logger.info("%s job %s %s in %.2fs", self.name, job.id, job.status, job.finished_at - job.started_at)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and worker usage."""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "done": statuses.count(DONE),
+            "failed": statuses.count(FAILED),
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected
+        }
+
+
+_analysis_queue: Optional[JobQueue] = None
+_analysis_queue_lock = threading.Lock()
+
+
+def get_analysis_queue() -> JobQueue:
+    """Return the process-wide fridge analysis queue."""
+    global _analysis_queue
+    with _analysis_queue_lock:
+        if _analysis_queue is None:
+            _analysis_queue = JobQueue(
+                "analysis",
+                max_workers=int(os.getenv("MAMABEAR_ANALYSIS_WORKERS", 2)),
+                max_pending=int(os.getenv("MAMABEAR_ANALYSIS_MAX_PENDING", 8))
+            )
+        return _analysis_queue
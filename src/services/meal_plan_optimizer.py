@@ -0,0 +1,127 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from src.services.meal_planner_service import DISPLAY_TIMEZONE, find_free_slots
+
+logger = logging.getLogger(__name__)
+
+# Hours (start, end) each meal is preferably prepared in
+DEFAULT_MEAL_WINDOWS = {
+    "Breakfast": (6, 10),
+    "Lunch": (10, 14),
+    "Dinner": (16, 21)
+}
+# Gap kept between two planned sessions, matching the slot grid buffer
+PLAN_BUFFER = timedelta(minutes=5)
+
+
+def _in_window(start: datetime, end: datetime, window: Optional[Tuple[int, int]]) -> bool:
+    if window is None:
+        return True
+    start_hours = start.hour + start.minute / 60
+    end_hours = end.hour + end.minute / 60 if end.date() == start.date() else 24
+    return start_hours >= window[0] and end_hours <= window[1]
+
+
+def optimize_meal_plan(
+    recipes: List[Dict],
+    blocks: List[Tuple[datetime, datetime]],
+    inverted: List[Tuple[datetime, datetime]],
+    now: datetime,
+    days_ahead: int = 7,
+    meal_types: Optional[Dict[int, str]] = None,
+    max_prep_minutes_per_day: Optional[int] = None,
+    preferred_windows: Optional[Dict[str, Tuple[int, int]]] = None,
+    timezone: str = DISPLAY_TIMEZONE
+) -> Dict[str, List[Dict]]:
+    """
+    Assign several recipes to non-conflicting meal prep slots in one pass.
+
+    Recipes with the fewest in-window slots are placed first. Each takes the
+    free slot that is inside its meal's preferred window if possible, then
+    on the least busy day, then earliest. Planned sessions never overlap,
+    each meal type is planned at most once per day and a day's total prep
+    time stays within ``max_prep_minutes_per_day``.
+
+    Args:
+        recipes: Recipes with ``id``, ``title`` and ``readyInMinutes``
+        blocks: Merged busy blocks of the availability timeline
+        inverted: Intervals whose end precedes their start
+        now: Earliest slot start
+        days_ahead: Number of days to plan
+        meal_types: Meal type per recipe id; recipes without one default to Dinner
+        max_prep_minutes_per_day: Cap on planned prep time per day
+        preferred_windows: Local-time hour windows per meal type
+        timezone: Timezone the windows and days are evaluated in; defaults to
+            the timezone slots are displayed in, so a Breakfast slot shows as morning
+
+    Returns:
+        Dict with ``assignments`` (recipe, meal_type and slot, in start order)
+        and ``unassigned`` recipes
+    """
+    meal_types = meal_types or {}
+    windows = dict(DEFAULT_MEAL_WINDOWS, **(preferred_windows or {}))
+    local_tz = pytz.timezone(timezone)
+
+    # Free slots depend only on duration, so recipes of equal length share them
+    slots_by_duration: Dict[int, List[Dict]] = {}
+    candidates = []
+    for recipe in recipes:
+        duration = recipe.get('readyInMinutes', 30)
+        if duration not in slots_by_duration:
+            slots_by_duration[duration] = find_free_slots(blocks, inverted, duration, days_ahead, now)
+
+        meal_type = meal_types.get(recipe.get('id'), "Dinner")
+        options = []
+        for slot in slots_by_duration[duration]:
+            start = datetime.fromisoformat(slot['start'])
+            end = datetime.fromisoformat(slot['end'])
+            local_start, local_end = start.astimezone(local_tz), end.astimezone(local_tz)
+            options.append({
+                'slot': slot,
+                'start': start,
+                'end': end,
+                'day': local_start.date(),
+                'in_window': _in_window(local_start, local_end, windows.get(meal_type))
+            })
+        candidates.append((recipe, meal_type, duration, options))
+
+    # Most constrained first, longer sessions before shorter ones
+    candidates.sort(key=lambda item: (sum(option['in_window'] for option in item[3]), -item[2]))
+
+    planned: List[Tuple[datetime, datetime]] = []
+    prep_by_day: Dict = {}
+    meals_by_day = set()
+    assignments = []
+    unassigned = []
+
+    for recipe, meal_type, duration, options in candidates:
+        best = None
+        best_score = None
+        for option in options:
+            day = option['day']
+            if (day, meal_type) in meals_by_day:
+                continue
+            if max_prep_minutes_per_day is not None and prep_by_day.get(day, 0) + duration > max_prep_minutes_per_day:
+                continue
+            if any(option['start'] < end + PLAN_BUFFER and option['end'] + PLAN_BUFFER > start for start, end in planned):
+                continue
+            score = (not option['in_window'], prep_by_day.get(day, 0), option['start'])
+            if best_score is None or score < best_score:
+                best, best_score = option, score
+
+        if best is None:
+            unassigned.append(recipe)
+            continue
+
+        planned.append((best['start'], best['end']))
+        prep_by_day[best['day']] = prep_by_day.get(best['day'], 0) + duration
+        meals_by_day.add((best['day'], meal_type))
+        assignments.append({'recipe': recipe, 'meal_type': meal_type, 'slot': best['slot']})
+
+    assignments.sort(key=lambda assignment: assignment['slot']['start'])
+    logger.info("Planned %s of %s recipes", len(assignments), len(recipes))
+    return {'assignments': assignments, 'unassigned': unassigned}
@@ -1,31 +1,316 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, TYPE_CHECKING
 import os
 import pickle
 import streamlit as st
 from src.utils.streamlit_context import with_streamlit_context
+from src.api.replay import is_replay, provider_client
+from src.services.calendar_sync import MAX_CACHED_USERS, CalendarEventCache, get_event_cache
+from src.utils.resource_registry import get_resource_registry
+from src.utils.tracing import span
+import hashlib
 import logging
+import threading
 import pytz
 
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
 logger = logging.getLogger(__name__)
 
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+# Calendars the Calendar API accepts in one free/busy query
+FREEBUSY_MAX_CALENDARS = 50
+# Requests the Calendar API accepts in one batch
+CALENDAR_BATCH_LIMIT = 50
+# Timezone slot days and times are shown to the user in
+DISPLAY_TIMEZONE = 'Asia/Kuala_Lumpur'
+# Idle connections kept open per user
+MAX_IDLE_CONNECTIONS = 4
+
+
+def _parse_event_time(value: Dict) -> datetime:
+    return datetime.fromisoformat(value.get('dateTime', value.get('date'))).astimezone(pytz.UTC)
+
+
+def _parse_busy_time(value: str) -> datetime:
+    # Free/busy times use a trailing Z, which fromisoformat accepts only from Python 3.11
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(pytz.UTC)
+
+
+def merge_intervals(intervals: List[Tuple[datetime, datetime]]) -> Tuple[List[Tuple[datetime, datetime]], List[Tuple[datetime, datetime]]]:
+    """
+    Sort busy intervals and merge overlapping ones into busy blocks.
+
+    Args:
+        intervals: (start, end) pairs in any order
+
+    Returns:
+        Tuple of (busy blocks sorted by start with overlapping intervals merged,
+        intervals whose end precedes their start, kept unmerged)
+    """
+    inverted = [(start, end) for start, end in intervals if end < start]
+    # Already-sorted runs, such as one per calendar, make this sort a cheap k-way merge
+    ordered = sorted((start, end) for start, end in intervals if end >= start)
+
+    blocks = []
+    for start, end in ordered:
+        # Only strictly overlapping intervals merge, so zero-length events
+        # touching a block keep their own boundaries
+        if blocks and start < blocks[-1][1]:
+            if end > blocks[-1][1]:
+                blocks[-1] = (blocks[-1][0], end)
+        else:
+            blocks.append((start, end))
+    return blocks, inverted
+
+
+def merge_busy_blocks(events: Optional[Iterable[Dict]]) -> Tuple[List[Tuple[datetime, datetime]], List[Tuple[datetime, datetime]]]:
+    """Parse calendar events once and merge them into sorted busy blocks; see ``merge_intervals``."""
+    return merge_intervals([
+        (_parse_event_time(event['start']), _parse_event_time(event['end']))
+        for event in events or []
+    ])
+
+
+def merge_free_busy(response: Dict) -> Tuple[List[Tuple[datetime, datetime]], List[Tuple[datetime, datetime]]]:
+    """
+    Merge the busy intervals of every calendar in a free/busy response into one timeline.
+
+    Calendars the query could not read are logged and skipped.
+    """
+    intervals = []
+    for calendar_id, calendar in response.get('calendars', {}).items():
+        for error in calendar.get('errors', []):
+            logger.warning("Free/busy unavailable for %s: %s", calendar_id, error.get('reason'))
+        intervals.extend(
+            (_parse_busy_time(busy['start']), _parse_busy_time(busy['end']))
+            for busy in calendar.get('busy', [])
+        )
+    return merge_intervals(intervals)
+
+
+def find_free_slots(
+    blocks: List[Tuple[datetime, datetime]],
+    inverted: List[Tuple[datetime, datetime]],
+    cooking_time: int,
+    days_ahead: int,
+    now: datetime
+) -> List[Dict]:
+    """
+    Find free meal prep slots between 6 AM and 10 PM around merged busy blocks.
+
+    Candidate slots start at 6 AM (or ``now``) and repeat every cooking time
+    plus a 5-minute buffer. A single sweep walks the candidates and blocks
+    together, jumping past each busy block instead of testing every slot
+    against every interval.
+
+    Args:
+        blocks: Sorted, merged busy blocks from ``merge_intervals``
+        inverted: Intervals whose end precedes their start
+        cooking_time: Slot length in minutes
+        days_ahead: Number of days to search
+        now: Timezone-aware earliest slot start
+
+    Returns:
+        Available slots in chronological order
+    """
+    duration = timedelta(minutes=cooking_time)
+    step = timedelta(minutes=cooking_time + 5)
+    local_tz = pytz.timezone(DISPLAY_TIMEZONE)
+
+    available_slots = []
+    block_index = 0
+
+    for day in range(days_ahead):
+        day_start = (now + timedelta(days=day)).replace(
+            hour=6,  # Start at 6 AM
+            minute=0,
+            second=0,
+            microsecond=0
+        )
+        day_end = day_start.replace(hour=22)  # End at 10 PM
+
+        # Start from the first valid time for today
+        current_slot_start = max(day_start, now)
+
+        while current_slot_start + duration <= day_end:
+            slot_end = current_slot_start + duration
+
+            # Blocks ending by this slot's start cannot touch it or any later slot
+            while block_index < len(blocks) and blocks[block_index][1] <= current_slot_start:
+                block_index += 1
+
+            if block_index < len(blocks) and slot_end > blocks[block_index][0]:
+                # Every slot starting before the block ends overlaps it too
+                block_end = blocks[block_index][1]
+                current_slot_start += step * -(-(block_end - current_slot_start) // step)
+                continue
+
+            overlaps = any(
+                current_slot_start < event_end and slot_end > event_start
+                for event_start, event_end in inverted
+            )
+
+            # Slots must start strictly after now
+            if not overlaps and current_slot_start > now:
+                local_start = current_slot_start.astimezone(local_tz)
+                available_slots.append({
+                    'start': current_slot_start.isoformat(),
+                    'end': slot_end.isoformat(),
+                    'duration_minutes': cooking_time,
+                    'day': local_start.strftime('%A, %B %d'),
+                    'display_time': f"{local_start.strftime('%I:%M %p')} - {local_start + duration:%I:%M %p}"
+                })
+
+            # Move to next slot with a 5-minute buffer
+            current_slot_start = current_slot_start + step
+
+    return available_slots
+
+
+def compute_meal_prep_slots(
+    events: List[Dict],
+    cooking_time: int,
+    days_ahead: int,
+    now: datetime
+) -> List[Dict]:
+    """
+    Find free meal prep slots between 6 AM and 10 PM that avoid calendar events.
+
+    Args:
+        events: Google Calendar event resources
+        cooking_time: Slot length in minutes
+        days_ahead: Number of days to search
+        now: Timezone-aware earliest slot start
+
+    Returns:
+        Available slots in chronological order
+    """
+    blocks, inverted = merge_busy_blocks(events)
+    return find_free_slots(blocks, inverted, cooking_time, days_ahead, now)
+
+
+def credential_key(credentials: Optional['Credentials']) -> str:
+    """Identify the signed-in user without keeping their tokens as cache keys."""
+    if credentials is None:
+        return "replay"
+    identity = getattr(credentials, 'refresh_token', None) or getattr(credentials, 'token', None) or ""
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class PooledHttp:
+    """httplib2-compatible client that runs each request on a pooled authorized connection.
+
+    httplib2 connections are not thread-safe, so each request borrows an
+    idle connection, or opens a new one, and returns it when done. Streamlit
+    runs every rerun on a new thread, so connections are pooled per user
+    rather than per thread to stay open across reruns.
+    """
+
+    def __init__(self, credentials: 'Credentials', max_idle: int = MAX_IDLE_CONNECTIONS):
+        # Read by googleapiclient to refresh expired tokens
+        self.credentials = credentials
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        import httplib2
+        import google_auth_httplib2
+        return google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+
+    def _release(self, http):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(http)
+                return
+        http.close()
+
+    def request(self, *args, **kwargs):
+        http = self._acquire()
+        try:
+            return http.request(*args, **kwargs)
+        finally:
+            self._release(http)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for http in idle:
+            http.close()
+
+
+_http_pools: "OrderedDict[str, PooledHttp]" = OrderedDict()
+_http_pools_lock = threading.Lock()
+
+
+def get_http_pool(credentials: 'Credentials') -> PooledHttp:
+    """Return the connection pool for one user's credentials, shared by every service built for them."""
+    key = credential_key(credentials)
+    with _http_pools_lock:
+        pool = _http_pools.get(key)
+        if pool is None:
+            pool = _http_pools[key] = PooledHttp(credentials)
+        _http_pools.move_to_end(key)
+        evicted = []
+        while len(_http_pools) > MAX_CACHED_USERS:
+            evicted.append(_http_pools.popitem(last=False)[1])
+    for stale in evicted:
+        stale.close()
+    return pool
+
+
+def build_calendar_service(credentials: 'Credentials'):
+    """
+    Build a thread-safe Calendar API client.
+
+    The discovery document comes from the copy bundled with
+    google-api-python-client instead of being downloaded and parsed per
+    build. Requests run on the user's PooledHttp, so concurrent requests
+    each get their own connection and open connections are reused.
+    """
+    from googleapiclient.discovery import build
+
+    return build(
+        'calendar',
+        'v3',
+        http=get_http_pool(credentials),
+        static_discovery=True,
+        cache_discovery=False
+    )
+
+
 class MealPlannerService:
-    def __init__(self):
+    def __init__(self, credentials: Optional['Credentials'] = None):
         try:
-            self.SCOPES = ['https://www.googleapis.com/auth/calendar']
-            self.credentials = self._get_credentials()
-            self.service = build('calendar', 'v3', credentials=self.credentials)
+            self.SCOPES = SCOPES
+
+            # Replayed calendars need no Google account
+            if credentials is None and not is_replay():
+                credentials = self._get_credentials()
+            self.credentials = credentials
+            self.service = provider_client(
+                "calendar",
+                lambda: build_calendar_service(self.credentials),
+                terminal="execute"
+            )
+            self.event_cache: CalendarEventCache = get_event_cache(credential_key(self.credentials))
             logger.info("Successfully initialized MealPlannerService")
         except Exception as e:
-            logger.error(f"Failed to initialize MealPlannerService: {str(e)}")
+            logger.error("Failed to initialize MealPlannerService: %s", e)
             raise
 
-    def _get_credentials(self) -> Credentials:
+    @staticmethod
+    def _get_credentials() -> 'Credentials':
         """Get or refresh Google Calendar credentials."""
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         creds = None
         
         # Check if credentials are stored in Streamlit session state
@@ -38,7 +323,7 @@ class MealPlannerService:
                 try:
                     creds.refresh(Request())
                 except Exception as e:
-                    logger.error(f"Failed to refresh credentials: {str(e)}")
+                    logger.error("Failed to refresh credentials: %s", e)
                     creds = None
             
             if not creds:
@@ -56,7 +341,7 @@ class MealPlannerService:
                     
                     flow = InstalledAppFlow.from_client_config(
                         client_config,
-                        self.SCOPES
+                        SCOPES
                     )
                     creds = flow.run_local_server(port=0)
                     
@@ -64,98 +349,162 @@ class MealPlannerService:
                     st.session_state.google_creds = creds
                     
                 except Exception as e:
-                    logger.error(f"Failed to authenticate: {str(e)}")
+                    logger.error("Failed to authenticate: %s", e)
                     raise ValueError("Failed to authenticate with Google Calendar. Please check your credentials.")
         
         return creds
 
+    def get_events(self, days_ahead: int = 7, now: Optional[datetime] = None) -> List[Dict]:
+        """
+        Return calendar events in the next ``days_ahead`` days from the local event cache.
+
+        The cache is brought up to date with an incremental sync first, so
+        only events changed since the last sync are fetched.
+
+        Args:
+            days_ahead: Length of the window in days
+            now: Window start; defaults to the current time
+
+        Returns:
+            Events overlapping the window, ordered by start time
+        """
+        now = now or datetime.now(pytz.UTC)
+        self.event_cache.sync(self.service, now=now)
+        return self.event_cache.events(now, now + timedelta(days=days_ahead))
+
+    def list_calendars(self) -> List[Dict]:
+        """Return the id and name of every calendar the user can read."""
+        calendars = []
+        page_token = None
+        while True:
+            response = self.service.calendarList().list(
+                minAccessRole='freeBusyReader',
+                pageToken=page_token
+            ).execute()
+            calendars.extend(
+                {
+                    'id': 'primary' if item.get('primary') else item['id'],
+                    'summary': item.get('summaryOverride', item.get('summary', item['id']))
+                }
+                for item in response.get('items', [])
+            )
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return calendars
+
+    def get_busy_blocks(
+        self,
+        calendar_ids: List[str],
+        days_ahead: int = 7,
+        now: Optional[datetime] = None
+    ) -> Tuple[List[Tuple[datetime, datetime]], List[Tuple[datetime, datetime]]]:
+        """
+        Fetch busy intervals for several calendars with free/busy queries and merge them.
+
+        Only busy intervals are transferred, and up to FREEBUSY_MAX_CALENDARS
+        calendars share one request.
+
+        Args:
+            calendar_ids: Calendars to combine, e.g. household members' and work calendars
+            days_ahead: Length of the window in days
+            now: Window start; defaults to the current time
+
+        Returns:
+            Merged busy blocks and inverted intervals, as from ``merge_intervals``
+        """
+        now = now or datetime.now(pytz.UTC)
+        merged = {'calendars': {}}
+        for chunk_start in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+            chunk = calendar_ids[chunk_start:chunk_start + FREEBUSY_MAX_CALENDARS]
+            with span("calendar.freebusy", provider="calendar", calendars=len(chunk)):
+                response = self.service.freebusy().query(body={
+                    'timeMin': now.isoformat(),
+                    'timeMax': (now + timedelta(days=days_ahead)).isoformat(),
+                    'timeZone': 'UTC',
+                    'items': [{'id': calendar_id} for calendar_id in chunk]
+                }).execute()
+            merged['calendars'].update(response.get('calendars', {}))
+        return merge_free_busy(merged)
+
+    def iter_events(self, days_ahead: int = 7, now: Optional[datetime] = None) -> Iterator[Dict]:
+        """Like ``get_events`` but yields events in no particular order instead of building a sorted list."""
+        now = now or datetime.now(pytz.UTC)
+        self.event_cache.sync(self.service, now=now)
+        return self.event_cache.iter_events(now, now + timedelta(days=days_ahead))
+
     @with_streamlit_context
     def find_meal_prep_slots(
         self, 
         recipe: Dict, 
-        days_ahead: int = 7
+        days_ahead: int = 7,
+        calendar_ids: Optional[List[str]] = None
     ) -> List[Dict]:
-        """Find available time slots for meal preparation."""
+        """
+        Find available time slots for meal preparation.
+
+        With ``calendar_ids`` the slots avoid busy time in all of those
+        calendars, read through free/busy; otherwise they avoid events in
+        the cached primary calendar.
+        """
         try:
             cooking_time = recipe.get('readyInMinutes', 30)
             
             # Add buffer time to now to ensure slots start in the future
             now = datetime.now(pytz.UTC) + timedelta(minutes=5)
-            time_min = now.isoformat()
-            time_max = (now + timedelta(days=days_ahead)).isoformat()
-
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            logger.info(f"Found {len(events)} calendar events")
-
-            # Process events and find available slots
-            available_slots = []
-
-            # Create slots for each day based on recipe cooking time
-            for day in range(days_ahead):
-                day_start = (now + timedelta(days=day)).replace(
-                    hour=6,  # Start at 6 AM
-                    minute=0,
-                    second=0,
-                    microsecond=0
-                )
-                day_end = day_start.replace(hour=22)  # End at 10 PM
-                
-                # Start from the first valid time for today
-                current_slot_start = max(day_start, now)
-                
-                # Create slots matching recipe cooking time
-                while current_slot_start + timedelta(minutes=cooking_time) <= day_end:
-                    slot_end = current_slot_start + timedelta(minutes=cooking_time)
-                    
-                    # Check if slot overlaps with any events
-                    overlaps = False
-                    if events:
-                        for event in events:
-                            event_start = datetime.fromisoformat(
-                                event['start'].get('dateTime', event['start'].get('date'))
-                            ).astimezone(pytz.UTC)
-                            event_end = datetime.fromisoformat(
-                                event['end'].get('dateTime', event['end'].get('date'))
-                            ).astimezone(pytz.UTC)
-                            
-                            if (current_slot_start < event_end and slot_end > event_start):
-                                overlaps = True
-                                break
-                    
-                    if not overlaps:
-                        local_start = current_slot_start.astimezone(pytz.timezone('Asia/Kuala_Lumpur'))
-                        available_slots.append({
-                            'start': current_slot_start.isoformat(),
-                            'end': slot_end.isoformat(),
-                            'duration_minutes': cooking_time,
-                            'day': local_start.strftime('%A, %B %d'),
-                            'display_time': f"{local_start.strftime('%I:%M %p')} - {local_start + timedelta(minutes=cooking_time):%I:%M %p}"
-                        })
-                    
-                    # Move to next slot with a 5-minute buffer
-                    current_slot_start = current_slot_start + timedelta(minutes=cooking_time + 5)
-
-            # Filter out slots that are too close to now
-            available_slots = [
-                slot for slot in available_slots 
-                if datetime.fromisoformat(slot['start']) > now
-            ]
+            if calendar_ids:
+                blocks, inverted = self.get_busy_blocks(calendar_ids, days_ahead, now=now)
+                logger.info("Found %s busy blocks across %s calendars", len(blocks), len(calendar_ids))
+            else:
+                # Events stream straight into interval merging without an intermediate list
+                blocks, inverted = merge_busy_blocks(self.iter_events(days_ahead, now=now))
+                logger.info("Found %s busy blocks", len(blocks))
 
-            logger.info(f"Found {len(available_slots)} available slots")
+            with span("slots.find", busy_blocks=len(blocks), days=days_ahead) as call:
+                available_slots = find_free_slots(blocks, inverted, cooking_time, days_ahead, now)
+                call.set_attribute("slots", len(available_slots))
+            logger.info("Found %s available slots", len(available_slots))
             return available_slots
 
         except Exception as e:
-            logger.error(f"Error finding meal prep slots: {str(e)}")
+            logger.error("Error finding meal prep slots: %s", e)
             return []
 
+    @staticmethod
+    def _build_event(recipe: Dict, start_time: datetime, meal_type: str) -> Dict:
+        """Build the calendar event body for one meal prep session."""
+        recipe_name = recipe.get('title', 'Unknown Recipe')
+        duration_minutes = recipe.get('readyInMinutes', 30)
+        
+        # Ensure timezone-aware datetime for both now and start_time
+        now = datetime.now(pytz.UTC)
+        
+        # Convert start_time to UTC if it's naive
+        if start_time.tzinfo is None:
+            start_time = pytz.UTC.localize(start_time)
+        else:
+            start_time = start_time.astimezone(pytz.UTC)
+        
+        # Add a small buffer (e.g., 1 minute) to avoid immediate future conflicts
+        if start_time <= now + timedelta(minutes=1):
+            logger.error("Selected time %s is too close to current time %s", start_time, now)
+            raise ValueError("Please select a time at least 1 minute in the future")
+
+        return {
+            'summary': f'{meal_type} Prep: {recipe_name}',
+            'description': f'Preparing {recipe_name}\nEstimated time: {duration_minutes} minutes',
+            'start': {
+                'dateTime': start_time.isoformat(),
+                'timeZone': 'UTC',
+            },
+            'end': {
+                'dateTime': (start_time + timedelta(minutes=duration_minutes)).isoformat(),
+                'timeZone': 'UTC',
+            },
+            'reminders': {
+                'useDefault': True
+            },
+        }
+
     @with_streamlit_context
     def schedule_meal_prep(
         self, 
@@ -165,51 +514,124 @@ class MealPlannerService:
     ) -> bool:
         """Schedule a meal preparation session."""
         try:
-            recipe_name = recipe.get('title', 'Unknown Recipe')
-            duration_minutes = recipe.get('readyInMinutes', 30)
-            
-            # Ensure timezone-aware datetime for both now and start_time
-            now = datetime.now(pytz.UTC)
-            
-            # Convert start_time to UTC if it's naive
-            if start_time.tzinfo is None:
-                start_time = pytz.UTC.localize(start_time)
-            else:
-                start_time = start_time.astimezone(pytz.UTC)
-            
-            # Add a small buffer (e.g., 1 minute) to avoid immediate future conflicts
-            if start_time <= now + timedelta(minutes=1):
-                logger.error(f"Selected time {start_time} is too close to current time {now}")
-                raise ValueError("Please select a time at least 1 minute in the future")
-
-            event = {
-                'summary': f'{meal_type} Prep: {recipe_name}',
-                'description': f'Preparing {recipe_name}\nEstimated time: {duration_minutes} minutes',
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'end': {
-                    'dateTime': (start_time + timedelta(minutes=duration_minutes)).isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'reminders': {
-                    'useDefault': True
-                },
-            }
-
-            created_event = self.service.events().insert(calendarId='primary', body=event).execute()
-            logger.info(f"Successfully scheduled meal prep: {created_event.get('id')}")
+            event = self._build_event(recipe, start_time, meal_type)
+            with span("calendar.events.insert", provider="calendar"):
+                created_event = self.service.events().insert(calendarId='primary', body=event).execute()
+            # Show the new event straight away instead of waiting for the next sync
+            self.event_cache.upsert(created_event)
+            logger.info("Successfully scheduled meal prep: %s", created_event.get('id'))
             return True
 
         except Exception as e:
-            logger.error(f"Error scheduling meal prep: {str(e)}")
+            logger.error("Error scheduling meal prep: %s", e)
             return False
 
+    def plan_meals(
+        self,
+        recipes: List[Dict],
+        days_ahead: int = 7,
+        calendar_ids: Optional[List[str]] = None,
+        **constraints
+    ) -> Dict[str, List[Dict]]:
+        """
+        Assign several recipes to non-conflicting slots over one availability timeline.
+
+        Args:
+            recipes: Recipes to plan
+            days_ahead: Number of days to plan
+            calendar_ids: Calendars whose busy time to avoid; defaults to the primary calendar
+            constraints: ``meal_types``, ``max_prep_minutes_per_day`` and
+                ``preferred_windows``, as for ``optimize_meal_plan``
+
+        Returns:
+            Dict with ``assignments`` and ``unassigned`` recipes
+        """
+        from src.services.meal_plan_optimizer import optimize_meal_plan
+
+        now = datetime.now(pytz.UTC) + timedelta(minutes=5)
+        if calendar_ids:
+            blocks, inverted = self.get_busy_blocks(calendar_ids, days_ahead, now=now)
+        else:
+            blocks, inverted = merge_busy_blocks(self.iter_events(days_ahead, now=now))
+        return optimize_meal_plan(recipes, blocks, inverted, now, days_ahead, **constraints)
+
+    @with_streamlit_context
+    def schedule_plan(self, assignments: List[Dict]) -> List[Dict]:
+        """
+        Create calendar events for planned sessions using batch requests.
+
+        Up to CALENDAR_BATCH_LIMIT inserts travel in one HTTP request.
+
+        Args:
+            assignments: ``assignments`` from ``plan_meals``
+
+        Returns:
+            One result per assignment with ``title``, ``success`` and ``event_id`` or ``error``
+        """
+        results = [{'title': assignment['recipe'].get('title', 'Unknown Recipe'), 'success': False}
+                   for assignment in assignments]
+
+        def on_response(request_id, response, exception):
+            result = results[int(request_id)]
+            if exception is not None:
+                result['error'] = str(exception)
+                return
+            result['success'] = True
+            result['event_id'] = response.get('id')
+            self.event_cache.upsert(response)
+
+        requests = []
+        for index, assignment in enumerate(assignments):
+            try:
+                event = self._build_event(
+                    assignment['recipe'],
+                    datetime.fromisoformat(assignment['slot']['start']),
+                    assignment['meal_type']
+                )
+            except ValueError as e:
+                results[index]['error'] = str(e)
+                continue
+            requests.append((index, event))
+
+        for chunk_start in range(0, len(requests), CALENDAR_BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for index, event in requests[chunk_start:chunk_start + CALENDAR_BATCH_LIMIT]:
+                batch.add(self.service.events().insert(calendarId='primary', body=event), request_id=str(index))
+            try:
+                with span("calendar.batch_insert", provider="calendar", events=len(requests[chunk_start:chunk_start + CALENDAR_BATCH_LIMIT])):
+                    batch.execute()
+            except Exception as e:
+                logger.error("Batch scheduling failed: %s", e)
+                for index, _ in requests[chunk_start:chunk_start + CALENDAR_BATCH_LIMIT]:
+                    results[index].setdefault('error', str(e))
+
+        logger.info("Scheduled %s of %s planned sessions", sum(result['success'] for result in results), len(results))
+        return results
+
+_planner_names: "OrderedDict[str, None]" = OrderedDict()
+_planner_names_lock = threading.Lock()
+
+
+def _track_planner(name: str):
+    """Mark a user's planner as recently used, dropping the least recently used beyond MAX_CACHED_USERS."""
+    with _planner_names_lock:
+        _planner_names[name] = None
+        _planner_names.move_to_end(name)
+        evicted = []
+        while len(_planner_names) > MAX_CACHED_USERS:
+            evicted.append(_planner_names.popitem(last=False)[0])
+    for stale in evicted:
+        get_resource_registry().invalidate(stale)
+
+
 def initialize_meal_planner() -> MealPlannerService:
-    """Initialize and return MealPlannerService."""
+    """Return the signed-in user's MealPlannerService, built once per set of credentials."""
     try:
-        return MealPlannerService()
+        credentials = None if is_replay() else MealPlannerService._get_credentials()
+        name = f"meal_planner:{credential_key(credentials)}"
+        planner = get_resource_registry().get(name, lambda: MealPlannerService(credentials))
+        _track_planner(name)
+        return planner
     except Exception as e:
         st.error(f"Failed to initialize MealPlannerService: {str(e)}")
         raise
\ No newline at end of file
@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.utils.tracing import propagate
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderCancelled(Exception):
+    """Raised by a provider call that stopped because another provider won a race."""
+
+
+class CancelEvent(threading.Event):
+    """Event that also runs callbacks when set, e.g. to close an open response.
+
+    A call blocked waiting for its first token never gets to check the event,
+    so it registers a callback that closes the response and unblocks it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks: List[Callable[[], None]] = []
+        self._callback_lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Run ``callback`` when the event is set, or right away if it already is."""
+        with self._callback_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def set(self):
+        with self._callback_lock:
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug("Cancel callback failed: %s", e)
+
+
+class ProviderStats:
+    """Moving averages of latency and error rate for one provider and model."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+
+    def record(self, latency: float, ok: bool, error: Optional[str] = None):
+        self.calls += 1
+        if ok:
+            # Failed calls often return fast, so only successes feed the latency average
+            self.latency = latency if self.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * self.latency
+            )
+        else:
+            self.errors += 1
+            self.last_error = error
+            self.last_error_at = time.time()
+        self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+
+    def to_dict(self) -> Dict:
+        return {
+            "latency_ewma": self.latency,
+            "error_rate": self.error_rate,
+            "calls": self.calls,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at
+        }
+
+
+class ProviderRouter:
+    """Route LLM requests to the fastest healthy provider.
+
+    Each (provider, model) pair keeps an exponentially weighted moving
+    average of successful call latency and of its error rate. A pair is
+    unhealthy while its error rate is above ``error_threshold``, until
+    ``cooldown_seconds`` after its last error have passed and it gets
+    another chance. Pairs without any latency samples are tried first so
+    they get measured.
+
+    Every decision is logged and kept in a bounded history that
+    ``recent_decisions`` returns.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        error_threshold: float = 0.5,
+        cooldown_seconds: float = 30,
+        max_decisions: int = 200
+    ):
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._decisions = deque(maxlen=max_decisions)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="provider-race")
+
+    def _get_stats(self, provider: str, model: str) -> ProviderStats:
+        key = (provider, model)
+        if key not in self._stats:
+            self._stats[key] = ProviderStats(self.alpha)
+        return self._stats[key]
+
+    def record(self, provider: str, model: str, latency: float, ok: bool, error: Optional[str] = None):
+        """Record the outcome of a call made outside the router."""
+        with self._lock:
+            self._get_stats(provider, model).record(latency, ok, error)
+
+    def is_healthy(self, provider: str, model: str) -> bool:
+        with self._lock:
+            stats = self._get_stats(provider, model)
+            if stats.error_rate <= self.error_threshold:
+                return True
+            return time.time() - (stats.last_error_at or 0) > self.cooldown_seconds
+
+    def rank(
+        self,
+        candidates: List[Tuple[str, str]],
+        unhealthy: Optional[Set[str]] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Order (provider, model) candidates from most to least preferred.
+
+        Args:
+            candidates: (provider, model) pairs in default preference order
+            unhealthy: Providers known to be down from other signals, e.g. health checks
+
+        Returns:
+            Healthy candidates by ascending latency, followed by unhealthy ones
+        """
+        unhealthy = unhealthy or set()
+
+        def sort_key(indexed):
+            index, (provider, model) = indexed
+            healthy = provider not in unhealthy and self.is_healthy(provider, model)
+            with self._lock:
+                latency = self._get_stats(provider, model).latency
+            return (not healthy, latency is not None, latency or 0.0, index)
+
+        return [candidate for _, candidate in sorted(enumerate(candidates), key=sort_key)]
+
+    def _log_decision(self, mode: str, ranked: List[Tuple[str, str]], chosen: Optional[Tuple[str, str]],
+                      latency: Optional[float], error: Optional[str] = None):
+        decision = {
+            "time": time.time(),
+            "mode": mode,
+            "ranked": [f"{provider}/{model}" for provider, model in ranked],
+            "chosen": f"{chosen[0]}/{chosen[1]}" if chosen else None,
+            "latency": latency,
+            "error": error
+        }
+        with self._lock:
+            self._decisions.append(decision)
+        logger.info(
+            "Routed %s request to %s (ranking: %s, latency: %s)",
+            mode, decision['chosen'], ', '.join(decision['ranked']), latency
+        )
+
+    def _timed_call(self, provider: str, model: str, fn: Callable, *args) -> Any:
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except ProviderCancelled:
+            raise
+        except Exception as e:
+            self.record(provider, model, time.perf_counter() - start, ok=False, error=str(e))
+            raise
+        self.record(provider, model, time.perf_counter() - start, ok=True)
+        return result
+
+    def call(
+        self,
+        candidates: List[Tuple[str, str, Callable[[threading.Event], Any]]],
+        unhealthy: Optional[Set[str]] = None,
+        race: bool = False
+    ) -> Any:
+        """
+        Run a request on the best provider, falling back down the ranking on errors.
+
+        Args:
+            candidates: (provider, model, fn) triples; ``fn`` receives a CancelEvent
+                it should check periodically, or register a callback on, and raise
+                ProviderCancelled when set
+            unhealthy: Providers known to be down from other signals
+            race: Run the two best healthy candidates concurrently, return the first
+                success and cancel the other
+
+        Returns:
+            Result of the first provider call that succeeded
+
+        Raises:
+            The last provider error if every candidate failed
+        """
+        functions = {(provider, model): fn for provider, model, fn in candidates}
+        ranked = self.rank(list(functions), unhealthy)
+        if not ranked:
+            raise ValueError("No providers available")
+
+        healthy = [c for c in ranked if c[0] not in (unhealthy or set()) and self.is_healthy(*c)]
+        if race and len(healthy) >= 2:
+            try:
+                return self._race(healthy[:2], functions, ranked)
+            except Exception as e:
+                logger.warning("Race failed on both providers: %s", e)
+                ranked = [c for c in ranked if c not in healthy[:2]]
+                if not ranked:
+                    raise
+
+        last_error = None
+        for provider, model in ranked:
+            start = time.perf_counter()
+            try:
+                result = self._timed_call(provider, model, functions[(provider, model)], CancelEvent())
+                self._log_decision("sequential", ranked, (provider, model), time.perf_counter() - start)
+                return result
+            except Exception as e:
+                logger.error("%s/%s failed: %s", provider, model, e)
+                last_error = e
+
+        self._log_decision("sequential", ranked, None, None, error=str(last_error))
+        raise last_error
+
+    def _race(self, racers: List[Tuple[str, str]], functions: Dict, ranked: List[Tuple[str, str]]) -> Any:
+        cancel_events = {racer: CancelEvent() for racer in racers}
+        start = time.perf_counter()
+        futures = {
+            self._executor.submit(propagate(self._timed_call), provider, model, functions[(provider, model)],
+                                  cancel_events[(provider, model)]): (provider, model)
+            for provider, model in racers
+        }
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                winner = futures[future]
+                for other in pending:
+                    cancel_events[futures[other]].set()
+                    other.cancel()
+                self._log_decision("race", ranked, winner, time.perf_counter() - start)
+                return result
+
+        self._log_decision("race", ranked, None, None, error=str(last_error))
+        raise last_error
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Return current statistics keyed by ``provider/model``."""
+        with self._lock:
+            return {f"{provider}/{model}": stats.to_dict() for (provider, model), stats in self._stats.items()}
+
+    def recent_decisions(self, limit: int = 50) -> List[Dict]:
+        """Return the most recent routing decisions, newest last."""
+        with self._lock:
+            return list(self._decisions)[-limit:]
+
+
+# Initialize a single router instance
+_router: Optional[ProviderRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_provider_router() -> ProviderRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter()
+        return _router
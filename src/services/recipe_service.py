@@ -3,110 +3,302 @@ import streamlit as st
 import os
 from src.utils.decorators import timeout
 from src.utils.streamlit_context import with_streamlit_context
+from src.utils.generation_cache import get_generation_cache
+from src.utils.metrics import increment
+from src.utils.completion_stream import CompletionStream, stream_chat_completion
+from src.api.groq_client import RECIPE_MODEL, RECIPE_PARAMS, build_recipe_messages
+from src.services.provider_router import ProviderCancelled, get_provider_router
+from src.api.replay import is_replay, provider_client, provider_http
+from src.utils.tracing import span
 import logging
-from groq import Groq
-from openai import OpenAI
 import time
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Same prompt and parameters as the Groq client, so both share cached completions
+RECIPE_DETAIL_PARAMS = RECIPE_PARAMS
+HEALTH_TTL_SECONDS = 300
+
+# Provider SDKs are imported on first client creation to keep startup fast
+def _groq_factory(api_key):
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+def _openai_factory(api_key):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
 class RecipeService:
+    """Recipe detail generation over Groq with OpenAI fallback.
+
+    Use get_recipe_service() to share one instance per process. Clients are
+    created on first use and rebuilt when their API key changes, and provider
+    health is cached: it is refreshed in a background thread when stale and
+    updated from the outcome of every real request, so no method blocks on
+    a health-check round trip. Rebuilding a client clears its health.
+    """
+
     def __init__(self):
-        self.groq_client = None
-        self.openai_client = None
-        self._initialize_clients()
+        self._clients = {}
+        self._client_lock = threading.Lock()
+        self._health_lock = threading.Lock()
+        self._health = {}
+        self._refreshing = set()
+
+    @property
+    def groq_client(self):
+        return self._client("Groq", "GROQ_API_KEY", _groq_factory)
+
+    @property
+    def openai_client(self):
+        return self._client("OpenAI", "OPENAI_API_KEY", _openai_factory)
+
+    def _client(self, name: str, env_var: str, factory):
+        """Return the provider client, rebuilding it when its API key has changed since it was built."""
+        api_key = os.getenv(env_var)
+        entry = self._clients.get(name)
+        if entry is None or entry[0] != api_key:
+            with self._client_lock:
+                entry = self._clients.get(name)
+                if entry is None or entry[0] != api_key:
+                    # Health recorded for the old key says nothing about the new one
+                    with self._health_lock:
+                        self._health.pop(name, None)
+                    entry = (api_key, self._create_client(name, api_key, factory))
+                    self._clients[name] = entry
+        return entry[1] or None
+
+    def _create_client(self, name: str, api_key, factory):
+        """Create a provider client, returning False if it is unavailable until its key changes."""
+        try:
+            if not api_key and not is_replay():
+                logger.warning("No %s API key found", name)
+                self.record_failure(name, ValueError(f"No {name} API key found"))
+                return False
+            logger.debug("Initializing %s client...", name)
+            client = provider_client(name.lower(), lambda: factory(api_key))
+            logger.info("Successfully initialized %s client", name)
+            return client
+        except Exception as e:
+            logger.error("Failed to initialize %s: %s", name, e)
+            self.record_failure(name, e)
+            return False
 
-    def _initialize_clients(self):
-        """Initialize API clients with fallback options."""
-        # Try Groq first
+    def _check_connection(self, name: str, client):
+        """Check provider reachability with a models listing, which costs no tokens."""
         try:
-            groq_key = os.getenv("GROQ_API_KEY")
-            if groq_key:
-                logger.debug("Initializing Groq client...")
-                self.groq_client = Groq(api_key=groq_key)
-                # Test connection
-                self._test_groq_connection()
-                logger.info("Successfully initialized Groq client")
-            else:
-                logger.warning("No Groq API key found")
+            if not client.models.list():
+                raise ValueError(f"Empty response from {name}")
+            self.record_success(name)
         except Exception as e:
-            logger.error(f"Failed to initialize Groq: {str(e)}")
-            self.groq_client = None
+            logger.error("%s connection test failed: %s", name, e)
+            self.record_failure(name, e)
+        finally:
+            with self._health_lock:
+                self._refreshing.discard(name)
+
+    def _refresh_health_async(self, name: str, client):
+        with self._health_lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+        threading.Thread(
+            target=self._check_connection,
+            args=(name, client),
+            name=f"{name.lower()}-health-check",
+            daemon=True
+        ).start()
+
+    def record_success(self, name: str):
+        """Mark a provider healthy after a successful call."""
+        with self._health_lock:
+            self._health[name] = {"healthy": True, "checked_at": time.time(), "error": None}
+
+    def record_failure(self, name: str, error: Exception):
+        """Mark a provider unhealthy after a failed call."""
+        with self._health_lock:
+            self._health[name] = {"healthy": False, "checked_at": time.time(), "error": str(error)}
+
+    def is_healthy(self, name: str, client) -> bool:
+        """Return the cached health of a provider, scheduling a background refresh when stale.
+
+        Providers that have not been checked yet are assumed healthy.
+        """
+        with self._health_lock:
+            status = self._health.get(name)
+        if status is None or time.time() - status["checked_at"] > HEALTH_TTL_SECONDS:
+            self._refresh_health_async(name, client)
+        return status is None or status["healthy"]
+
+    def get_health(self) -> dict:
+        """Return a snapshot of the cached provider health."""
+        with self._health_lock:
+            return {name: dict(status) for name, status in self._health.items()}
+
+    def _recipe_messages(self, recipe) -> list:
+        if isinstance(recipe, str):
+            recipe = {"title": recipe}
+        return build_recipe_messages(recipe)
+
+    def _providers(self) -> list:
+        """Available (name, client, model) providers in default fallback order."""
+        providers = [
+            ("Groq", self.groq_client, RECIPE_MODEL),
+            ("OpenAI", self.openai_client, "gpt-3.5-turbo")
+        ]
+        return [provider for provider in providers if provider[1]]
 
-        # Initialize OpenAI as fallback
+    def _ranked_providers(self) -> list:
+        """Available providers ordered by the latency-aware router."""
+        providers = self._providers()
+        unhealthy = {name for name, client, _ in providers if not self.is_healthy(name, client)}
+        ranked = get_provider_router().rank([(name, model) for name, _, model in providers], unhealthy)
+        order = {candidate: index for index, candidate in enumerate(ranked)}
+        return sorted(providers, key=lambda provider: order[(provider[0], provider[2])])
+
+    def _complete(self, name: str, client, model: str, messages: list, cancel_event) -> str:
+        """Run one completion, streaming it so a lost race can abort the request early.
+
+        Cancelling closes the response, which also stops a request still
+        waiting for its first token.
+        """
         try:
-            openai_key = os.getenv("OPENAI_API_KEY")
-            if openai_key:
-                logger.debug("Initializing OpenAI client...")
-                self.openai_client = OpenAI(api_key=openai_key)
-                logger.info("Successfully initialized OpenAI client")
-            else:
-                logger.warning("No OpenAI API key found")
+            with span("llm.complete", provider=name.lower(), model=model) as call:
+                if cancel_event.is_set():
+                    raise ProviderCancelled(f"{name} request cancelled")
+                response = client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    stream=True,
+                    **RECIPE_DETAIL_PARAMS
+                )
+                cancel_event.add_callback(response.close)
+                parts = []
+                try:
+                    for chunk in response:
+                        if cancel_event.is_set():
+                            break
+                        if chunk.choices:
+                            parts.append(chunk.choices[0].delta.content or "")
+                except Exception:
+                    # Closing the response from another thread ends the read with an error
+                    if not cancel_event.is_set():
+                        raise
+                if cancel_event.is_set():
+                    call.set_attribute("cancelled", True)
+                    raise ProviderCancelled(f"{name} request cancelled")
+                content = "".join(parts)
+                call.set_attribute("tokens", len([part for part in parts if part]))
+                if not content:
+                    raise ValueError(f"Empty response from {name}")
+        except ProviderCancelled:
+            raise
         except Exception as e:
-            logger.error(f"Failed to initialize OpenAI: {str(e)}")
-            self.openai_client = None
+            logger.error("%s API error: %s", name, e)
+            self.record_failure(name, e)
+            raise
+        self.record_success(name)
+        return content
+
+    def get_recipe_details(self, recipe, refresh: bool = False, race: bool = False) -> str:
+        """Get recipe details from the fastest healthy provider with fallback.
+
+        ``recipe`` is a Spoonacular recipe dict, or just a recipe name.
+
+        Completions are served from the generation cache when available;
+        pass ``refresh=True`` to bypass it and regenerate. With ``race=True``
+        the two best providers are queried concurrently and the slower
+        request is cancelled, trading extra usage for lower latency.
+        """
+        with span("recipe.details", race=race) as call:
+            return self._get_recipe_details(recipe, refresh, race, call)
+
+    def _get_recipe_details(self, recipe, refresh: bool, race: bool, call) -> str:
+        messages = self._recipe_messages(recipe)
+        providers = self._providers()
+        cache = get_generation_cache()
 
-    def _test_groq_connection(self):
-        """Test Groq API connection."""
+        # Serve any cached completion before making a network call
+        if not refresh:
+            for _, client, model in providers:
+                cached = cache.get(cache.make_key(model, messages, **RECIPE_DETAIL_PARAMS))
+                if cached is not None:
+                    call.set_attribute("cache_hit", True)
+                    return cached
+        call.set_attribute("cache_hit", False)
+
+        def make_call(name, client, model):
+            def call(cancel_event):
+                content = self._complete(name, client, model, messages, cancel_event)
+                cache.set(cache.make_key(model, messages, **RECIPE_DETAIL_PARAMS), model, content)
+                return content
+            return (name, model, call)
+
+        unhealthy = {name for name, client, _ in providers if not self.is_healthy(name, client)}
         try:
-            response = self.groq_client.chat.completions.create(
-                messages=[{"role": "system", "content": "Test"}],
-                model="mixtral-8x7b-32768",
-                max_tokens=10
+            return get_provider_router().call(
+                [make_call(name, client, model) for name, client, model in providers],
+                unhealthy=unhealthy,
+                race=race
             )
-            if not response:
-                raise ValueError("Empty response from Groq")
         except Exception as e:
-            logger.error(f"Groq connection test failed: {str(e)}")
-            raise
+            logger.error("All API attempts failed: %s", e)
+            return None
+
+    def stream_recipe_details(self, recipe, refresh: bool = False):
+        """Stream recipe details token by token, trying providers in router order.
+
+        ``recipe`` is a Spoonacular recipe dict, or just a recipe name.
 
-    def get_recipe_details(self, recipe_name: str) -> str:
-        """Get recipe details using available AI models with fallback."""
-        prompt = f"""
-        Generate a detailed recipe for "{recipe_name}" with:
-        - Estimated cooking time
-        - Difficulty level
-        - Key steps
+        Returns a CompletionStream, or None if no provider could start a
+        stream. Fallback happens only when a provider fails to start; errors
+        after the first token are raised to the caller while iterating.
         """
+        messages = self._recipe_messages(recipe)
+        providers = self._ranked_providers()
+        cache = get_generation_cache()
 
-        # Try Groq first
-        if self.groq_client:
-            try:
-                response = self.groq_client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": "You are a helpful culinary assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    model="mixtral-8x7b-32768",
-                    max_tokens=200,
-                    temperature=0.7
-                )
-                if response and response.choices:
-                    return response.choices[0].message.content
-            except Exception as e:
-                logger.error(f"Groq API error: {str(e)}")
+        if not refresh:
+            for _, client, model in providers:
+                cached = cache.get(cache.make_key(model, messages, **RECIPE_DETAIL_PARAMS))
+                if cached is not None:
+                    increment("cache_lookups", cache="generation", result="hit")
+                    return CompletionStream.from_text(cached)
+            increment("cache_lookups", cache="generation", result="miss")
 
-        # Fallback to OpenAI
-        if self.openai_client:
+        for name, client, model in providers:
             try:
-                logger.info("Falling back to OpenAI API")
-                response = self.openai_client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": "You are a helpful culinary assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    model="gpt-3.5-turbo",
-                    max_tokens=200,
-                    temperature=0.7
+                key = cache.make_key(model, messages, **RECIPE_DETAIL_PARAMS)
+                stream = stream_chat_completion(
+                    client,
+                    model,
+                    messages,
+                    on_complete=lambda text, key=key, model=model: cache.set(key, model, text),
+                    provider=name.lower(),
+                    **RECIPE_DETAIL_PARAMS
                 )
-                if response and response.choices:
-                    return response.choices[0].message.content
+                self.record_success(name)
+                return stream
             except Exception as e:
-                logger.error(f"OpenAI API error: {str(e)}")
+                logger.error("%s streaming error: %s", name, e)
+                self.record_failure(name, e)
 
-        logger.error("All API attempts failed")
+        logger.error("All streaming attempts failed")
         return None
 
+# Initialize a single service instance
+_service = None
+_service_lock = threading.Lock()
+
+def get_recipe_service() -> RecipeService:
+    """Return the process-wide RecipeService."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RecipeService()
+        return _service
+
 @timeout(30)
 @with_streamlit_context
 def get_recipes_from_spoonacular(ingredients, max_recipes=4):
@@ -116,7 +308,7 @@ def get_recipes_from_spoonacular(ingredients, max_recipes=4):
         base_url = "https://api.spoonacular.com/recipes/findByIngredients"
         
         # Add logging to debug API key
-        logger.debug(f"Using Spoonacular API key: {api_key[:5]}...")  # Only log first 5 chars for security
+        logger.debug("Using Spoonacular API key: %s...", api_key[:5])  # Only log first 5 chars for security
         
         params = {
             "apiKey": api_key,
@@ -126,7 +318,7 @@ def get_recipes_from_spoonacular(ingredients, max_recipes=4):
             "ignorePantry": True
         }
         
-        response = requests.get(base_url, params=params)
+        response = provider_http("spoonacular").get(base_url, params=params)
         
         # Add more detailed error handling
         if response.status_code == 401:
@@ -151,5 +343,5 @@ def get_recipes_from_spoonacular(ingredients, max_recipes=4):
 
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching recipes: {str(e)}")
-        logger.error(f"Spoonacular API request failed: {str(e)}")
+        logger.error("Spoonacular API request failed: %s", e)
         return []
\ No newline at end of file
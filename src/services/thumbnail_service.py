@@ -0,0 +1,248 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from PIL import Image
+
+from src.utils.metrics import increment
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THUMBNAIL_SIZE = (480, 360)
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "mamabear_thumbnails")
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+# URLs that failed are not fetched again for this long
+DEFAULT_FAILURE_TTL_SECONDS = 300
+
+
+class HttpImageFetcher:
+    """Fetch remote images over HTTP."""
+
+    def __init__(self, timeout_seconds: float = 10):
+        self.timeout_seconds = timeout_seconds
+        self.session = requests.Session()
+
+    def __call__(self, url: str) -> bytes:
+        response = self.session.get(url, timeout=self.timeout_seconds)
+        response.raise_for_status()
+        return response.content
+
+
+class LocalImageFetcher:
+    """Stand-in fetcher that serves images from a local directory.
+
+    The file name is taken from the last path segment of the URL, so
+    ``https://img.spoonacular.com/recipes/123-312x231.jpg`` is read from
+    ``<root>/123-312x231.jpg``.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def __call__(self, url: str) -> bytes:
+        name = os.path.basename(urlparse(url).path)
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read()
+
+
+class ThumbnailService:
+    """Fetch recipe images once and serve downsized copies from a bounded disk cache.
+
+    Cached file sizes are tracked in memory in least recently used order, so
+    eviction does not scan the cache directory. URLs that fail are
+    remembered for ``failure_ttl`` seconds and return None without another
+    fetch.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        size: Tuple[int, int] = DEFAULT_THUMBNAIL_SIZE,
+        quality: int = 75,
+        fetcher: Optional[Callable[[str], bytes]] = None,
+        failure_ttl: float = DEFAULT_FAILURE_TTL_SECONDS
+    ):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.size = size
+        self.quality = quality
+        self.fetcher = fetcher or HttpImageFetcher()
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._failures: Dict[str, float] = {}
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_entries()
+
+    def _load_entries(self):
+        """Index thumbnails left by earlier runs, oldest first; the only directory scan."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".jpg"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        for _, size, path in sorted(entries):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def _cache_path(self, url: str) -> str:
+        key = f"{url}|{self.size[0]}x{self.size[1]}|q{self.quality}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.jpg")
+
+    def _make_thumbnail(self, data: bytes) -> bytes:
+        """Downsize and recompress raw image bytes to JPEG."""
+        with Image.open(io.BytesIO(data)) as image:
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.thumbnail(self.size, Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=self.quality, optimize=True)
+            return output.getvalue()
+
+    def _read_cached(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Touch the file so a restarted process still knows it was recently used
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        return data
+
+    def _write_cached(self, path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _add_entry(self, path: str, size: int):
+        """Record a written thumbnail and evict least recently used ones until the cache fits. Requires ``_lock``."""
+        self._total_bytes += size - self._entries.pop(path, 0)
+        self._entries[path] = size
+        while self._total_bytes > self.max_cache_bytes and self._entries:
+            stale, stale_size = self._entries.popitem(last=False)
+            self._total_bytes -= stale_size
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+    def _recent_failure(self, path: str) -> bool:
+        with self._lock:
+            expires_at = self._failures.get(path)
+            if expires_at is None:
+                return False
+            if time.monotonic() < expires_at:
+                return True
+            del self._failures[path]
+            return False
+
+    def _record_failure(self, path: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) >= 1024:
+                self._failures = {key: expiry for key, expiry in self._failures.items() if expiry > now}
+            self._failures[path] = now + self.failure_ttl
+
+    def get_thumbnail(self, url: str) -> Optional[bytes]:
+        """Return thumbnail bytes for an image URL, fetching it on first use.
+
+        Args:
+            url: Remote image URL
+
+        Returns:
+            JPEG bytes of the downsized image, or None if it could not be fetched
+        """
+        if not url:
+            return None
+
+        path = self._cache_path(url)
+        # A recent failure counts as a hit: it is answered without a fetch
+        if self._recent_failure(path):
+            increment("cache_lookups", cache="thumbnail", result="hit")
+            return None
+        cached = self._read_cached(path)
+        if cached is not None:
+            increment("cache_lookups", cache="thumbnail", result="hit")
+            return cached
+
+        # Only one thread fetches a given URL; the others wait for its result
+        with self._lock:
+            event = self._inflight.get(path)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._inflight[path] = event
+
+        # Only the request that fetches counts a miss; the others are served from its result
+        if not owner:
+            increment("cache_lookups", cache="thumbnail", result="hit")
+            event.wait()
+            return self._read_cached(path)
+
+        try:
+            # A fetch may have finished between the cache read and taking ownership
+            cached = self._read_cached(path)
+            increment("cache_lookups", cache="thumbnail", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+            with span("thumbnail.fetch") as call:
+                data = self.fetcher(url)
+                thumbnail = self._make_thumbnail(data)
+                call.set_attributes(bytes_received=len(data), bytes=len(thumbnail))
+            self._write_cached(path, thumbnail)
+            with self._lock:
+                self._add_entry(path, len(thumbnail))
+            return thumbnail
+        except Exception as e:
+            logger.error("Failed to create thumbnail for %s: %s", url, e)
+            self._record_failure(path)
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(path, None)
+            event.set()
+
+
+# Initialize a single service instance
+_service: Optional[ThumbnailService] = None
+_service_lock = threading.Lock()
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            fixtures_dir = os.getenv("MAMABEAR_THUMBNAIL_FIXTURES")
+            _service = ThumbnailService(
+                cache_dir=os.getenv("MAMABEAR_THUMBNAIL_DIR", DEFAULT_CACHE_DIR),
+                max_cache_bytes=int(os.getenv("MAMABEAR_THUMBNAIL_CACHE_BYTES", DEFAULT_MAX_CACHE_BYTES)),
+                fetcher=LocalImageFetcher(fixtures_dir) if fixtures_dir else None
+            )
+        return _service
+
+
+def get_recipe_thumbnail(url: str) -> Optional[bytes]:
+    """Return cached thumbnail bytes for a recipe image URL."""
+    return get_thumbnail_service().get_thumbnail(url)
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Sessions untouched for this long are released; Streamlit does not report session ends
+DEFAULT_SESSION_TTL_SECONDS = 60 * 60
+
+
+class ArtifactStore:
+    """Process-wide store for per-session analysis artifacts.
+
+    Values are kept encoded: images as JPEG bytes and everything else as
+    zlib-compressed JSON or text. Identical artifacts are stored once, keyed
+    by content hash, and shared by every session that references them. The
+    total encoded size is capped; least recently used artifacts are evicted
+    first, after which ``get`` returns None for them. Sessions that have
+    not touched the store for ``session_ttl`` seconds are released.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        image_quality: int = 85,
+        session_ttl: float = DEFAULT_SESSION_TTL_SECONDS
+    ):
+        self.max_bytes = max_bytes
+        self.image_quality = image_quality
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        self._blobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sessions: Dict[str, Dict[str, str]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self._total_bytes = 0
+        self.evictions = 0
+        self.expired_sessions = 0
+
+    def _encode(self, value: Any) -> tuple:
+        if hasattr(value, "save") and hasattr(value, "mode"):
+            image = value if value.mode in ("RGB", "L") else value.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=self.image_quality, optimize=True)
+            return "image", output.getvalue()
+        if isinstance(value, bytes):
+            return "bytes", value
+        if isinstance(value, str):
+            return "text", zlib.compress(value.encode("utf-8"))
+        return "json", zlib.compress(json.dumps(value).encode("utf-8"))
+
+    @staticmethod
+    def _decode(kind: str, data: bytes) -> Any:
+        if kind in ("image", "bytes"):
+            return data
+        if kind == "text":
+            return zlib.decompress(data).decode("utf-8")
+        return json.loads(zlib.decompress(data))
+
+    def _release(self, digest: str, session_id: str):
+        blob = self._blobs.get(digest)
+        if blob is None:
+            return
+        blob["sessions"].discard(session_id)
+        if not blob["sessions"]:
+            self._total_bytes -= blob["size"]
+            del self._blobs[digest]
+
+    def _touch(self, session_id: str):
+        now = time.monotonic()
+        self._last_seen[session_id] = now
+        # Sweeping costs a pass over all sessions, so it runs at most a few times per TTL
+        if now - self._last_sweep >= self.session_ttl / 4:
+            self._expire_idle(now)
+
+    def _release_session(self, session_id: str):
+        self._last_seen.pop(session_id, None)
+        for digest in self._sessions.pop(session_id, {}).values():
+            self._release(digest, session_id)
+
+    def _expire_idle(self, now: float) -> int:
+        self._last_sweep = now
+        idle = [
+            session_id for session_id, last_seen in self._last_seen.items()
+            if now - last_seen > self.session_ttl
+        ]
+        for session_id in idle:
+            self._release_session(session_id)
+        self.expired_sessions += len(idle)
+        if idle:
+            logger.debug("Released %s idle sessions", len(idle))
+        return len(idle)
+
+    def expire_idle_sessions(self, now: Optional[float] = None) -> int:
+        """Release sessions idle for longer than ``session_ttl`` and return how many were released.
+
+        This also runs periodically on its own as the store is used.
+        """
+        with self._lock:
+            return self._expire_idle(time.monotonic() if now is None else now)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._blobs:
+            digest, blob = self._blobs.popitem(last=False)
+            self._total_bytes -= blob["size"]
+            self.evictions += 1
+            logger.debug("Evicted %s artifact %s (%s bytes)", blob['kind'], digest[:12], blob['size'])
+
+    def put(self, session_id: str, name: str, value: Any) -> str:
+        """
+        Store an artifact for a session, replacing any previous value under the same name.
+
+        Args:
+            session_id: Owning session
+            name: Artifact name within the session
+            value: PIL image, bytes, string or JSON-serializable value
+
+        Returns:
+            Content hash of the stored artifact
+        """
+        kind, data = self._encode(value)
+        digest = hashlib.sha256(kind.encode("utf-8") + data).hexdigest()
+        with self._lock:
+            self._touch(session_id)
+            session = self._sessions.setdefault(session_id, {})
+            previous = session.get(name)
+            if previous == digest and digest in self._blobs:
+                self._blobs.move_to_end(digest)
+                return digest
+
+            blob = self._blobs.get(digest)
+            if blob is None:
+                blob = {"kind": kind, "data": data, "size": len(data), "sessions": set()}
+                self._blobs[digest] = blob
+                self._total_bytes += blob["size"]
+            blob["sessions"].add(session_id)
+            self._blobs.move_to_end(digest)
+            session[name] = digest
+
+            # An evicted artifact stored again under the same name keeps its new blob
+            if previous is not None and previous != digest:
+                self._release(previous, session_id)
+            self._evict()
+        return digest
+
+    def get(self, session_id: str, name: str) -> Any:
+        """Return a session's artifact, or None if it was never stored or has been evicted.
+
+        Images are returned as encoded bytes, ready for ``st.image``.
+        """
+        with self._lock:
+            if session_id in self._sessions:
+                self._touch(session_id)
+            digest = self._sessions.get(session_id, {}).get(name)
+            blob = self._blobs.get(digest) if digest else None
+            if blob is None:
+                return None
+            self._blobs.move_to_end(digest)
+            kind, data = blob["kind"], blob["data"]
+        return self._decode(kind, data)
+
+    def delete(self, session_id: str, name: str):
+        with self._lock:
+            digest = self._sessions.get(session_id, {}).pop(name, None)
+            if digest:
+                self._release(digest, session_id)
+
+    def release_session(self, session_id: str):
+        """Drop every artifact reference held by a session."""
+        with self._lock:
+            self._release_session(session_id)
+
+    def session_usage(self, session_id: str) -> Dict[str, int]:
+        """Return the encoded bytes a session references, and how many of them are shared."""
+        with self._lock:
+            total = shared = 0
+            for digest in self._sessions.get(session_id, {}).values():
+                blob = self._blobs.get(digest)
+                if blob is None:
+                    continue
+                total += blob["size"]
+                if len(blob["sessions"]) > 1:
+                    shared += blob["size"]
+            return {"bytes": total, "shared_bytes": shared}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return global store usage and per-session memory."""
+        with self._lock:
+            session_ids = list(self._sessions)
+            totals = {
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "artifacts": len(self._blobs),
+                "sessions": len(session_ids),
+                "evictions": self.evictions,
+                "expired_sessions": self.expired_sessions
+            }
+        totals["per_session"] = {session_id: self.session_usage(session_id) for session_id in session_ids}
+        return totals
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore(
+                max_bytes=int(os.getenv("MAMABEAR_ARTIFACT_STORE_BYTES", DEFAULT_MAX_BYTES)),
+                session_ttl=float(os.getenv("MAMABEAR_ARTIFACT_SESSION_TTL", DEFAULT_SESSION_TTL_SECONDS))
+            )
+        return _store
@@ -0,0 +1,141 @@
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.utils.tracing import record_span, span
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionStream:
+    """Iterable over streamed completion tokens that records timing data.
+
+    Iterating yields each text delta as it arrives. Once the stream is
+    exhausted, ``text`` holds the assembled completion and the timing
+    properties are final. Token counts are taken from the number of
+    non-empty deltas, which is one token per delta for Groq and OpenAI.
+    """
+
+    def __init__(
+        self,
+        deltas: Iterable[str],
+        started_at: Optional[float] = None,
+        on_complete: Optional[Callable[[str], None]] = None,
+        trace_attributes: Optional[Dict[str, Any]] = None
+    ):
+        self._deltas = deltas
+        self._on_complete = on_complete
+        self._trace_attributes = trace_attributes
+        self._parts: List[str] = []
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.token_count = 0
+
+    @classmethod
+    def from_text(cls, text: str) -> "CompletionStream":
+        """Wrap an already available completion, e.g. a cache hit, as a single-delta stream."""
+        return cls([text])
+
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._deltas:
+            if not delta:
+                continue
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.token_count += 1
+            self._parts.append(delta)
+            yield delta
+
+        self.finished_at = time.perf_counter()
+        logger.debug(
+            "Stream finished: %s tokens, ttft=%s, tps=%s",
+            self.token_count, self.time_to_first_token, self.tokens_per_second
+        )
+        if self._trace_attributes is not None:
+            record_span(
+                "llm.stream",
+                self.total_time,
+                tokens=self.token_count,
+                ttft_ms=round(self.time_to_first_token * 1000, 1) if self.time_to_first_token is not None else None,
+                **self._trace_attributes
+            )
+        if self._on_complete and self._parts:
+            self._on_complete(self.text)
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def text(self) -> str:
+        """Text assembled from the deltas received so far."""
+        return "".join(self._parts)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from the request to the first token, or None before it arrives."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_time(self) -> Optional[float]:
+        """Seconds from the request to the end of the stream, or None while streaming."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation rate after the first token, or None until the stream has finished."""
+        if self.finished_at is None or self.first_token_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        if elapsed <= 0:
+            return None
+        return (self.token_count - 1) / elapsed if self.token_count > 1 else None
+
+
+def _iter_deltas(response) -> Iterator[str]:
+    for chunk in response:
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+
+def stream_chat_completion(
+    client,
+    model: str,
+    messages: List[Dict],
+    on_complete: Optional[Callable[[str], None]] = None,
+    provider: Optional[str] = None,
+    **params
+) -> CompletionStream:
+    """
+    Start a streaming chat completion on a Groq or OpenAI client.
+
+    Args:
+        client: Groq or OpenAI client
+        model: Model name
+        messages: Chat messages
+        on_complete: Called with the assembled text once the stream is exhausted
+        provider: Provider name recorded on the tracing spans
+        **params: Sampling parameters passed to the completion call
+
+    Returns:
+        CompletionStream yielding text deltas as they arrive
+    """
+    started_at = time.perf_counter()
+    with span("llm.stream.open", provider=provider, model=model):
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+    return CompletionStream(
+        _iter_deltas(response),
+        started_at=started_at,
+        on_complete=on_complete,
+        trace_attributes={"provider": provider, "model": model}
+    )
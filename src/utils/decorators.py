@@ -1,6 +1,7 @@
 from functools import wraps
 import threading
 import queue
+from src.utils.tracing import propagate
 
 def timeout(seconds):
     """Timeout decorator for functions."""
@@ -16,7 +17,7 @@ def timeout(seconds):
                 except Exception as e:
                     result_queue.put(('error', e))
             
-            thread = threading.Thread(target=worker)
+            thread = threading.Thread(target=propagate(worker))
             thread.daemon = True
             thread.start()
             
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "mamabear_generations.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+# Last-access times only need to be accurate to this many seconds for LRU eviction
+ACCESS_UPDATE_INTERVAL = 60
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize prompt text so formatting-only differences share a cache entry."""
+    return " ".join(text.split())
+
+
+class GenerationCache:
+    """Persistent cache for LLM completions keyed by model, prompt and sampling parameters.
+
+    Hits do not write to the database: last-access times older than
+    ACCESS_UPDATE_INTERVAL are collected in memory and written in one
+    transaction with the next ``set``, or once that interval has passed.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.time()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS generations_last_access ON generations (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], **params) -> str:
+        """Build a cache key from the model, normalized messages and sampling parameters."""
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": m["role"], "content": normalize_prompt(m["content"])}
+                for m in messages
+            ],
+            "params": params
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached completion, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, last_access FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at, last_access = row
+            if now - created_at > self.ttl_seconds:
+                self._pending_access.pop(key, None)
+                self._conn.execute("DELETE FROM generations WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            if now - last_access > ACCESS_UPDATE_INTERVAL:
+                self._pending_access[key] = now
+            if self._pending_access and now - self._last_access_flush > ACCESS_UPDATE_INTERVAL:
+                self._flush_access(now)
+                self._conn.commit()
+            return value
+
+    def _flush_access(self, now: float):
+        """Write the collected last-access times; the caller commits. Requires ``_lock``."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE generations SET last_access = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        self._last_access_flush = now
+
+    def set(self, key: str, model: str, value: str):
+        """Store a completion and evict the least recently used entries over the size bound."""
+        now = time.time()
+        with self._lock:
+            # Eviction below orders by last access, so pending hits are written first
+            self._flush_access(now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, model, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM generations WHERE key IN ("
+                "SELECT key FROM generations ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def get_or_generate(
+        self,
+        model: str,
+        messages: List[Dict],
+        generate: Callable[[], Optional[str]],
+        refresh: bool = False,
+        **params
+    ) -> Optional[str]:
+        """
+        Return a cached completion or generate and store a new one.
+
+        Args:
+            model: Model name the completion is generated with
+            messages: Chat messages sent to the model
+            generate: Callable that performs the completion and returns its text
+            refresh: Skip the cache lookup and overwrite the stored entry
+            **params: Sampling parameters that affect the completion
+
+        Returns:
+            Completion text, or None if generation produced nothing
+        """
+        key = self.make_key(model, messages, **params)
+        if not refresh:
+            cached = self.get(key)
+            increment("cache_lookups", cache="generation", result="miss" if cached is None else "hit")
+            if cached is not None:
+                logger.debug("Generation cache hit for %s", model)
+                return cached
+
+        value = generate()
+        if value:
+            self.set(key, model, value)
+        return value
+
+    def clear(self):
+        """Remove all cached completions."""
+        with self._lock:
+            self._pending_access.clear()
+            self._conn.execute("DELETE FROM generations")
+            self._conn.commit()
+
+
+# Initialize a single cache instance
+_cache: Optional[GenerationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> GenerationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GenerationCache(
+                path=os.getenv("MAMABEAR_GENERATION_CACHE", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("MAMABEAR_GENERATION_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                max_entries=int(os.getenv("MAMABEAR_GENERATION_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES))
+            )
+        return _cache
@@ -1,26 +1,29 @@
-import cv2
 from PIL import Image
 import tempfile
-import streamlit as st
 import os
+from src.utils.tracing import span
 
 def process_image(uploaded_file, max_size=(800, 800)):
-    """Process and resize uploaded image."""
+    """Process and resize uploaded image.
+
+    Returns the path of a temporary JPEG copy. Errors are raised to the
+    caller, which may be a worker thread with no Streamlit context.
+    """
     try:
-        image = Image.open(uploaded_file)
-        
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-            
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        with span("image.preprocess") as call:
+            image = Image.open(uploaded_file)
+            call.set_attribute("input_size", f"{image.size[0]}x{image.size[1]}")
             
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-        image.save(temp_file.name, 'JPEG', quality=85)
-        return temp_file.name
-    except Exception as e:
-        st.error(f"Error processing image: {str(e)}")
-        return None
+            if image.mode == 'RGBA':
+                image = image.convert('RGB')
+                
+            if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+                image.thumbnail(max_size, Image.Resampling.LANCZOS)
+                
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
+            image.save(temp_file.name, 'JPEG', quality=85)
+            call.set_attribute("bytes", os.path.getsize(temp_file.name))
+            return temp_file.name
     finally:
         if 'image' in locals():
             image.close()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from typing import Any, Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"
+# Payloads such as raw model responses are cut to this many characters
+DEFAULT_PAYLOAD_CHARS = 2000
+# Share of payload log calls that are written
+DEFAULT_PAYLOAD_SAMPLE_RATE = 0.01
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that enqueues records unformatted, leaving formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare formats the message on the calling thread; a copy
+        # keeps msg and args for the listener's handlers to format instead
+        return copy.copy(record)
+
+
+def configure_logging(level: Optional[str] = None) -> logging.handlers.QueueListener:
+    """
+    Configure process-wide logging once, writing records off the calling thread.
+
+    Request threads only put records on a queue; a listener thread formats
+    them and writes them to stderr. Later calls return the running listener.
+
+    Args:
+        level: Root level name; defaults to MAMABEAR_LOG_LEVEL or INFO
+
+    Returns:
+        The queue listener writing the records
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DeferredFormatQueueHandler(log_queue))
+        root.setLevel((level or os.getenv("MAMABEAR_LOG_LEVEL", "INFO")).upper())
+        return _listener
+
+
+def log_payload(
+    logger: logging.Logger,
+    message: str,
+    payload: Any,
+    *args,
+    level: int = logging.DEBUG,
+    sample_rate: Optional[float] = None
+):
+    """
+    Log a large payload, such as a raw model response, for a sample of calls.
+
+    Nothing is formatted unless ``level`` is enabled and the call is sampled,
+    and the payload is truncated to MAMABEAR_LOG_PAYLOAD_CHARS characters.
+
+    Args:
+        logger: Logger to write to
+        message: %-style message; the payload is appended to ``args``
+        payload: Payload to log; converted to text only when written
+        level: Log level
+        sample_rate: Share of calls to log; defaults to MAMABEAR_LOG_PAYLOAD_SAMPLE or 1%
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if sample_rate is None:
+        sample_rate = float(os.getenv("MAMABEAR_LOG_PAYLOAD_SAMPLE", DEFAULT_PAYLOAD_SAMPLE_RATE))
+    if random.random() >= sample_rate:
+        return
+    text = str(payload)
+    limit = int(os.getenv("MAMABEAR_LOG_PAYLOAD_CHARS", DEFAULT_PAYLOAD_CHARS))
+    if len(text) > limit:
+        text = f"{text[:limit]}... ({len(text)} chars)"
+    logger.log(level, message, *args, text)
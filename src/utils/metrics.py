@@ -0,0 +1,160 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# Latency percentiles are computed over this many recent samples per series
+HISTOGRAM_WINDOW = 2048
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+class Histogram:
+    """Count, sum and max of all observations plus a window of recent ones for percentiles."""
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: deque = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def percentile(self, q: float, ordered: Optional[List[float]] = None) -> Optional[float]:
+        ordered = ordered if ordered is not None else sorted(self._recent)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self._recent)
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50, ordered),
+            "p90": self.percentile(90, ordered),
+            "p99": self.percentile(99, ordered),
+            "max": self.max
+        }
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms, each keyed by a name and labels.
+
+    Services update them as they work; the Performance page and the HTTP
+    API's health endpoint read a snapshot.
+    """
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.window)
+            histogram.observe(value)
+
+    def counters(self, name: str) -> List[Dict[str, Any]]:
+        """Return every series of a counter as label dicts with a ``value``."""
+        with self._lock:
+            return [dict(labels, value=value) for (metric, labels), value in self._counters.items() if metric == name]
+
+    def gauges(self, name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(labels, value=value) for (metric, labels), value in self._gauges.items() if metric == name]
+
+    def histograms(self, name: str) -> List[Dict[str, Any]]:
+        """Return every series of a histogram as label dicts with count, mean, percentiles and max."""
+        with self._lock:
+            series = [(labels, histogram) for (metric, labels), histogram in self._histograms.items() if metric == name]
+            return [dict(labels, **histogram.to_dict()) for labels, histogram in series]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            names = {
+                "counters": sorted({name for name, _ in self._counters}),
+                "gauges": sorted({name for name, _ in self._gauges}),
+                "histograms": sorted({name for name, _ in self._histograms})
+            }
+        return {
+            "uptime": time.time() - self.started_at,
+            "counters": {name: self.counters(name) for name in names["counters"]},
+            "gauges": {name: self.gauges(name) for name in names["gauges"]},
+            "histograms": {name: self.histograms(name) for name in names["histograms"]}
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _metrics
+
+
+def increment(name: str, amount: float = 1, **labels):
+    _metrics.increment(name, amount, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    _metrics.set_gauge(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    _metrics.observe(name, value, **labels)
+
+
+def record_span_metrics(name: str, duration: Optional[float], attributes: Dict[str, Any], error: Optional[str]):
+    """
+    Update the standard metrics from one finished tracing span.
+
+    Args:
+        name: Span name, used as the stage label
+        duration: Span duration in seconds
+        attributes: Span attributes; ``provider``, ``cache_hit`` and token counts are read
+        error: Error recorded on the span, if it failed
+    """
+    provider = attributes.get("provider", "internal")
+    if duration is not None:
+        observe("latency_ms", duration * 1000, provider=provider, stage=name)
+    if error:
+        increment("errors", provider=provider, stage=name)
+        if error.startswith(("TimeoutError", "Timeout", "ReadTimeout", "ConnectTimeout", "APITimeoutError")):
+            increment("timeouts", provider=provider, stage=name)
+    if "cache_hit" in attributes:
+        increment("cache_lookups", cache=name, result="hit" if attributes["cache_hit"] else "miss")
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if attributes.get(kind):
+            increment("tokens", attributes[kind], provider=provider, kind=kind)
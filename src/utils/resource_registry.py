@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
+
+# Provider-mode settings change which client a factory builds
+PROVIDER_MODE_KEYS = ("MAMABEAR_PROVIDER_MODE", "MAMABEAR_FIXTURES_DIR")
+
+
+class ResourceRegistry:
+    """Process-wide, lazily created singletons shared across sessions.
+
+    Each resource is built on first use and reused until the environment
+    variables it depends on change, at which point the next ``get`` builds
+    a fresh instance. Construction time is recorded per resource.
+    """
+
+    def __init__(self, env_path: str = ".env"):
+        self.env_path = env_path
+        self._env_mtime: Optional[float] = None
+        self._env_loaded = False
+        # Values this registry set from .env; only these are replaced on reload
+        self._env_values: Dict[str, str] = {}
+        self._env_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._resources: Dict[str, Dict[str, Any]] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def load_environment(self):
+        """Load the .env file once, and again only if it has been modified since.
+
+        Variables already set in the real environment take precedence. On a
+        reload, only variables that an earlier load set are updated, or
+        removed when they are no longer in the file.
+        """
+        try:
+            mtime = os.stat(self.env_path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if self._env_loaded and mtime == self._env_mtime:
+            return
+        with self._env_lock:
+            if self._env_loaded and mtime == self._env_mtime:
+                return
+            values = {key: value for key, value in dotenv_values(self.env_path).items() if value is not None}
+            for key, value in values.items():
+                if key not in os.environ or os.environ[key] == self._env_values.get(key):
+                    os.environ[key] = value
+                    self._env_values[key] = value
+            for key in set(self._env_values) - set(values):
+                if os.environ.get(key) == self._env_values.pop(key):
+                    del os.environ[key]
+            self._env_mtime = mtime
+            self._env_loaded = True
+
+    @staticmethod
+    def _fingerprint(config_keys: Iterable[str]) -> tuple:
+        return tuple((key, os.getenv(key)) for key in config_keys)
+
+    def get(self, name: str, factory: Callable[[], Any], config_keys: Iterable[str] = ()) -> Any:
+        """
+        Return the shared instance of a resource, building it if needed.
+
+        Args:
+            name: Registry key
+            factory: Builds the resource
+            config_keys: Environment variables whose values the resource depends on
+
+        Returns:
+            The cached resource
+        """
+        fingerprint = self._fingerprint(tuple(config_keys) + PROVIDER_MODE_KEYS)
+        entry = self._resources.get(name)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            return entry["resource"]
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            entry = self._resources.get(name)
+            if entry is not None and entry["fingerprint"] == fingerprint:
+                return entry["resource"]
+
+            if entry is not None:
+                logger.info("Configuration for %s changed, rebuilding", name)
+            start = time.perf_counter()
+            resource = factory()
+            elapsed = time.perf_counter() - start
+            logger.info("Initialized %s in %.3fs", name, elapsed)
+
+            with self._lock:
+                self._resources[name] = {
+                    "resource": resource,
+                    "fingerprint": fingerprint,
+                    "init_seconds": elapsed,
+                    "created_at": time.time(),
+                    "builds": (entry["builds"] + 1) if entry else 1
+                }
+            return resource
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one cached resource, or all of them, so the next get rebuilds it."""
+        with self._lock:
+            if name is None:
+                self._resources.clear()
+            else:
+                self._resources.pop(name, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return initialization timings for every cached resource."""
+        with self._lock:
+            return {
+                name: {key: value for key, value in entry.items() if key not in ("resource", "fingerprint")}
+                for name, entry in self._resources.items()
+            }
+
+
+_registry = ResourceRegistry()
+
+
+def get_resource_registry() -> ResourceRegistry:
+    return _registry
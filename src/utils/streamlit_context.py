@@ -22,4 +22,9 @@ def with_streamlit_context(func):
     def wrapper(*args, **kwargs):
         with maintain_streamlit_context():
             return func(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def get_session_id() -> str:
+    """Return the current Streamlit session ID, or "default" outside a script run."""
+    ctx = scriptrunner.get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
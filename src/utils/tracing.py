@@ -0,0 +1,266 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.utils.metrics import record_span_metrics
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "mamabear"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("mamabear_span", default=None)
+
+
+class Span:
+    """One timed stage of a request, nested under the span active when it started."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter:
+    """Sends spans to an OTLP/HTTP collector as JSON, batched on a background thread.
+
+    Any OpenTelemetry collector, Jaeger or Tempo endpoint accepting
+    ``/v1/traces`` JSON will ingest them.
+    """
+
+    def __init__(self, endpoint: str, batch_size: int = 100, flush_interval: float = 2.0):
+        self.endpoint = endpoint.rstrip("/")
+        if not self.endpoint.endswith("/v1/traces"):
+            self.endpoint += "/v1/traces"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            logger.debug("OTLP export queue full, dropping span")
+
+    @staticmethod
+    def _encode(span: Span) -> Dict[str, Any]:
+        start_ns = int(span.start_time * 1e9)
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((span.duration or 0) * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def _send(self, spans: List[Span]):
+        import requests
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [self._encode(span) for span in spans]}]
+            }]
+        }
+        try:
+            requests.post(self.endpoint, json=payload, timeout=5).raise_for_status()
+        except Exception as e:
+            logger.debug("OTLP export of %s spans failed: %s", len(spans), e)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+
+_exporters: Optional[List[Any]] = None
+_exporters_lock = threading.Lock()
+
+
+def get_exporters() -> List[Any]:
+    """Return the configured exporters, created from the environment on first use.
+
+    ``MAMABEAR_TRACE_FILE`` enables JSONL export and ``MAMABEAR_OTLP_ENDPOINT``
+    enables OTLP export. Without either, spans only feed the in-process metrics.
+    """
+    global _exporters
+    if _exporters is None:
+        with _exporters_lock:
+            if _exporters is None:
+                exporters = []
+                if os.getenv("MAMABEAR_TRACE_FILE"):
+                    exporters.append(JsonlExporter(os.getenv("MAMABEAR_TRACE_FILE")))
+                if os.getenv("MAMABEAR_OTLP_ENDPOINT"):
+                    exporters.append(OtlpExporter(os.getenv("MAMABEAR_OTLP_ENDPOINT")))
+                _exporters = exporters
+    return _exporters
+
+
+def set_exporters(exporters: Optional[List[Any]]):
+    """Replace the exporters; None re-reads the environment on the next span."""
+    global _exporters
+    with _exporters_lock:
+        _exporters = exporters
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """Add attributes to the active span, if any."""
+    active = _current_span.get()
+    if active is not None:
+        active.set_attributes(**attributes)
+
+
+def _export(finished: Span):
+    record_span_metrics(finished.name, finished.duration, finished.attributes, finished.error)
+    for exporter in get_exporters():
+        try:
+            exporter.export(finished)
+        except Exception as e:
+            logger.debug("Span export failed: %s", e)
+
+
+def record_span(name: str, duration: float, **attributes) -> Span:
+    """Export a span for a stage that has already finished, such as a consumed stream."""
+    finished = Span(name, _current_span.get(), attributes)
+    finished.start_time = time.time() - duration
+    finished.duration = duration
+    _export(finished)
+    return finished
+
+
+def record_usage(target: Span, response: Any):
+    """Copy token usage from a Groq or OpenAI completion response onto a span."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        target.set_attributes(
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None)
+        )
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Time a stage as a span nested under the currently active span.
+
+    Args:
+        name: Stage name, e.g. "gemini.generate" or "calendar.events.list"
+        attributes: Initial attributes such as provider, model or bytes_sent
+
+    Yields:
+        The span, for adding attributes known only at the end (tokens, cache_hit)
+    """
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        _export(current)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """Decorator that runs each call of a function inside a span."""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """Bind ``func`` to the caller's tracing context so spans it opens on another thread nest correctly."""
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # A fresh copy per call, since one context cannot be entered by two threads at once
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
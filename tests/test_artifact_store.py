@@ -0,0 +1,57 @@
+import time
+
+from src.utils.artifact_store import ArtifactStore
+
+
+def test_release_session_frees_unshared_artifacts():
+    store = ArtifactStore()
+    store.put("a", "analysis", "shared text")
+    store.put("b", "analysis", "shared text")
+    store.put("a", "recipes", [{"id": 1}])
+
+    store.release_session("a")
+
+    assert store.get("a", "analysis") is None
+    assert store.get("b", "analysis") == "shared text"
+    stats = store.stats()
+    assert stats["sessions"] == 1
+    assert stats["artifacts"] == 1
+
+
+def test_evicted_artifact_can_be_stored_again():
+    store = ArtifactStore(max_bytes=30)
+    store.put("a", "recipes", b"x" * 10)
+    store.put("a", "analysis", b"y" * 25)
+    assert store.get("a", "recipes") is None
+
+    store.put("a", "recipes", b"x" * 10)
+
+    assert store.get("a", "recipes") == b"x" * 10
+
+
+def test_idle_sessions_expire():
+    store = ArtifactStore(session_ttl=0.2)
+    store.put("idle", "analysis", "old")
+    time.sleep(0.15)
+    store.put("active", "analysis", "new")
+
+    assert store.expire_idle_sessions() == 0
+    assert store.expire_idle_sessions(now=time.monotonic() + 0.1) == 1
+
+    assert store.get("idle", "analysis") is None
+    assert store.get("active", "analysis") == "new"
+    stats = store.stats()
+    assert stats["sessions"] == 1
+    assert stats["expired_sessions"] == 1
+    assert stats["total_bytes"] == store.session_usage("active")["bytes"]
+
+
+def test_store_use_sweeps_idle_sessions():
+    store = ArtifactStore(session_ttl=0.2)
+    store.put("idle", "analysis", "old")
+
+    time.sleep(0.25)
+    store.put("active", "analysis", "new")
+
+    assert store.get("idle", "analysis") is None
+    assert store.stats()["sessions"] == 1
@@ -0,0 +1,41 @@
+import threading
+import time
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("streamlit")
+
+from src.services import image_analysis_service
+from src.services.image_analysis_service import analyze_with_timeout
+
+
+class BlockingModel:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, parts):
+        with self._lock:
+            self.calls += 1
+        self.release.wait(5)
+        return "reply"
+
+
+def test_timed_out_call_keeps_its_slot(monkeypatch):
+    monkeypatch.setattr(image_analysis_service, "_gemini_slots", threading.BoundedSemaphore(1))
+    model = BlockingModel()
+    image = Image.new("RGB", (4, 4))
+
+    deadline = time.time() + 0.2
+    with pytest.raises(TimeoutError):
+        analyze_with_timeout(model, "prompt", image, timeout_seconds=0.1, deadline=deadline)
+    # The abandoned call still runs, so a new call cannot start alongside it
+    with pytest.raises(TimeoutError):
+        analyze_with_timeout(model, "prompt", image, timeout_seconds=0.1)
+    assert model.calls == 1
+
+    model.release.set()
+    assert analyze_with_timeout(model, "prompt", image, timeout_seconds=1) == "reply"
+    assert model.calls == 2
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import pytest
+
+pytz = pytest.importorskip("pytz")
+pytest.importorskip("streamlit")
+
+from src.services.meal_plan_optimizer import optimize_meal_plan
+
+
+def test_meal_windows_match_displayed_time():
+    now = pytz.UTC.localize(datetime(2026, 3, 2, 0, 0))
+    recipes = [{'id': 1, 'title': 'Curry', 'readyInMinutes': 45}]
+
+    plan = optimize_meal_plan(recipes, [], [], now, days_ahead=1, meal_types={1: "Dinner"})
+
+    [assignment] = plan['assignments']
+    displayed_start = datetime.strptime(assignment['slot']['display_time'].split(' - ')[0], '%I:%M %p')
+    assert 16 <= displayed_start.hour < 21
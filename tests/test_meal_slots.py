@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytz = pytest.importorskip("pytz")
+pytest.importorskip("streamlit")
+
+from src.services.meal_planner_service import compute_meal_prep_slots
+
+KUALA_LUMPUR = pytz.timezone('Asia/Kuala_Lumpur')
+
+
+def brute_force_slots(events, cooking_time, days_ahead, now):
+    """The original scan: test every candidate slot against every event."""
+    def parse(value):
+        return datetime.fromisoformat(value.get('dateTime', value.get('date'))).astimezone(pytz.UTC)
+
+    slots = []
+    for day in range(days_ahead):
+        day_start = (now + timedelta(days=day)).replace(hour=6, minute=0, second=0, microsecond=0)
+        day_end = day_start.replace(hour=22)
+        current_slot_start = max(day_start, now)
+        while current_slot_start + timedelta(minutes=cooking_time) <= day_end:
+            slot_end = current_slot_start + timedelta(minutes=cooking_time)
+            overlaps = any(
+                current_slot_start < parse(event['end']) and slot_end > parse(event['start'])
+                for event in events
+            )
+            if not overlaps:
+                local_start = current_slot_start.astimezone(KUALA_LUMPUR)
+                slots.append({
+                    'start': current_slot_start.isoformat(),
+                    'end': slot_end.isoformat(),
+                    'duration_minutes': cooking_time,
+                    'day': local_start.strftime('%A, %B %d'),
+                    'display_time': f"{local_start.strftime('%I:%M %p')} - "
+                                    f"{local_start + timedelta(minutes=cooking_time):%I:%M %p}"
+                })
+            current_slot_start = current_slot_start + timedelta(minutes=cooking_time + 5)
+    return [slot for slot in slots if datetime.fromisoformat(slot['start']) > now]
+
+
+def random_event(rng, now, days_ahead):
+    kind = rng.random()
+    if kind < 0.15:
+        # All-day event, given as dates only
+        day = (now + timedelta(days=rng.randrange(-1, days_ahead + 1))).date()
+        return {'start': {'date': day.isoformat()}, 'end': {'date': (day + timedelta(days=rng.randint(1, 2))).isoformat()}}
+
+    start = now + timedelta(minutes=rng.randrange(-24 * 60, (days_ahead + 1) * 24 * 60, 5))
+    if kind < 0.3:
+        # Late evening events that run past midnight
+        start = start.replace(hour=rng.randint(20, 23), minute=rng.choice([0, 15, 30, 45]))
+        end = start + timedelta(hours=rng.randint(2, 10))
+    elif kind < 0.35:
+        # End before start; these never merge into busy blocks
+        end = start - timedelta(minutes=rng.randint(5, 120))
+    else:
+        end = start + timedelta(minutes=rng.choice([0, 10, 30, 45, 60, 90, 180, 600]))
+    tz = rng.choice([pytz.UTC, KUALA_LUMPUR, pytz.timezone('America/New_York')])
+    return {'start': {'dateTime': start.astimezone(tz).isoformat()}, 'end': {'dateTime': end.astimezone(tz).isoformat()}}
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_sweep_matches_brute_force(seed):
+    rng = random.Random(seed)
+    now = pytz.UTC.localize(datetime(2026, 3, 1) + timedelta(minutes=rng.randrange(0, 7 * 24 * 60)))
+    days_ahead = rng.randint(1, 7)
+    cooking_time = rng.choice([5, 15, 30, 45, 60, 90, 120, 240])
+    events = [random_event(rng, now, days_ahead) for _ in range(rng.randint(0, 40))]
+
+    assert compute_meal_prep_slots(events, cooking_time, days_ahead, now) == \
+        brute_force_slots(events, cooking_time, days_ahead, now)
+
+
+def test_busy_day_leaves_no_slots():
+    now = pytz.UTC.localize(datetime(2026, 3, 2, 0, 0))
+    events = [{'start': {'dateTime': '2026-03-01T20:00:00+00:00'}, 'end': {'dateTime': '2026-03-03T02:00:00+00:00'}}]
+
+    assert compute_meal_prep_slots(events, 30, 1, now) == []
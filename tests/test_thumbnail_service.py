@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from src.services.thumbnail_service import LocalImageFetcher, ThumbnailService
+from src.utils.metrics import get_metrics
+
+
+class CountingFetcher(LocalImageFetcher):
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        with self._lock:
+            self.calls.append(url)
+        return super().__call__(url)
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    # Identical images, so every thumbnail has the same size
+    for index in range(3):
+        Image.new("RGB", (64, 48), "red").save(images / f"{index}.png")
+    return CountingFetcher(str(images))
+
+
+def make_service(tmp_path, fetcher, **kwargs):
+    return ThumbnailService(cache_dir=str(tmp_path / "cache"), fetcher=fetcher, size=(32, 24), **kwargs)
+
+
+def test_concurrent_requests_fetch_once(tmp_path, fetcher):
+    get_metrics().reset()
+    service = make_service(tmp_path, fetcher)
+    url = "https://img.example.com/recipes/0.png"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_thumbnail(url))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetcher.calls == [url]
+    assert len(results) == 8
+    assert all(result and result == results[0] for result in results)
+    # Requests that waited for the fetch were served without one
+    lookups = {row['result']: row['value'] for row in get_metrics().counters("cache_lookups") if row['cache'] == "thumbnail"}
+    assert lookups == {"miss": 1, "hit": 7}
+
+
+def test_least_recently_used_thumbnail_is_evicted(tmp_path, fetcher):
+    service = make_service(tmp_path, fetcher)
+    urls = [f"https://img.example.com/recipes/{index}.png" for index in range(3)]
+    thumbnail = service.get_thumbnail(urls[0])
+    service.get_thumbnail(urls[1])
+    # Room for two thumbnails; reading the first makes the second the oldest
+    service.max_cache_bytes = 2 * len(thumbnail)
+    service.get_thumbnail(urls[0])
+
+    service.get_thumbnail(urls[2])
+    service.get_thumbnail(urls[0])
+    service.get_thumbnail(urls[1])
+
+    assert fetcher.calls == urls + [urls[1]]
+
+
+def test_failed_fetch_is_not_retried_until_it_expires(tmp_path, fetcher):
+    service = make_service(tmp_path, fetcher, failure_ttl=0.2)
+    url = "https://img.example.com/recipes/missing.png"
+
+    assert service.get_thumbnail(url) is None
+    assert service.get_thumbnail(url) is None
+    assert fetcher.calls == [url]
+
+    time.sleep(0.25)
+    assert service.get_thumbnail(url) is None
+    assert fetcher.calls == [url, url]